@@ -0,0 +1,6 @@
+try:
+    from .celery import app as celery_app
+except ImportError:  # celery is optional; management commands cover cron-based setups
+    celery_app = None
+
+__all__ = ('celery_app',)
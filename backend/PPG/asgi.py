@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PPG.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up (it touches settings and models)
+from reservations.events import SSE_PATH, sse_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Long-lived SSE connections bypass the Django request stack entirely
+    if scope['type'] == 'http' and scope['path'] == SSE_PATH:
+        return await sse_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,12 +40,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'drf_yasg',
+    'graphene_django',
     'rest_framework',
     'rest_framework_simplejwt',
     'reservations',
     'corsheaders',
 ]
+# Interactive docs (drf_yasg) are only loaded when enabled; otherwise the schema
+# is served from the file built by `manage.py generate_openapi` (API_SCHEMA_FILE).
+API_DOCS_ENABLED = os.environ.get('API_DOCS', '1' if DEBUG else '0') == '1'
+API_SCHEMA_FILE = BASE_DIR / 'openapi.json'
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.append('drf_yasg')
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -54,16 +64,35 @@ SWAGGER_SETTINGS = {
     },
 }
 
+GRAPHENE = {
+    'SCHEMA': 'reservations.schema.schema',
+}
+# Validation-time limits for /api/graphql/ (see reservations.schema)
+GRAPHQL_MAX_DEPTH = 6
+GRAPHQL_MAX_COST = 20000
+
 AUTH_USER_MODEL = 'reservations.User' 
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'reservations.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'reservations.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'reservations.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
 }
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'reservations.middleware.AdmissionControlMiddleware',
+    'reservations.middleware.CompressionMiddleware',
+    'reservations.middleware.RequestProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,10 +103,28 @@ MIDDLEWARE = [
 ]
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Request profiler: admins send `X-Profile: 1`, or a fraction of all requests is sampled.
+# Snapshots (pstats + SQL) are kept in a ring buffer on disk, see reservations.profiling
+REQUEST_PROFILER_ENABLED = True
+REQUEST_PROFILER_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILER_SAMPLE_RATE', '0'))
+REQUEST_PROFILER_DIR = BASE_DIR / 'profiles'
+REQUEST_PROFILER_MAX_SNAPSHOTS = 50
+
+# Slow-query log: queries over the threshold are logged and aggregated per SQL fingerprint
+# (with EXPLAIN of the first occurrence) in reservations.SlowQuery; see manage.py slow_queries
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG', '1') == '1'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '100'))
+SLOW_QUERY_EXPLAIN = True
+
+# Responses smaller than this are not compressed (brotli if installed, else gzip)
+API_COMPRESSION_MIN_SIZE = 1024
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'x-profile')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Retry-After', 'X-Profile-Id']
 
 
 ROOT_URLCONF = 'PPG.urls'
@@ -169,6 +216,150 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (doctor photos and their generated variants). Django only serves
+# them when DEBUG; in production the web server serves MEDIA_ROOT and sends
+# `Cache-Control: public, max-age=31536000, immutable` for media/doctors/variants/
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Resized WebP variants generated for each doctor photo: name -> (width, height)
+DOCTOR_PHOTO_VARIANTS = {
+    'thumb': (96, 96),
+    'card': (320, 320),
+}
+DOCTOR_PHOTO_WORKERS = 2
+
+# Days of recurring availability (Doctor.availability_rules) expanded into `availability` when no window is given
+DOCTOR_AVAILABILITY_WINDOW_DAYS = 60
+
+# Overdue appointment sweeper (manage.py sweep_appointments / Celery beat)
+APPOINTMENT_SWEEP_BATCH_SIZE = 500
+APPOINTMENT_SWEEP_GRACE_MINUTES = 60
+
+# terminé appointments older than this move to AppointmentArchive (manage.py archive_appointments)
+APPOINTMENT_ARCHIVE_AFTER_DAYS = 365
+
+# Next-day reminders (manage.py send_reminders / Celery beat): messages per SMTP batch
+REMINDER_CHUNK_SIZE = 200
+# How long a run holds the reminders of its current chunk (seconds); a dead run's claims expire after this
+REMINDER_CLAIM_SECONDS = 15 * 60
+REMINDER_FROM_EMAIL = EMAIL_HOST_USER
+
+# How long responses stored for an Idempotency-Key are replayed (seconds)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+# A request still running after this long (dead worker) gives its key up to the next retry
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+# Live appointment events (SSE, served by PPG/asgi.py).
+# Use 'reservations.events.RedisBroker' with {'url': ...} when running several ASGI workers.
+APPOINTMENT_EVENTS_BACKEND = 'reservations.events.InProcessBroker'
+APPOINTMENT_EVENTS_OPTIONS = {}
+
+# Celery (optional): only used when celery is installed and a worker/beat is running
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_BEAT_SCHEDULE = {
+    'sweep-overdue-appointments': {
+        'task': 'reservations.tasks.sweep_overdue_appointments_task',
+        'schedule': 15 * 60,
+    },
+    'archive-old-appointments': {
+        'task': 'reservations.tasks.archive_appointments_task',
+        'schedule': 24 * 60 * 60,
+    },
+    # Hourly: reruns are idempotent and pick up appointments confirmed later in the day
+    'send-appointment-reminders': {
+        'task': 'reservations.tasks.send_appointment_reminders_task',
+        'schedule': 60 * 60,
+    },
+    'purge-idempotency-keys': {
+        'task': 'reservations.tasks.purge_idempotency_keys_task',
+        'schedule': 60 * 60,
+    },
+    # Picks up purge jobs whose in-process worker died (restart, crash)
+    'resume-purge-jobs': {
+        'task': 'reservations.tasks.resume_purge_jobs_task',
+        'schedule': 5 * 60,
+    },
+    # Same for the follow-up of a doctor's (de)activation
+    'resume-doctor-status-jobs': {
+        'task': 'reservations.tasks.resume_doctor_status_jobs_task',
+        'schedule': 5 * 60,
+    },
+    # No signal fires when a card's next available slot passes: recompute those
+    'refresh-stale-doctor-cards': {
+        'task': 'reservations.tasks.refresh_stale_doctor_cards_task',
+        'schedule': 5 * 60,
+    },
+}
+
+# Background purge of soft-deleted doctors/users (reservations.purge)
+PURGE_BATCH_SIZE = 500
+PURGE_MAX_ATTEMPTS = 5
+
+# Patients e-mailed per SMTP batch when a doctor is (de)activated (reservations.deactivation)
+DOCTOR_STATUS_NOTIFY_CHUNK_SIZE = 200
+
+# Changes feed (reservations.sync): seconds re-read behind the cursor for late-committing writes
+SYNC_OVERLAP_SECONDS = 5
+
+# Two-level cache: per-process LRU (reservations.cache.TwoLevelCache) over a shared cache.
+# Set CACHE_URL=redis://... in production so all workers share the second level.
+CACHES = {
+    'default': {
+        'BACKEND': 'reservations.cache.TwoLevelCache',
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'LOCAL_MAX_ENTRIES': 2048,
+            'LOCAL_TIMEOUT': 60,
+            'VERSION_CHECK_INTERVAL': 1.0,
+        },
+    },
+    'shared': (
+        {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.environ['CACHE_URL']}
+        if os.environ.get('CACHE_URL')
+        else {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / '.cache'}
+    ),
+}
+# Timeout (seconds) of cached specialties, doctor profiles and JWT users
+HOT_LOOKUP_CACHE_TIMEOUT = 300
+
+# GET /api/admin/dashboard/stats/: fresh for this long, then served stale while one request recomputes
+ADMIN_STATS_CACHE_TIMEOUT = 60
+
+# Per doctor and window results of /api/doctors/availability/ (invalidated on change)
+FREE_SLOTS_CACHE_TIMEOUT = 300
+
+# Dashboard bootstrap (GET /api/bootstrap/): threads computing its sections concurrently
+BOOTSTRAP_WORKERS = int(os.getenv('BOOTSTRAP_WORKERS', '4'))
+
+# Admission control (reservations.admission), per process: concurrency limit, bounded wait
+# queue and priority per route class; saturated classes answer 503 + Retry-After
+ADMISSION_CONTROL_ENABLED = True
+ADMISSION_MAX_CONCURRENCY = int(os.getenv('ADMISSION_MAX_CONCURRENCY', '32'))
+ADMISSION_CLASSES = {
+    'booking': {'priority': 0, 'limit': 24, 'queue': 100, 'timeout': 5.0, 'retry_after': 2},
+    'default': {'priority': 1, 'limit': 16, 'queue': 50, 'timeout': 2.0, 'retry_after': 2},
+    'reporting': {'priority': 2, 'limit': 4, 'queue': 8, 'timeout': 1.0, 'retry_after': 10},
+}
+# URL name -> class (unlisted routes are 'default'; None is never queued)
+ADMISSION_ROUTES = {
+    'appointment-create': 'booking',
+    'client-appointment-update': 'booking',
+    'appointment-delete': 'booking',
+    'doctor-availability-batch': 'booking',
+    'admin-dashboard-stats': 'reporting',
+    'admin-dashboard-activities': 'reporting',
+    'appointment-list-admin': 'reporting',
+    'appointment-history': 'reporting',
+    'admin-doctors-list': 'reporting',
+    'doctor-list': 'reporting',
+    'doctors-by-speciality': 'reporting',
+    'doctor-dashboard-stats': 'reporting',
+    'bootstrap': 'reporting',
+    'graphql': 'reporting',
+    'admin-admission-stats': None,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,30 +1,43 @@
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from django.shortcuts import redirect
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Appointment Booking API",
-        default_version='v1',
-        description="API documentation for the Appointment Booking System",
-        contact=openapi.Contact(email="you@example.com"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-    authentication_classes=[],
-)
+from django.conf import settings
+from django.conf.urls.static import static
+from reservations.images import serve_photo_variant
+from reservations.views import OpenAPISchemaFileView
 
 def api_redirect(request):
-    return redirect('/swagger/')
+    return redirect('/swagger/' if settings.API_DOCS_ENABLED else '/api/schema.json')
 
 urlpatterns = [
     path('api/', api_redirect),  # 👈 add this line first!
+    path('api/schema.json', OpenAPISchemaFileView.as_view(), name='schema-json-static'),  # Prebuilt by `manage.py generate_openapi`
     path('api/', include('reservations.urls')),
 
     path('admin/', admin.site.urls),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
+
+if settings.API_DOCS_ENABLED:
+    # drf_yasg is only imported (and its schema generated on demand) in docs mode
+    from rest_framework import permissions
+    from drf_yasg.views import get_schema_view
+    from reservations.docs import get_api_info
+
+    schema_view = get_schema_view(
+        get_api_info(),
+        public=True,
+        permission_classes=[permissions.AllowAny],
+        authentication_classes=[],
+    )
+    urlpatterns += [
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+        path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    ]
+
+if settings.DEBUG:
+    # Development only: in production the web server serves MEDIA_ROOT, with
+    # the immutable Cache-Control header on the content-hashed photo variants
+    urlpatterns += [
+        path('media/doctors/variants/<path:path>', serve_photo_variant, name='doctor-photo-variant'),
+    ]
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,139 @@
+"""
+Admin activity feed.
+
+Events are appended to ``ActivityEvent`` when they happen, from model
+signals (appointments, doctors, specialties, client sign-ups) and from
+views for actions signals can't see, such as a doctor's (de)activation and
+who performed it. Each row carries its final message and the ids and
+names it needs. Reading the feed (``/api/admin/dashboard/activities/``)
+is then a cursor scan of the ``(created_at, id)`` index with no joins.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .bootstrap import section_key
+from .models import ActivityEvent, Appointment
+
+MESSAGE_MAX_LENGTH = 255
+
+
+def _full_name(first_name, last_name):
+    return f"{first_name} {last_name}".strip()
+
+
+def _drop_cached_feed():
+    transaction.on_commit(lambda: cache.delete(section_key('admin', 'activities', 'global')))
+
+
+def record_activity(type, message, obj=None, status='', actor=None, **data):
+    """Append one event; it is written in the caller's transaction."""
+    event = ActivityEvent.objects.create(
+        type=type,
+        message=message[:MESSAGE_MAX_LENGTH],
+        status=status or '',
+        object_type=obj._meta.model_name if obj is not None else '',
+        object_id=obj.pk if obj is not None else None,
+        actor_id=getattr(actor, 'pk', actor),
+        data=data,
+    )
+    _drop_cached_feed()
+    return event
+
+
+def record_activities(events):
+    if events:
+        ActivityEvent.objects.bulk_create(events)
+        _drop_cached_feed()
+
+
+# --- Messages ---
+
+def appointment_created(appointment):
+    client, doctor = appointment.client, appointment.doctor
+    return record_activity(
+        'appointment_created',
+        f"Nouveau RDV: {_full_name(client.first_name, client.last_name)} avec Dr. {_full_name(doctor.first_name, doctor.last_name)}",
+        obj=appointment, status=appointment.status, actor=appointment.client_id,
+        client_id=appointment.client_id, doctor_id=appointment.doctor_id, date_time=appointment.date_time,
+    )
+
+
+def appointment_status_changed(appointment, previous):
+    client, doctor = appointment.client, appointment.doctor
+    return record_activity(
+        'appointment_status_changed',
+        f"RDV de {_full_name(client.first_name, client.last_name)} avec Dr. {_full_name(doctor.first_name, doctor.last_name)}"
+        f" : {previous} → {appointment.status}",
+        obj=appointment, status=appointment.status,
+        client_id=appointment.client_id, doctor_id=appointment.doctor_id, previous=previous,
+    )
+
+
+def appointments_bulk_status_changed(ids, previous, status):
+    rows = Appointment.objects.filter(id__in=ids).values_list(
+        'id', 'client_id', 'doctor_id', 'client__first_name', 'client__last_name', 'doctor__first_name', 'doctor__last_name',
+    )
+    record_activities([
+        ActivityEvent(
+            type='appointment_status_changed',
+            message=(
+                f"RDV de {_full_name(client_first, client_last)} avec Dr. {_full_name(doctor_first, doctor_last)}"
+                f" : {previous.get(appointment_id)} → {status}"
+            )[:MESSAGE_MAX_LENGTH],
+            status=status,
+            object_type='appointment',
+            object_id=appointment_id,
+            data={'client_id': client_id, 'doctor_id': doctor_id, 'previous': previous.get(appointment_id), 'bulk': True},
+        )
+        for appointment_id, client_id, doctor_id, client_first, client_last, doctor_first, doctor_last in rows
+    ])
+
+
+def appointment_deleted(appointment):
+    return record_activity(
+        'appointment_deleted', f"RDV #{appointment.pk} supprimé",
+        obj=appointment, status=appointment.status,
+        client_id=appointment.client_id, doctor_id=appointment.doctor_id, date_time=appointment.date_time,
+    )
+
+
+def doctor_created(doctor):
+    return record_activity(
+        'doctor_created', f"Nouveau médecin: Dr. {_full_name(doctor.first_name, doctor.last_name)}",
+        obj=doctor, email=doctor.email, specialty_id=doctor.specialization_id,
+    )
+
+
+def doctor_deleted(doctor, actor=None):
+    return record_activity(
+        'doctor_deleted', f"Médecin supprimé: Dr. {_full_name(doctor.first_name, doctor.last_name)}",
+        obj=doctor, actor=actor, email=doctor.email,
+    )
+
+
+def doctor_active_changed(doctor, is_active, actor=None):
+    verb = 'activé' if is_active else 'désactivé'
+    return record_activity(
+        'doctor_activated' if is_active else 'doctor_deactivated',
+        f"Médecin {verb}: Dr. {_full_name(doctor.first_name, doctor.last_name)}",
+        obj=doctor, actor=actor, is_active=is_active,
+    )
+
+
+def specialty_changed(specialty, created):
+    return record_activity(
+        'specialty_created' if created else 'specialty_updated',
+        f"Spécialité {'créée' if created else 'modifiée'}: {specialty.name}",
+        obj=specialty, name=specialty.name,
+    )
+
+
+def specialty_deleted(specialty):
+    return record_activity('specialty_deleted', f"Spécialité supprimée: {specialty.name}", obj=specialty, name=specialty.name)
+
+
+def client_registered(user):
+    return record_activity(
+        'client_registered', f"Nouveau patient: {_full_name(user.first_name, user.last_name) or user.email}",
+        obj=user, actor=user, email=user.email,
+    )
@@ -0,0 +1,169 @@
+"""
+Admission control for API requests (``AdmissionControlMiddleware``).
+
+Every route belongs to a class (``ADMISSION_ROUTES``, by URL name; routes
+not listed are ``default``). Each class has its own limits in
+``ADMISSION_CLASSES``:
+
+* ``limit``: requests of the class running at once,
+* ``queue``: requests allowed to wait for a slot; beyond that, 503 at once,
+* ``timeout``: seconds a queued request waits before giving up with 503,
+* ``priority``: lower goes first. A freed slot goes to the waiting request
+  with the best priority, so booking is served before reporting when the
+  process is saturated,
+* ``retry_after``: the ``Retry-After`` of its 503 responses.
+
+``ADMISSION_MAX_CONCURRENCY`` caps all classes together. A route mapped to
+None (the admission metrics themselves) is never queued.
+
+Counters are per process, like the cache stats: ``admission_stats()``
+backs ``/api/admin/admission/stats/``.
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+DEFAULT_CLASS = 'default'
+
+DEFAULT_CLASSES = {
+    'booking': {'priority': 0, 'limit': 24, 'queue': 100, 'timeout': 5.0, 'retry_after': 2},
+    'default': {'priority': 1, 'limit': 16, 'queue': 50, 'timeout': 2.0, 'retry_after': 2},
+    'reporting': {'priority': 2, 'limit': 4, 'queue': 8, 'timeout': 1.0, 'retry_after': 10},
+}
+
+COUNTERS = ('admitted', 'queued', 'rejected_queue_full', 'rejected_timeout')
+
+
+@dataclass
+class RouteClass:
+    name: str
+    priority: int
+    limit: int
+    queue: int
+    timeout: float
+    retry_after: int
+    active: int = 0
+    waiting: int = 0
+    peak_waiting: int = 0
+    wait_ms: float = 0.0
+
+    def __post_init__(self):
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+
+class Rejected(Exception):
+    def __init__(self, route_class, reason):
+        super().__init__(reason)
+        self.route_class = route_class
+        self.reason = reason
+
+
+class AdmissionController:
+    def __init__(self, classes, max_concurrency, routes):
+        self.classes = {
+            name: RouteClass(name=name, **options)
+            for name, options in sorted(classes.items(), key=lambda item: item[1]['priority'])
+        }
+        self.max_concurrency = max_concurrency
+        self.routes = routes
+        self.active = 0
+        self._condition = threading.Condition()
+
+    def classify(self, request):
+        """Class name of ``request``'s route, or None when it is not admission-controlled."""
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return DEFAULT_CLASS
+        name = self.routes.get(url_name, DEFAULT_CLASS)
+        return name if name is None or name in self.classes else DEFAULT_CLASS
+
+    def _can_enter(self, route_class):
+        if route_class.active >= route_class.limit or self.active >= self.max_concurrency:
+            return False
+        # A better-priority request that could run right now goes first
+        return not any(
+            other.waiting and other.active < other.limit
+            for other in self.classes.values() if other.priority < route_class.priority
+        )
+
+    def acquire(self, name):
+        """Take a slot of class ``name``, waiting in its queue if needed; raises Rejected."""
+        route_class = self.classes[name]
+        with self._condition:
+            if not route_class.waiting and self._can_enter(route_class):
+                return self._enter(route_class)
+            if route_class.waiting >= route_class.queue:
+                route_class.counts['rejected_queue_full'] += 1
+                raise Rejected(route_class, 'queue_full')
+
+            route_class.counts['queued'] += 1
+            route_class.waiting += 1
+            route_class.peak_waiting = max(route_class.peak_waiting, route_class.waiting)
+            started = time.monotonic()
+            deadline = started + route_class.timeout
+            try:
+                while not self._can_enter(route_class):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        route_class.counts['rejected_timeout'] += 1
+                        raise Rejected(route_class, 'timeout')
+                    self._condition.wait(remaining)
+            finally:
+                route_class.waiting -= 1
+                route_class.wait_ms += (time.monotonic() - started) * 1000
+                # Our departure may unblock lower-priority waiters
+                self._condition.notify_all()
+            return self._enter(route_class)
+
+    def _enter(self, route_class):
+        route_class.active += 1
+        self.active += 1
+        route_class.counts['admitted'] += 1
+        return route_class
+
+    def release(self, name):
+        with self._condition:
+            self.classes[name].active -= 1
+            self.active -= 1
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'active': self.active,
+                'max_concurrency': self.max_concurrency,
+                'classes': {
+                    name: {
+                        'priority': c.priority, 'limit': c.limit, 'queue': c.queue, 'timeout': c.timeout,
+                        'active': c.active, 'waiting': c.waiting, 'peak_waiting': c.peak_waiting,
+                        'avg_wait_ms': round(c.wait_ms / c.counts['queued'], 1) if c.counts['queued'] else 0.0,
+                        **c.counts,
+                    }
+                    for name, c in self.classes.items()
+                },
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    getattr(settings, 'ADMISSION_CLASSES', DEFAULT_CLASSES),
+                    getattr(settings, 'ADMISSION_MAX_CONCURRENCY', 32),
+                    getattr(settings, 'ADMISSION_ROUTES', {}),
+                )
+    return _controller
+
+
+def admission_stats():
+    return get_controller().stats()
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ReservationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservations'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .querylog import install_slow_query_log
+
+        if getattr(settings, 'SLOW_QUERY_LOG_ENABLED', False):
+            connection_created.connect(install_slow_query_log, dispatch_uid='reservations.slow_query_log')
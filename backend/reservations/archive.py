@@ -0,0 +1,79 @@
+"""
+Archival of old appointment history.
+
+The hot ``Appointment`` table keeps recent and future appointments, which
+is all dashboards, counts and booking checks need. ``terminé`` rows older
+than ``APPOINTMENT_ARCHIVE_AFTER_DAYS`` are moved in batches to
+``AppointmentArchive``; ``appointment_history()`` reads both tables for
+history views.
+"""
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .cards import refresh_doctor_cards
+from .models import Appointment, AppointmentArchive, AppointmentTombstone
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_FIELDS = ['id', 'client_id', 'doctor_id', 'date_time', 'status', 'created_at', 'updated_at']
+
+
+def archive_appointments(older_than_days=None, batch_size=1000, max_batches=None):
+    """
+    Move old ``terminé`` appointments to the archive, one short transaction
+    per batch. Each batch is copied, tombstoned (so delta-sync clients drop
+    them) and deleted without per-row signals. Returns counts.
+    """
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'APPOINTMENT_ARCHIVE_AFTER_DAYS', 365)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    candidates = Appointment.objects.filter(status='terminé', date_time__lt=cutoff).order_by('date_time', 'id')
+
+    started = time.monotonic()
+    stats = {'batches': 0, 'archived': 0}
+    doctor_ids = set()
+    while max_batches is None or stats['batches'] < max_batches:
+        with transaction.atomic():
+            rows = list(candidates.select_for_update(skip_locked=True).values(*ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                break
+            ids = [row['id'] for row in rows]
+            AppointmentArchive.objects.bulk_create(
+                [AppointmentArchive(**row) for row in rows], ignore_conflicts=True
+            )
+            AppointmentTombstone.objects.bulk_create([
+                AppointmentTombstone(appointment_id=row['id'], client_id=row['client_id'], doctor_id=row['doctor_id'])
+                for row in rows
+            ])
+            # Nothing references Appointment rows, so a raw DELETE is safe and skips
+            # the per-row post_delete handlers (tombstones were written above)
+            doomed = Appointment.objects.filter(id__in=ids)
+            doomed._raw_delete(router.db_for_write(Appointment))
+        stats['batches'] += 1
+        stats['archived'] += len(rows)
+        doctor_ids.update(row['doctor_id'] for row in rows)
+
+    refresh_doctor_cards(doctor_ids)
+
+    stats['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+    stats['cutoff'] = cutoff.isoformat()
+    logger.info("Appointment archival: %s", stats)
+    return stats
+
+
+def appointment_history(limit=50, **filters):
+    """
+    Newest-first appointments matching ``filters`` (e.g. ``client=user`` or
+    ``doctor_id=3``) across the hot table and the archive. Each table is read
+    with its own (filter, date_time) index and the two streams are merged.
+    """
+    hot = Appointment.objects.filter(**filters).select_related('doctor', 'client').order_by('-date_time')[:limit]
+    cold = AppointmentArchive.objects.filter(**filters).select_related('doctor', 'client').order_by('-date_time')[:limit]
+    merged = heapq.merge(hot, cold, key=lambda a: a.date_time, reverse=True)
+    return [appointment for _, appointment in zip(range(limit), merged)]
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import auth_user_key, hot_lookup_timeout
+from .models import User
+
+# Only what authentication and permission checks read: never the password hash or profile data
+AUTH_USER_FIELDS = ('id', 'email', 'is_active', 'user_role', 'is_staff', 'is_superuser')
+
+
+def _cached_fields(user):
+    entry = {name: getattr(user, name) for name in AUTH_USER_FIELDS}
+    if api_settings.CHECK_REVOKE_TOKEN:
+        # The digest the tokens already carry, not the hash itself
+        entry['password_digest'] = get_md5_hash_password(user.password)
+    return entry
+
+
+def _lightweight_user(entry):
+    """User with only AUTH_USER_FIELDS loaded; other fields are deferred and loaded on first access."""
+    # from_db() takes the loaded values in model field order
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in AUTH_USER_FIELDS]
+    return User.from_db(router.db_for_read(User), names, [entry[name] for name in names])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the token's user through the cache instead
+    of one query per request. The entry is dropped whenever the user is
+    saved or deleted (see ``reservations.signals``).
+
+    Only ``AUTH_USER_FIELDS`` are cached. ``request.user`` is rebuilt from
+    them with the other fields deferred, so a view that reads the profile
+    loads it on demand, and ``save()`` only writes the loaded fields.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = auth_user_key(user_id)
+        entry = cache.get(key)
+        if not isinstance(entry, dict):  # miss, or a whole User cached by an older release
+            user = super().get_user(validated_token)
+            cache.set(key, _cached_fields(user), timeout=hot_lookup_timeout())
+            return user
+
+        # Same checks as JWTAuthentication.get_user, on the cached fields
+        if api_settings.CHECK_USER_IS_ACTIVE and not entry['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry.get('password_digest')
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return _lightweight_user(entry)
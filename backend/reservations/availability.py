@@ -0,0 +1,234 @@
+"""
+Recurring doctor availability.
+
+``Doctor.availability_rules`` stores a compact weekly template::
+
+    {
+        "slot_minutes": 30,
+        "weekly": {"mon": [["09:00", "12:00"], ["14:00", "17:00"]], "tue": [...]},
+        "exceptions": {"2025-12-25": [], "2025-12-24": ["09:00", "09:30"]},
+        "start": "2025-01-01",      # optional
+        "until": "2025-12-31"       # optional
+    }
+
+Each range is cut into ``slot_minutes`` slots (end exclusive). An exception
+replaces the slots of its date; an empty list closes the day. Explicit dates
+in the legacy ``Doctor.availability`` dict ({"YYYY-MM-DD": ["HH:MM", ...]})
+still work and take precedence over the rules. Old clients that write the
+expanded dict back close a day by leaving it out (see ``compact_overrides``).
+
+Rules are only expanded for the window that is asked for, week by week, and
+each expanded week is memoized, so reading a doctor never materializes a
+whole year of slots.
+"""
+import heapq
+import json
+from datetime import date, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+DEFAULT_SLOT_MINUTES = 30
+DEFAULT_WINDOW_DAYS = 60
+MAX_WINDOW_DAYS = 366
+
+
+def _minutes(value):
+    hour, minute = value.split(':')[:2]
+    hour, minute = int(hour), int(minute)
+    if not (0 <= hour <= 24 and 0 <= minute < 60) or hour * 60 + minute > 24 * 60:
+        raise ValueError(value)
+    return hour * 60 + minute
+
+
+def _format(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: date invalide '{value}'. Format attendu YYYY-MM-DD.")
+
+
+def normalize_rules(rules):
+    """
+    Validate ``rules`` and return them in canonical form (sorted, times as
+    ``HH:MM``). Raises ``ValueError`` with a user-facing message.
+    """
+    if not rules:
+        return {}
+    if not isinstance(rules, dict):
+        raise ValueError("availability_rules doit être un objet JSON.")
+
+    slot_minutes = rules.get('slot_minutes', DEFAULT_SLOT_MINUTES)
+    if not isinstance(slot_minutes, int) or not 5 <= slot_minutes <= 480:
+        raise ValueError("slot_minutes doit être un entier entre 5 et 480.")
+
+    weekly = rules.get('weekly') or {}
+    if not isinstance(weekly, dict):
+        raise ValueError("weekly doit être un objet {jour: [[début, fin], ...]}.")
+    normalized_weekly = {}
+    for day, ranges in weekly.items():
+        if day not in WEEKDAYS:
+            raise ValueError(f"Jour inconnu '{day}'. Utilisez: {', '.join(WEEKDAYS)}.")
+        if not isinstance(ranges, list):
+            raise ValueError(f"Les plages de '{day}' doivent être une liste.")
+        normalized_ranges = []
+        for item in ranges:
+            try:
+                start, end = (_minutes(v) for v in item)
+            except (TypeError, ValueError, AttributeError):
+                raise ValueError(f"Plage invalide pour '{day}': {item}. Utilisez ['HH:MM', 'HH:MM'].")
+            if start >= end:
+                raise ValueError(f"Plage invalide pour '{day}': le début doit précéder la fin.")
+            normalized_ranges.append([_format(start), _format(end)])
+        if normalized_ranges:
+            normalized_weekly[day] = sorted(normalized_ranges)
+
+    exceptions = rules.get('exceptions') or {}
+    if isinstance(exceptions, list):
+        # ["2025-12-25", ...] is shorthand for closed days
+        exceptions = {d: [] for d in exceptions}
+    if not isinstance(exceptions, dict):
+        raise ValueError("exceptions doit être un objet {date: [créneaux]} ou une liste de dates.")
+    normalized_exceptions = {}
+    for date_str, times in exceptions.items():
+        _parse_date(date_str, 'exceptions')
+        try:
+            normalized_exceptions[date_str] = sorted({_format(_minutes(t)) for t in times})
+        except (TypeError, ValueError, AttributeError):
+            raise ValueError(f"Créneaux invalides pour {date_str}. Utilisez 'HH:MM'.")
+
+    normalized = {'slot_minutes': slot_minutes, 'weekly': normalized_weekly}
+    if normalized_exceptions:
+        normalized['exceptions'] = dict(sorted(normalized_exceptions.items()))
+    for bound in ('start', 'until'):
+        if rules.get(bound):
+            normalized[bound] = _parse_date(rules[bound], bound).isoformat()
+    return normalized
+
+
+@lru_cache(maxsize=2048)
+def _week_slots(rules_key, monday_ordinal):
+    """Slots of the week starting at ``monday_ordinal`` as ``((date_str, (times...)), ...)``."""
+    rules = json.loads(rules_key)
+    slot = rules['slot_minutes']
+    weekly = rules['weekly']
+    exceptions = rules.get('exceptions', {})
+    first = rules.get('start')
+    last = rules.get('until')
+
+    week = []
+    monday = date.fromordinal(monday_ordinal)
+    for offset, day_name in enumerate(WEEKDAYS):
+        day = (monday + timedelta(days=offset)).isoformat()
+        if (first and day < first) or (last and day > last):
+            continue
+        if day in exceptions:
+            times = tuple(exceptions[day])
+        else:
+            times = tuple(
+                _format(minute)
+                for start, end in weekly.get(day_name, ())
+                for minute in range(_minutes(start), _minutes(end) - slot + 1, slot)
+            )
+        if times:
+            week.append((day, times))
+    return tuple(week)
+
+
+def iter_rule_slots(rules, start, end):
+    """Yield ``(date_str, [times])`` generated by ``rules`` from ``start`` to ``end`` (dates, inclusive)."""
+    if not rules or not (rules.get('weekly') or rules.get('exceptions')):
+        return
+    rules_key = json.dumps(rules, sort_keys=True)
+    start_str, end_str = start.isoformat(), end.isoformat()
+    monday = start - timedelta(days=start.weekday())
+    while monday <= end:
+        for date_str, times in _week_slots(rules_key, monday.toordinal()):
+            if start_str <= date_str <= end_str:
+                yield date_str, list(times)
+        monday += timedelta(days=7)
+
+
+def iter_availability(availability, rules, start, end):
+    """
+    Yield ``(date_str, [times])`` in date order over ``start``..``end``,
+    merging explicit ``availability`` dates (which win) with the rules.
+    """
+    start_str, end_str = start.isoformat(), end.isoformat()
+    explicit = sorted(
+        (d, sorted(times or [])) for d, times in (availability or {}).items() if start_str <= d <= end_str
+    )
+    previous = None
+    # heapq.merge is stable, so on equal dates the explicit entry comes first
+    for date_str, times in heapq.merge(explicit, iter_rule_slots(rules, start, end), key=lambda item: item[0]):
+        if date_str == previous:
+            continue
+        previous = date_str
+        if times:
+            yield date_str, times
+
+
+def default_window(today=None):
+    today = today or timezone.localdate()
+    days = getattr(settings, 'DOCTOR_AVAILABILITY_WINDOW_DAYS', DEFAULT_WINDOW_DAYS)
+    return today, today + timedelta(days=days - 1)
+
+
+def expand_availability(doctor, start=None, end=None):
+    """``{date: [times]}`` for ``doctor`` over the window (default: the next ``DOCTOR_AVAILABILITY_WINDOW_DAYS``)."""
+    if not doctor.availability_rules and start is None and end is None:
+        # No rules: the stored dict already is the full answer, keep it untouched for old clients
+        return doctor.availability or {}
+    if start is None or end is None:
+        default_start, default_end = default_window()
+        start, end = start or default_start, end or default_end
+    return dict(iter_availability(doctor.availability, doctor.availability_rules, start, end))
+
+
+def parse_window(date_from, date_to):
+    """Parse ``from``/``to`` query parameters into a bounded date window; raises ``ValueError``."""
+    default_start, default_end = default_window()
+    start = _parse_date(date_from, 'from') if date_from else default_start
+    end = _parse_date(date_to, 'to') if date_to else start + (default_end - default_start)
+    if end < start:
+        raise ValueError("'to' doit être postérieur à 'from'.")
+    if (end - start).days >= MAX_WINDOW_DAYS:
+        raise ValueError(f"Fenêtre trop large (maximum {MAX_WINDOW_DAYS} jours).")
+    return start, end
+
+
+def compact_overrides(availability, rules, previous=None):
+    """
+    Drop explicit dates whose slots are exactly what ``rules`` already
+    produce, so clients that write back an expanded dict don't materialize
+    the template.
+
+    ``previous`` is the expanded dict the client was last shown. A date
+    that the client removed from it and that the rules would fill again is
+    stored as ``[]`` (closed). Without this, the rules would silently
+    regenerate the day. Only dates between the first and last date written
+    are considered, so days that entered the window since the client's read
+    are left to the rules. A write of ``{}`` closes nothing.
+    """
+    if not rules or not availability:
+        return availability
+    dates = sorted(availability)
+    try:
+        start, end = date.fromisoformat(dates[0]), date.fromisoformat(dates[-1])
+    except ValueError:
+        return availability
+    generated = dict(iter_rule_slots(rules, start, end))
+    compacted = {
+        d: times for d, times in availability.items()
+        if sorted(times or []) != generated.get(d, [])
+    }
+    for d in previous or ():
+        if dates[0] <= d <= dates[-1] and d not in availability and generated.get(d):
+            compacted[d] = []
+    return dict(sorted(compacted.items()))
@@ -0,0 +1,193 @@
+"""
+One-request dashboard bootstrap (``GET /api/bootstrap/``).
+
+Each role has a set of named sections, one per API call a dashboard used to
+make on load. A section reuses the existing view, so its payload is exactly
+what the standalone endpoint returns. Sections are computed concurrently
+in a small thread pool, and each one is cached for its own TTL, per user or
+shared between all users of the role.
+
+``?sections=stats,profile`` restricts the response to some sections. A
+failing section is reported under ``errors`` without failing the others.
+Sections always have their full shape: ``?fields=``/``?omit=``/``?expand=``
+sent to ``/bootstrap/`` are not applied to them, since a section may be
+cached for every user of the role. For the same reason, each section runs
+with its own fixed query parameters (``Section.params``), never the
+caller's: a ``?type=`` or ``?page_size=`` on ``/bootstrap/`` cannot change
+a shared section.
+"""
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import QueryDict
+from rest_framework.request import Request
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def user_profile(request):
+    from .serializers import UserUpdateSerializer
+
+    return UserUpdateSerializer(request.user).data
+
+
+@dataclass(frozen=True)
+class Section:
+    source: object          # view class name in reservations.views, or a callable taking the request
+    ttl: int                # seconds; 0 disables caching
+    scope: str = 'user'     # 'user' (cached per user), 'doctor' (per doctor) or 'global' (shared by the role)
+    params: dict = field(default_factory=dict)  # query parameters the section is rendered with
+
+
+ROLE_SECTIONS = {
+    'admin': {
+        'profile': Section(user_profile, ttl=60),
+        'stats': Section('AdminDashboardStatsView', ttl=30, scope='global'),
+        'activities': Section('AdminDashboardActivitiesView', ttl=15, scope='global'),
+        'specialties': Section('SpecialtyListCreateView', ttl=300, scope='global'),
+    },
+    'doctor': {
+        'profile': Section('DoctorMeView', ttl=60, scope='doctor'),
+        'stats': Section('DoctorDashboardStatsView', ttl=30, scope='doctor'),
+        'recent_appointments': Section('DoctorRecentAppointmentsView', ttl=15, scope='doctor'),
+        'specialties': Section('SpecialtyListCreateView', ttl=300, scope='global'),
+    },
+    'client': {
+        'profile': Section(user_profile, ttl=60),
+        'appointments': Section('ClientAppointmentListView', ttl=15),
+        'specialties': Section('SpecialtyListCreateView', ttl=300, scope='global'),
+    },
+}
+
+
+class SectionError(Exception):
+    pass
+
+
+def section_key(role, name, scope_id):
+    return f'bootstrap:{role}:{name}:{scope_id}'
+
+
+def appointment_section_keys(doctor_id, client_id):
+    """Cached sections that depend on one appointment's doctor and client."""
+    return [
+        section_key('doctor', 'stats', doctor_id),
+        section_key('doctor', 'recent_appointments', doctor_id),
+        section_key('admin', 'stats', 'global'),
+        section_key('admin', 'activities', 'global'),
+        section_key('client', 'appointments', client_id),
+    ]
+
+
+def profile_section_keys(user_id=None, doctor_id=None):
+    keys = [section_key(role, 'profile', user_id) for role in ('admin', 'client')] if user_id else []
+    if doctor_id:
+        keys.append(section_key('doctor', 'profile', doctor_id))
+    return keys
+
+
+def specialty_section_keys():
+    return [section_key(role, 'specialties', 'global') for role in ROLE_SECTIONS]
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'BOOTSTRAP_WORKERS', 4)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bootstrap')
+    return _executor
+
+
+def section_request(request, params):
+    """``request`` for the same user, with ``params`` as its only query parameters."""
+    http_request = copy.copy(request._request)
+    query = QueryDict(mutable=True)
+    query.update(params)
+    http_request.GET = query
+    http_request.META = {**http_request.META, 'QUERY_STRING': query.urlencode()}
+    new = Request(http_request, parsers=request.parsers, negotiator=request.negotiator)
+    new.user, new.auth = request.user, request.auth
+    return new
+
+
+def render_source(source, request):
+    """Run a section: a plain callable, or the ``get`` handler of an existing API view."""
+    from . import views
+
+    if callable(source):
+        return source(request)
+    view = getattr(views, source)()
+    view.sparse_fields_enabled = False
+    view.request = request
+    view.args, view.kwargs = (), {}
+    view.format_kwarg = None
+    view.headers = {}
+    response = view.get(request)
+    if response.status_code >= 400:
+        raise SectionError(response.data)
+    return response.data
+
+
+def _compute(role, name, section, request, scope_id):
+    key = section_key(role, name, scope_id)
+    if section.ttl:
+        data = cache.get(key)
+        if data is not None:
+            return data
+    data = render_source(section.source, section_request(request, section.params))
+    if section.ttl:
+        cache.set(key, data, timeout=section.ttl)
+    return data
+
+
+def _compute_in_worker(*args):
+    try:
+        return _compute(*args)
+    finally:
+        # Pool threads keep no request cycle; release their connection like one would
+        close_old_connections()
+
+
+def _attempt(func, *args):
+    try:
+        return func(*args), None
+    except Exception as e:
+        return None, e
+
+
+def build_bootstrap(request, role, doctor_id=None, only=None):
+    """``{'sections': {...}, 'errors': {...}}`` for ``role``; ``only`` limits the section names."""
+    sections = ROLE_SECTIONS[role]
+    names = [name for name in sections if only is None or name in only]
+    scope_ids = {'user': request.user.pk, 'doctor': doctor_id, 'global': 'global'}
+
+    if getattr(settings, 'BOOTSTRAP_WORKERS', 4) > 1 and len(names) > 1:
+        futures = {
+            name: _get_executor().submit(_attempt, _compute_in_worker, role, name, sections[name], request,
+                                         scope_ids[sections[name].scope])
+            for name in names
+        }
+        outcomes = {name: future.result() for name, future in futures.items()}
+    else:
+        outcomes = {
+            name: _attempt(_compute, role, name, sections[name], request, scope_ids[sections[name].scope])
+            for name in names
+        }
+
+    results, errors = {}, {}
+    for name, (data, error) in outcomes.items():
+        if error is None:
+            results[name] = data
+        elif isinstance(error, SectionError):
+            errors[name] = error.args[0]
+        else:
+            logger.exception("Bootstrap section %s/%s failed", role, name, exc_info=error)
+            errors[name] = 'Erreur interne du serveur'
+    return {'role': role, 'sections': results, 'errors': errors}
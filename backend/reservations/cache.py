@@ -0,0 +1,333 @@
+"""
+Two-level cache: a bounded in-process LRU in front of a shared cache.
+
+Configure it as the ``default`` cache with the shared backend as another
+alias::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'reservations.cache.TwoLevelCache',
+            'OPTIONS': {'SHARED_ALIAS': 'shared', 'LOCAL_MAX_ENTRIES': 2048, 'LOCAL_TIMEOUT': 60},
+        },
+        'shared': {...},   # Redis in production, file-based locally
+    }
+
+Hits on the local level cost no network hop. Every key has a version
+stamp in the shared cache. ``delete()`` and ``clear()`` replace the stamp,
+and other processes drop their local copy the next time they check the
+stamp. A process checks a key's stamp, and that the shared value has not
+expired, at most once every ``VERSION_CHECK_INTERVAL`` seconds, which
+bounds how stale a local hit can be. ``set()`` writes through and leaves
+the stamp alone: invalidate a changed value with ``delete()``.
+
+Stamps expire too: ``LOCAL_TIMEOUT`` after their entry, or
+``LOCAL_TIMEOUT + VERSION_CHECK_INTERVAL`` after a ``delete()``, long
+enough for every local copy to be dropped. A missing stamp never matches a
+local copy, so an early expiry only costs a shared read.
+
+``stats()`` returns per-process hit/miss counters.
+
+``single_flight()`` serves expensive aggregates (admin stats, specialties,
+the doctor list) from the shared level with stale-while-revalidate: when a
+value expires, one request recomputes it under a lock while the others keep
+getting the previous value.
+"""
+import math
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils import timezone
+
+_MISSING = object()
+VERSION_SUFFIX = ':__v'
+
+# Django builds one cache instance per thread; the local level must be per process
+_process_state = {}
+_process_state_lock = threading.Lock()
+
+
+def _get_process_state(name):
+    with _process_state_lock:
+        if name not in _process_state:
+            _process_state[name] = (
+                OrderedDict(),
+                threading.Lock(),
+                dict.fromkeys(('local_hits', 'shared_hits', 'misses', 'sets', 'invalidations', 'stale_drops', 'evictions'), 0),
+            )
+        return _process_state[name]
+
+
+class TwoLevelCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._max_entries = options.get('LOCAL_MAX_ENTRIES', 1024)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._check_interval = options.get('VERSION_CHECK_INTERVAL', 1.0)
+        # key -> (pickled value, version stamp, local expiry, last stamp check)
+        self._local, self._lock, self._stats = _get_process_state(location or self._shared_alias)
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # --- local level ---
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _local_get(self, key, now):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING, None, False
+            value, stamp, expires, checked = entry
+            if expires <= now:
+                del self._local[key]
+                return _MISSING, None, False
+            self._local.move_to_end(key)
+            return value, stamp, now - checked >= self._check_interval
+
+    def _local_set(self, key, value, stamp, timeout, now):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        local_timeout = self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+        with self._lock:
+            self._local[key] = (pickled, stamp, now + local_timeout, now)
+            self._local.move_to_end(key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _local_mark_checked(self, key, now):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local[key] = entry[:3] + (now,)
+
+    def _local_discard(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _stamp_timeout(self, timeout):
+        """A stamp outlives its entry by the longest a local copy of it can live."""
+        return None if timeout is None else math.ceil(timeout + self._local_timeout)
+
+    def _stamp(self, key, timeout):
+        """Current version stamp of ``key``, created if missing (e.g. after a shared flush)."""
+        stamp_key = key + VERSION_SUFFIX
+        stamp_timeout = self._stamp_timeout(timeout)
+        stamp = self.shared.get(stamp_key)
+        if stamp is None:
+            self.shared.add(stamp_key, uuid.uuid4().hex, timeout=stamp_timeout)
+            stamp = self.shared.get(stamp_key)
+        else:
+            self.shared.touch(stamp_key, timeout=stamp_timeout)
+        return stamp
+
+    def _restamp(self, key):
+        """New stamp after an invalidation; it only has to outlive the local copies of the old value."""
+        timeout = math.ceil(self._local_timeout + self._check_interval)
+        self.shared.set(key + VERSION_SUFFIX, uuid.uuid4().hex, timeout=timeout)
+
+    # --- cache API ---
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.monotonic()
+        pickled, stamp, needs_check = self._local_get(key, now)
+        if pickled is not _MISSING:
+            if not needs_check:
+                self._count('local_hits')
+                return pickle.loads(pickled)
+            # The stamp outlives the value: also make sure the shared value has not expired
+            if self.shared.get(key + VERSION_SUFFIX) == stamp and self.shared.has_key(key):
+                self._local_mark_checked(key, now)
+                self._count('local_hits')
+                return pickle.loads(pickled)
+            self._local_discard(key)
+            self._count('stale_drops')
+
+        found = self.shared.get_many([key, key + VERSION_SUFFIX])
+        if key not in found:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        value = found[key]
+        stamp = found.get(key + VERSION_SUFFIX) or self._stamp(key, self.default_timeout)
+        self._local_set(key, value, stamp, self.default_timeout, now)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        self.shared.set(key, value, timeout=timeout)
+        self._local_set(key, value, self._stamp(key, timeout), timeout, time.monotonic())
+        self._count('sets')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        added = self.shared.add(key, value, timeout=timeout)
+        if added:
+            self._local_set(key, value, self._stamp(key, timeout), timeout, time.monotonic())
+            self._count('sets')
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        touched = self.shared.touch(key, timeout=timeout)
+        if touched:
+            self.shared.touch(key + VERSION_SUFFIX, timeout=self._stamp_timeout(timeout))
+        return touched
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._local_discard(key)
+        deleted = self.shared.delete(key)
+        # New stamp: other processes drop their local copy on their next check
+        self._restamp(key)
+        self._count('invalidations')
+        return deleted
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self.shared.incr(key, delta)
+        self._local_discard(key)
+        self._restamp(key)
+        return value
+
+    def _timeout(self, timeout):
+        # Relative seconds (None = forever), as the shared backend expects them
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, local_entries=len(self._local), local_max_entries=self._max_entries)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+        stats['local_hit_ratio'] = round(stats['local_hits'] / lookups, 4) if lookups else None
+        return stats
+
+
+def cache_stats():
+    """Stats of every configured TwoLevelCache in this process, keyed by alias."""
+    return {
+        alias: caches[alias].stats()
+        for alias in settings.CACHES
+        if isinstance(caches[alias], TwoLevelCache)
+    }
+
+
+# --- Hot lookups ---
+
+
+def hot_lookup_timeout():
+    return getattr(settings, 'HOT_LOOKUP_CACHE_TIMEOUT', 300)
+
+
+def doctor_profile_key(doctor_id):
+    return f'doctor:{doctor_id}:profile'
+
+
+def auth_user_key(user_id):
+    return f'user:{user_id}:auth'
+
+
+# --- Single-flight recomputation ---
+
+ADMIN_STATS_KEY = 'admin:stats'
+SPECIALTIES_KEY = 'specialties:list'
+DOCTOR_LIST_GENERATION_KEY = 'doctors:list:gen'
+
+
+def _shared_cache():
+    # Entries and locks skip the local level: a process-local copy would hide
+    # another process's fresh value or lock
+    default = caches['default']
+    return default.shared if isinstance(default, TwoLevelCache) else default
+
+
+def single_flight(key, compute, timeout, stale_timeout=None, lock_timeout=30, wait=5.0, poll_interval=0.05):
+    """
+    ``compute()``'s value cached under ``key`` for ``timeout`` seconds, with
+    one recomputation at a time across processes.
+
+    The value stays stored ``stale_timeout`` seconds longer (default:
+    ``timeout``). Once it is past ``timeout``, the request that takes the
+    lock (``add()`` in the shared cache) recomputes. Concurrent requests get
+    the stale value meanwhile. On a cold miss, or after
+    ``invalidate_single_flight()``, there is nothing to serve, so other
+    requests wait up to ``wait`` seconds for the holder's value and only
+    compute themselves after that.
+    """
+    stale_timeout = timeout if stale_timeout is None else stale_timeout
+    shared = _shared_cache()
+    entry = shared.get(key)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return entry['value']
+
+    lock_key = key + ':__lock'
+    token = uuid.uuid4().hex
+    if not shared.add(lock_key, token, timeout=lock_timeout):
+        if entry is not None:
+            return entry['value']
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            entry = shared.get(key)
+            if entry is not None:
+                return entry['value']
+        # The holder is too slow or died: compute without the lock rather than fail
+        return compute()
+
+    try:
+        entry = shared.get(key)
+        if entry is not None and entry['fresh_until'] > time.time():
+            # Refreshed by the previous holder between our read and our lock
+            return entry['value']
+        value = compute()
+        shared.set(key, {'value': value, 'fresh_until': time.time() + timeout}, timeout=timeout + stale_timeout)
+        return value
+    finally:
+        if shared.get(lock_key) == token:
+            shared.delete(lock_key)
+
+
+def invalidate_single_flight(*keys):
+    """Drop ``single_flight()`` values; the next request recomputes while the others wait."""
+    _shared_cache().delete_many(keys)
+
+
+def doctor_list_key(host):
+    """
+    Key of the public doctor list for ``host`` (photo URLs are absolute) and
+    today (availability is expanded from today). It embeds a generation, so
+    ``invalidate_doctor_list()`` drops every variant at once.
+    """
+    shared = _shared_cache()
+    generation = shared.get(DOCTOR_LIST_GENERATION_KEY)
+    if generation is None:
+        shared.add(DOCTOR_LIST_GENERATION_KEY, uuid.uuid4().hex[:12], timeout=None)
+        generation = shared.get(DOCTOR_LIST_GENERATION_KEY)
+    return f'doctors:list:{generation}:{timezone.localdate().isoformat()}:{host}'
+
+
+def invalidate_doctor_list():
+    _shared_cache().delete(DOCTOR_LIST_GENERATION_KEY)
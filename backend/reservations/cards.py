@@ -0,0 +1,113 @@
+"""
+Maintenance of the ``DoctorCard`` read model.
+
+Cards are recomputed per doctor from the source rows (doctor, specialty,
+user, upcoming appointments) and upserted in bulk, so the same code path
+serves single-row signal updates and full rebuilds.
+
+``next_available_slot`` goes stale as time passes without any write to
+signal it: ``refresh_stale_doctor_cards()`` recomputes the cards whose slot
+is in the past (beat task ``refresh_stale_doctor_cards_task``).
+"""
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .availability import MAX_WINDOW_DAYS, iter_availability
+from .models import Appointment, AppointmentArchive, Doctor, DoctorCard
+
+
+def parse_slot(date_str, time_str):
+    try:
+        day = datetime.strptime(date_str, "%Y-%m-%d").date()
+        hour, minute = (int(part) for part in time_str.split(':')[:2])
+        return timezone.make_aware(datetime.combine(day, dt_time(hour, minute)))
+    except (ValueError, TypeError):
+        return None
+
+
+def next_free_slot(availability, booked, now=None, rules=None):
+    """
+    First slot of ``availability`` ({date: [HH:MM]}) and the recurring
+    ``rules`` after ``now`` that is not in ``booked``. Rules are expanded
+    lazily, so this stops at the first free week.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    for date_str, times in iter_availability(availability, rules, today, today + timedelta(days=MAX_WINDOW_DAYS)):
+        for time_str in times:
+            slot = parse_slot(date_str, time_str)
+            if slot is not None and slot > now and slot not in booked:
+                return slot
+    return None
+
+
+def refresh_doctor_cards(doctor_ids=None):
+    """Recompute and upsert the cards of ``doctor_ids`` (all doctors when None). Returns the count."""
+    now = timezone.now()
+    doctors = Doctor.objects.select_related('specialization', 'user').annotate(
+        total_appointments=Count('doctor_appointments'),
+        upcoming_appointments=Count(
+            'doctor_appointments',
+            filter=Q(doctor_appointments__date_time__gte=now) & ~Q(doctor_appointments__status='annulé'),
+        ),
+    )
+    if doctor_ids is not None:
+        doctor_ids = list(doctor_ids)
+        if not doctor_ids:
+            return 0
+        doctors = doctors.filter(id__in=doctor_ids)
+    doctors = list(doctors)
+
+    # Archived history counts, grouped separately (a second Count() annotation would multiply joins)
+    archived = dict(
+        AppointmentArchive.objects.filter(doctor_id__in=[d.id for d in doctors])
+        .values('doctor_id').annotate(n=Count('id')).values_list('doctor_id', 'n')
+    )
+
+    booked = {}
+    upcoming = Appointment.objects.filter(doctor_id__in=[d.id for d in doctors], date_time__gte=now).exclude(status='annulé')
+    for doctor_id, date_time in upcoming.values_list('doctor_id', 'date_time'):
+        booked.setdefault(doctor_id, set()).add(date_time)
+
+    cards = [
+        DoctorCard(
+            doctor_id=doctor.id,
+            first_name=doctor.first_name,
+            last_name=doctor.last_name,
+            email=doctor.email,
+            phone=doctor.phone,
+            city=doctor.city,
+            bio=doctor.bio,
+            specialty_id=doctor.specialization_id,
+            specialty_name=doctor.specialization.name if doctor.specialization else '',
+            consultation_fee=doctor.consultation_fee,
+            photo_variants=doctor.photo_variants,
+            is_active=doctor.user.is_active if doctor.user else True,
+            date_joined=doctor.user.date_joined if doctor.user else None,
+            next_available_slot=next_free_slot(doctor.availability, booked.get(doctor.id, set()), now, doctor.availability_rules),
+            appointment_count=doctor.total_appointments + archived.get(doctor.id, 0),
+            upcoming_appointment_count=doctor.upcoming_appointments,
+        )
+        for doctor in doctors
+    ]
+    update_fields = [f.name for f in DoctorCard._meta.concrete_fields if f.name != 'doctor']
+    DoctorCard.objects.bulk_create(cards, update_conflicts=True, unique_fields=['doctor'], update_fields=update_fields)
+    return len(cards)
+
+
+def rebuild_doctor_cards(batch_size=500):
+    """Rebuild every card in batches and drop orphans; returns the number of cards written."""
+    written = 0
+    ids = list(Doctor.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), batch_size):
+        written += refresh_doctor_cards(ids[start:start + batch_size])
+    DoctorCard.objects.exclude(doctor_id__in=Doctor.objects.values('id')).delete()
+    return written
+
+
+def refresh_stale_doctor_cards():
+    """Cards whose next slot has passed need a new one."""
+    stale = DoctorCard.objects.filter(next_available_slot__lt=timezone.now()).values_list('doctor_id', flat=True)
+    return refresh_doctor_cards(list(stale))
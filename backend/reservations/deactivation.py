@@ -0,0 +1,240 @@
+"""
+Consequences of deactivating (or reactivating) a doctor.
+
+``toggle_doctor_active()`` flips the login in the request and queues a
+``DoctorStatusJob`` that runs in the background once the request commits:
+
+1. ``apply``: on deactivation, every future ``pending``/``confirmé``
+   appointment of the doctor becomes ``annulé`` with a single UPDATE
+   (``bulk_transition_status``), which frees the slots. The previous statuses
+   are kept on the job. On reactivation, the appointments cancelled by the
+   last deactivation go back to those statuses, except past ones and slots
+   booked again in the meantime.
+2. ``notify``: the patients concerned are e-mailed one message at a time
+   over one SMTP connection, rows being read in chunks. Progress is saved
+   after every message, so a retried job resumes at the message that failed.
+   At most that one message can go out twice, when the server accepted it
+   but the worker died before saving. Addresses the server refuses for good
+   are counted and skipped.
+
+A job whose worker died is picked up again by ``resume_doctor_status_jobs()``
+(beat task).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from . import activity
+from .models import Appointment, DoctorStatusJob
+from .reminders import permanently_refused
+from .services import bulk_transition_status
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 5
+CANCELLED = 'annulé'
+CANCELLABLE = ['pending', 'confirmé']
+
+NOTIFICATIONS = {
+    'deactivate': (
+        "Annulation de votre rendez-vous du {date} à {time}",
+        "Bonjour {client_name},\n\n"
+        "Dr. {doctor_name} n'est plus disponible : votre rendez-vous du {date} à {time} est annulé.\n"
+        "Vous pouvez réserver un nouveau créneau depuis votre espace patient.\n\n"
+        "L'équipe Cura-time",
+    ),
+    'reactivate': (
+        "Votre rendez-vous du {date} à {time} est rétabli",
+        "Bonjour {client_name},\n\n"
+        "Dr. {doctor_name} est de nouveau disponible : votre rendez-vous du {date} à {time} est rétabli.\n\n"
+        "L'équipe Cura-time",
+    ),
+}
+
+ROW_FIELDS = ('id', 'date_time', 'client__email', 'client__first_name', 'client__last_name',
+              'doctor__first_name', 'doctor__last_name')
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='doctor-status')
+    return _executor
+
+
+def _run_in_worker(job_id):
+    try:
+        run_doctor_status_job(job_id)
+    except Exception:
+        logger.exception("Doctor status job %s failed; it will be resumed by resume_doctor_status_jobs()", job_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_doctor_status_job(job_id):
+    """Run the job once the surrounding transaction commits."""
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, job_id))
+
+
+@transaction.atomic
+def toggle_doctor_active(doctor, actor=None):
+    """Flip the doctor's login; returns ``(is_active, job)``."""
+    user = doctor.user
+    user.is_active = not user.is_active
+    user.save()
+    activity.doctor_active_changed(doctor, user.is_active, actor=actor)
+    job = DoctorStatusJob.objects.create(
+        doctor=doctor, action='reactivate' if user.is_active else 'deactivate',
+        requested_by_id=getattr(actor, 'pk', None),
+    )
+    schedule_doctor_status_job(job.pk)
+    return user.is_active, job
+
+
+def _claim(job_id):
+    now = timezone.now()
+    return DoctorStatusJob.objects.filter(
+        Q(lease_until__isnull=True) | Q(lease_until__lt=now),
+        pk=job_id, status__in=['pending', 'running'],
+    ).update(status='running', lease_until=now + timedelta(seconds=LEASE_SECONDS), attempts=F('attempts') + 1) == 1
+
+
+def _save(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    DoctorStatusJob.objects.filter(pk=job.pk).update(updated_at=timezone.now(), **fields)
+
+
+def _cancel_future(job):
+    with transaction.atomic():
+        if job.doctor.user_id and job.doctor.user.is_active:
+            # Reactivated before this job ran: nothing to cancel, nobody to e-mail
+            _save(job, step='notify', progress={'total': 0, 'cancelled': 0, 'skipped': 'reactivated'})
+            return
+        upcoming = Appointment.objects.filter(doctor_id=job.doctor_id, date_time__gt=timezone.now())
+        updated_ids, outcomes = bulk_transition_status(upcoming, CANCELLED, allowed_from=CANCELLABLE)
+        cancelled = {str(pk): outcomes[pk]['previous'] for pk in updated_ids}
+        _save(job, step='notify', appointments=cancelled,
+              progress={'total': len(cancelled), 'cancelled': len(cancelled), 'notified': 0})
+
+
+def _restore_cancelled(job):
+    source = (
+        DoctorStatusJob.objects.filter(doctor_id=job.doctor_id, action='deactivate', created_at__lt=job.created_at)
+        .order_by('-created_at', '-id').first()
+    )
+    if source is not None and source.status != 'done':
+        # Deactivation still in flight (e.g. a quick toggle): let it finish first
+        if run_doctor_status_job(source.pk) != 'done':
+            raise RuntimeError(f"Deactivation job {source.pk} is not finished yet")
+        source.refresh_from_db()
+    previous = source.appointments if source is not None else {}
+
+    with transaction.atomic():
+        rebooked = Appointment.objects.filter(
+            doctor_id=OuterRef('doctor_id'), date_time=OuterRef('date_time'),
+        ).exclude(status=CANCELLED)
+        restorable = Appointment.objects.filter(
+            id__in=[int(pk) for pk in previous], status=CANCELLED, date_time__gt=timezone.now(),
+        ).exclude(Exists(rebooked))
+        restored = {}
+        # One UPDATE per status the appointments had before
+        for old_status in CANCELLABLE:
+            ids = [int(pk) for pk, value in previous.items() if value == old_status]
+            if ids:
+                updated_ids, _ = bulk_transition_status(restorable, old_status, ids=ids, allowed_from=[CANCELLED])
+                restored.update({str(pk): old_status for pk in updated_ids})
+        _save(job, step='notify', appointments=restored, progress={
+            'total': len(restored), 'restored': len(restored),
+            'not_restored': len(previous) - len(restored), 'notified': 0,
+        })
+
+
+def _render(row, action, from_email):
+    local = timezone.localtime(row[1])
+    values = {
+        'client_name': f"{row[3]} {row[4]}".strip() or row[2],
+        'doctor_name': f"{row[5]} {row[6]}".strip(),
+        'date': local.strftime('%d/%m/%Y'),
+        'time': local.strftime('%H:%M'),
+    }
+    subject, body = NOTIFICATIONS[action]
+    return EmailMessage(subject=subject.format(**values), body=body.format(**values), from_email=from_email, to=[row[2]])
+
+
+def _notify(job):
+    chunk_size = getattr(settings, 'DOCTOR_STATUS_NOTIFY_CHUNK_SIZE', 200)
+    from_email = getattr(settings, 'REMINDER_FROM_EMAIL', None) or settings.EMAIL_HOST_USER
+    ids = sorted(int(pk) for pk in job.appointments)
+    progress = dict(job.progress)
+    done = progress.get('notified', 0)
+    if done >= len(ids):
+        return
+
+    connection = get_connection(fail_silently=False)
+    connection.open()
+    try:
+        while done < len(ids):
+            chunk = ids[done:done + chunk_size]
+            rows = {row[0]: row for row in Appointment.objects.filter(id__in=chunk).values_list(*ROW_FIELDS)}
+            for pk in chunk:
+                row = rows.get(pk)
+                if row is not None and row[2]:
+                    try:
+                        connection.send_messages([_render(row, job.action, from_email)])
+                    except Exception as e:
+                        if not permanently_refused(e):
+                            raise  # progress stops before this message: the retry starts with it
+                        progress['refused'] = progress.get('refused', 0) + 1
+                done += 1
+                progress['notified'] = done
+                _save(job, progress=progress, lease_until=timezone.now() + timedelta(seconds=LEASE_SECONDS))
+    finally:
+        connection.close()
+
+
+def run_doctor_status_job(job_id):
+    """Advance one job to the end; returns 'done', or None when another worker holds it or it is finished."""
+    if not _claim(job_id):
+        return None
+    job = DoctorStatusJob.objects.select_related('doctor__user').get(pk=job_id)
+    try:
+        if job.step != 'notify' and job.action == 'deactivate':
+            _cancel_future(job)
+        elif job.step != 'notify':
+            _restore_cancelled(job)
+        _notify(job)
+    except Exception as e:
+        _save(job, error=f'{type(e).__name__}: {e}'[:2000], lease_until=None)
+        DoctorStatusJob.objects.filter(pk=job.pk, attempts__gte=MAX_ATTEMPTS).update(status='failed')
+        raise
+    _save(job, status='done', lease_until=None, error='', finished_at=timezone.now())
+    logger.info("Doctor #%s %s: %s", job.doctor_id, job.action, job.progress)
+    return 'done'
+
+
+def resume_doctor_status_jobs():
+    """Run pending jobs and running ones whose worker lost its lease, oldest first."""
+    now = timezone.now()
+    stats = {'done': 0, 'failed': 0, 'skipped': 0}
+    open_jobs = DoctorStatusJob.objects.filter(
+        Q(lease_until__isnull=True) | Q(lease_until__lt=now), status__in=['pending', 'running'],
+    ).order_by('created_at', 'id').values_list('pk', flat=True)
+    for job_id in list(open_jobs):
+        try:
+            result = run_doctor_status_job(job_id)
+        except Exception:
+            logger.exception("Doctor status job %s failed", job_id)
+            stats['failed'] += 1
+            continue
+        stats['done' if result == 'done' else 'skipped'] += 1
+    return stats
@@ -0,0 +1,44 @@
+"""
+Lazy access to drf_yasg.
+
+With ``API_DOCS_ENABLED`` off (the production default) drf_yasg is never
+imported: ``swagger_auto_schema`` is a no-op decorator and ``openapi`` a
+stub that swallows every call, so the schema declarations in
+``views.py`` cost nothing at import time. The OpenAPI document is instead
+generated at build time (``manage.py generate_openapi``) and served as a
+static file.
+"""
+from django.conf import settings
+
+
+def docs_enabled():
+    return getattr(settings, 'API_DOCS_ENABLED', False)
+
+
+class _OpenAPIStub:
+    """Stands in for ``drf_yasg.openapi``: any attribute or call returns the stub itself."""
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+
+if docs_enabled():
+    from drf_yasg import openapi
+    from drf_yasg.utils import swagger_auto_schema
+else:
+    openapi = _OpenAPIStub()
+
+    def swagger_auto_schema(*args, **kwargs):
+        return lambda view: view
+
+
+def get_api_info():
+    return openapi.Info(
+        title="Appointment Booking API",
+        default_version='v1',
+        description="API documentation for the Appointment Booking System",
+        contact=openapi.Contact(email="you@example.com"),
+    )
@@ -0,0 +1,317 @@
+"""
+Live appointment events over Server-Sent Events.
+
+Model signals publish small JSON events to a broker; the SSE endpoint
+(``sse_application``, mounted directly in ``PPG/asgi.py``) subscribes one
+bounded ``asyncio.Queue`` per connection. An idle connection is just a
+pending ``await`` on that queue, so thousands of them cost a few KB each.
+
+The default ``InProcessBroker`` only fans out inside one process. Set
+``APPOINTMENT_EVENTS_BACKEND = 'reservations.events.RedisBroker'`` to fan
+out across several ASGI workers/nodes through Redis pub/sub.
+
+Channels: ``admin`` receives every event, ``doctor:<id>`` only that
+doctor's appointments. Every stream also listens on ``user:<id>``, where
+deactivating or deleting the user publishes ``stream.revoked``.
+
+EventSource cannot send an ``Authorization`` header, and a token in the
+URL ends up in proxy and access logs. Clients therefore first exchange
+their access token for a stream ticket (``POST /api/events/appointments/ticket/``).
+The ticket is random, lives ``STREAM_TICKET_TTL`` seconds and works once.
+A stream ends when the access token it was opened with expires, or when
+the user is deactivated (the revocation event, so idle streams never query
+the database). The client then asks for a new ticket.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SSE_PATH = '/api/events/appointments/'
+HEARTBEAT_SECONDS = 20
+QUEUE_SIZE = 100
+STREAM_TICKET_TTL = 30
+STREAM_REVOKED = 'stream.revoked'
+
+_event_ids = itertools.count(1)
+
+
+def doctor_channel(doctor_id):
+    return f'doctor:{doctor_id}'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class Subscription:
+    def __init__(self, loop, channels, maxsize=QUEUE_SIZE):
+        self.loop = loop
+        self.channels = channels
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event):
+        # Runs on the subscriber's loop; slow consumers lose events rather than grow unbounded
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+class InProcessBroker:
+    """Fan-out between threads (signal handlers) and event loops (SSE connections) of one process."""
+
+    def __init__(self, **options):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(asyncio.get_running_loop(), channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        self.dispatch(channel, event)
+
+    def dispatch(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Loop already closed; the connection is going away
+                pass
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes through Redis pub/sub so every worker sees every event. Each
+    process keeps a single pattern subscription and fans out locally.
+    """
+
+    def __init__(self, url='redis://localhost:6379/1', prefix='appointments:', **options):
+        super().__init__(**options)
+        import redis
+
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._listeners = {}
+
+    def subscribe(self, channels):
+        loop = asyncio.get_running_loop()
+        if loop not in self._listeners:
+            self._listeners[loop] = loop.create_task(self._listen())
+        return super().subscribe(channels)
+
+    def publish(self, channel, event):
+        self._client.publish(self.prefix + channel, json.dumps(event))
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        while True:
+            try:
+                client = aioredis.Redis.from_url(self.url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(self.prefix + '*')
+                    async for message in pubsub.listen():
+                        if message['type'] != 'pmessage':
+                            continue
+                        channel = message['channel'].decode()[len(self.prefix):]
+                        self.dispatch(channel, json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis event listener failed, reconnecting")
+                await asyncio.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'APPOINTMENT_EVENTS_BACKEND', 'reservations.events.InProcessBroker')
+                options = getattr(settings, 'APPOINTMENT_EVENTS_OPTIONS', {})
+                _broker = import_string(backend)(**options)
+    return _broker
+
+
+def publish_appointment_event(event_type, appointment_id, doctor_id, status):
+    event = {
+        'type': event_type,
+        'appointment_id': appointment_id,
+        'doctor_id': doctor_id,
+        'status': status,
+    }
+    broker = get_broker()
+    try:
+        broker.publish('admin', event)
+        broker.publish(doctor_channel(doctor_id), event)
+    except Exception:
+        # Live updates are best-effort; never fail the write that triggered them
+        logger.exception("Could not publish appointment event")
+
+
+def publish_stream_revoked(user_id):
+    """Close the open streams of a user who was deactivated or deleted."""
+    try:
+        get_broker().publish(user_channel(user_id), {'type': STREAM_REVOKED, 'user_id': user_id})
+    except Exception:
+        logger.exception("Could not publish stream revocation")
+
+
+def format_sse(event):
+    return f"id: {next(_event_ids)}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+def _ticket_key(ticket):
+    return f'sse:ticket:{ticket}'
+
+
+def issue_stream_ticket(user, expires_at):
+    """Single-use ticket opening one stream for ``user`` until ``expires_at`` (epoch seconds)."""
+    from django.core.cache import cache
+
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_ticket_key(ticket), {'user_id': user.pk, 'expires_at': expires_at}, timeout=STREAM_TICKET_TTL)
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """``(user_id, expires_at)`` of a valid ticket, which can't be used again; None otherwise."""
+    from django.core.cache import cache
+
+    if not ticket:
+        return None
+    data = cache.get(_ticket_key(ticket))
+    # Only the request whose delete() removed the ticket may use it
+    if data is None or not cache.delete(_ticket_key(ticket)):
+        return None
+    if data['expires_at'] <= time.time():
+        return None
+    return data['user_id'], data['expires_at']
+
+
+def resolve_channels(user_id):
+    """Channels the user may listen to, besides their own ``user:<id>`` (empty if none)."""
+    from .models import Doctor, User
+
+    user = User.objects.filter(pk=user_id, is_active=True, deleted_at__isnull=True).first()
+    if user is None:
+        return []
+    if user.user_role == 'admin':
+        return ['admin']
+    if user.user_role == 'doctor':
+        doctor_id = Doctor.objects.filter(email=user.email).values_list('id', flat=True).first()
+        return [doctor_channel(doctor_id)] if doctor_id else []
+    return []
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def sse_application(scope, receive, send):
+    """
+    Raw ASGI handler for ``GET /api/events/appointments/?ticket=<stream ticket>``.
+    The stream ends when the access token behind the ticket expires or the
+    user's streams are revoked.
+    """
+    from asgiref.sync import sync_to_async
+    from django.db import close_old_connections
+
+    cors = [(b'access-control-allow-origin', b'*')]
+    query = parse_qs(scope.get('query_string', b'').decode())
+    ticket = (query.get('ticket') or [None])[0]
+
+    def _in_db(func, *args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    def _open():
+        redeemed = redeem_stream_ticket(ticket)
+        if redeemed is None:
+            return None, [], None
+        user_id, expires_at = redeemed
+        return user_id, resolve_channels(user_id), expires_at
+
+    # Not thread-sensitive: this runs outside Django's request handling, nothing needs the shared thread
+    user_id, channels, expires_at = await sync_to_async(_in_db, thread_sensitive=False)(_open)
+    if not channels:
+        await send({'type': 'http.response.start', 'status': 401,
+                    'headers': [(b'content-type', b'application/json')] + cors})
+        await send({'type': 'http.response.body', 'body': b'{"error": "Authentification requise"}'})
+        return
+
+    broker = get_broker()
+    subscription = broker.subscribe(channels + [user_channel(user_id)])
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ] + cors,
+    })
+    await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    next_event = asyncio.ensure_future(subscription.queue.get())
+    try:
+        while True:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait({disconnect, next_event}, timeout=min(HEARTBEAT_SECONDS, remaining),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                return
+            if next_event in done:
+                event = next_event.result()
+                if event['type'] == STREAM_REVOKED:
+                    break
+                body = format_sse(event)
+                next_event = asyncio.ensure_future(subscription.queue.get())
+            elif time.time() >= expires_at:
+                break
+            else:
+                body = b': ping\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        # Token expired or user deactivated: the client must get a new ticket to reconnect
+        await send({'type': 'http.response.body', 'body': b'event: stream.expired\ndata: {}\n\n', 'more_body': False})
+    finally:
+        broker.unsubscribe(subscription)
+        next_event.cancel()
+        disconnect.cancel()
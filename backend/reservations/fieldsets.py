@@ -0,0 +1,158 @@
+"""
+Sparse fieldsets and field expansion for read endpoints.
+
+Views using ``SparseFieldsViewMixin`` accept, on GET:
+
+* ``?fields=id,date_time,doctor.last_name``: keep only these fields (dotted
+  paths reach into nested serializers; ``doctor`` alone keeps all of it),
+* ``?omit=doctor.availability,doctor.bio``: drop these fields,
+* ``?expand=specialization``: replace a foreign key id with the nested
+  object, for the fields a serializer lists in ``expandable_fields``.
+
+Unknown names are ignored. The serializer's final shape also decides the
+queryset: ``select_related()`` for nested objects, and ``.only()`` with the
+columns the remaining fields read. Fewer fields means fewer columns read
+and a smaller response. If a field's columns can't be derived (a method
+field without ``sparse_requires``, or a reverse relation), the queryset is
+left untouched.
+"""
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+SparseSpec = namedtuple('SparseSpec', ['fields', 'omit', 'expand'])
+
+
+def parse_paths(value):
+    """``'a,b.c,b.d'`` -> ``{'a': {}, 'b': {'c': {}, 'd': {}}}``."""
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def parse_sparse(query_params):
+    """SparseSpec from ``?fields=&omit=&expand=``, or None when none is given."""
+    if not any(query_params.get(name) for name in SparseSpec._fields):
+        return None
+    fields = query_params.get('fields')
+    return SparseSpec(
+        fields=parse_paths(fields) if fields else None,
+        omit=parse_paths(query_params.get('omit')),
+        expand=parse_paths(query_params.get('expand')),
+    )
+
+
+class SparseFieldsMixin:
+    """
+    Serializer side. ``expandable_fields`` maps a field name to
+    ``(serializer class, kwargs)`` used when it is expanded;
+    ``sparse_requires`` maps fields without a plain model source (method
+    fields, fields read in ``to_representation``) to the model fields they use.
+    """
+    expandable_fields = {}
+    sparse_requires = {}
+
+    def _sparse_spec(self):
+        spec = getattr(self, '_nested_sparse_spec', None)
+        if spec is not None:
+            return spec
+        parent = self.parent
+        is_root = parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+        return self.context.get('sparse_fields') if is_root else None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        spec = self._sparse_spec()
+        if spec is None:
+            return fields
+
+        for name, (serializer_class, kwargs) in self.expandable_fields.items():
+            if name in spec.expand and name in fields:
+                fields[name] = serializer_class(read_only=True, **kwargs)
+        if spec.fields is not None:
+            fields = {name: field for name, field in fields.items() if name in spec.fields}
+        for name, children in spec.omit.items():
+            if not children:
+                fields.pop(name, None)
+
+        for name, field in fields.items():
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested, SparseFieldsMixin):
+                nested._nested_sparse_spec = SparseSpec(
+                    fields=(spec.fields.get(name) or None) if spec.fields is not None else None,
+                    omit=spec.omit.get(name, {}),
+                    expand=spec.expand.get(name, {}),
+                )
+        return fields
+
+
+def queryset_shape(serializer, prefix=''):
+    """
+    ``(only, select_related)`` field paths that ``serializer`` reads, or
+    None when they can't be derived.
+    """
+    model = serializer.Meta.model
+    only, related = {prefix + model._meta.pk.name}, set()
+    requires = getattr(serializer, 'sparse_requires', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in requires:
+            only.update(prefix + path for path in requires[name])
+            continue
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        if isinstance(field, serializers.BaseSerializer):
+            if isinstance(field, serializers.ListSerializer):
+                return None
+            nested = queryset_shape(field, prefix + field.source + '__')
+            if nested is None:
+                return None
+            only |= nested[0]
+            related |= {prefix + field.source} | nested[1]
+        else:
+            only.add(prefix + field.source)
+    return only, related
+
+
+class SparseFieldsViewMixin:
+    """Generic view side: passes the spec to the serializer and prunes GET querysets to match."""
+
+    # Off when the view renders a shared payload (bootstrap sections): the caller's params must not shape it
+    sparse_fields_enabled = True
+
+    def get_sparse_spec(self):
+        if not hasattr(self, '_sparse_spec'):
+            request = self.request
+            enabled = self.sparse_fields_enabled and request is not None and request.method == 'GET'
+            self._sparse_spec = parse_sparse(request.query_params) if enabled else None
+        return self._sparse_spec
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fields'] = self.get_sparse_spec()
+        return context
+
+    def filter_queryset(self, queryset):
+        # Views override get_queryset(); list() and get_object() all pass through here
+        queryset = super().filter_queryset(queryset)
+        if self.request is None or self.request.method != 'GET':
+            return queryset
+        shape = queryset_shape(self.get_serializer())
+        if shape is None:
+            return queryset
+        only, related = shape
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        return queryset.only(*sorted(only))
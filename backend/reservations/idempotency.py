@@ -0,0 +1,124 @@
+"""
+``Idempotency-Key`` support for retry-prone POST endpoints.
+
+A client that sends ``Idempotency-Key: <unique value>`` gets the response of
+the first request replayed for every retry with the same key, without the
+view running again. The key is claimed by inserting an ``IdempotencyKey``
+row before the view runs; the unique constraint makes concurrent duplicates
+lose that race and receive ``409`` until the first request finishes.
+
+The claim is a lease: it holds the key for ``IDEMPOTENCY_LOCK_SECONDS``.
+When the worker dies mid-request (OOM, SIGKILL, deploy), the first retry
+after the lease expires takes the key over and runs the view, instead of
+every retry getting ``409`` until the key expires.
+
+Keys are scoped per user (or shared by anonymous callers) and kept for
+``IDEMPOTENCY_KEY_TTL`` seconds. A key reused with a different request body
+is rejected with ``422``.
+"""
+import functools
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_LOCK_SECONDS = 60
+
+
+def request_scope(request):
+    user = request.user
+    return f'user:{user.pk}' if user.is_authenticated else 'anonymous'
+
+
+def request_fingerprint(request):
+    """Keyed hash of method, path and body, so stored fingerprints reveal nothing about the payload."""
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return salted_hmac('reservations.idempotency', f'{request.method} {request.path}\n{body}').hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """Decorator for an APIView ``post`` handler; a no-op when the header is absent."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f"Idempotency-Key trop long (maximum {MAX_KEY_LENGTH} caractères)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        now = timezone.now()
+        scope = request_scope(request)
+        fingerprint = request_fingerprint(request)
+        ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL)
+        locked_until = now + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', DEFAULT_LOCK_SECONDS))
+
+        IdempotencyKey.objects.filter(scope=scope, key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    scope=scope, key=key, fingerprint=fingerprint, locked_until=locked_until,
+                    expires_at=now + timedelta(seconds=ttl),
+                )
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+            if existing is None:
+                # The other request failed and released the key in the meantime
+                return Response({'error': "Requête en cours, réessayez"}, status=status.HTTP_409_CONFLICT,
+                                headers={'Retry-After': '1'})
+            if existing.fingerprint != fingerprint:
+                return Response(
+                    {'error': "Idempotency-Key déjà utilisée pour une requête différente"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if existing.status_code is not None:
+                return _replay(existing)
+            # Take over a claim whose worker died (claims from before leases have none); the
+            # conditional update lets a single retry win
+            held = {'locked_until': existing.locked_until} if existing.locked_until else {'locked_until__isnull': True}
+            if (existing.locked_until and existing.locked_until > now) or not IdempotencyKey.objects.filter(
+                pk=existing.pk, status_code__isnull=True, **held,
+            ).update(locked_until=locked_until):
+                return Response({'error': "Requête en cours, réessayez"}, status=status.HTTP_409_CONFLICT,
+                                headers={'Retry-After': '1'})
+            record = existing
+
+        # Only while we still hold the claim: a slow request must not undo a retry that took it over
+        claim = IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True, locked_until=locked_until)
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            claim.delete()
+            raise
+        if response.status_code >= 500:
+            # Server errors are not final: let the client retry with the same key
+            claim.delete()
+        else:
+            claim.update(status_code=response.status_code, response_body=response.data, locked_until=None)
+        return response
+
+    return wrapper
+
+
+def purge_expired_idempotency_keys():
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,144 @@
+"""
+Doctor photo processing.
+
+Uploaded photos are kept as-is, and small WebP variants are generated from
+them in a background thread pool so the upload request never waits on
+image decoding. Variant filenames embed a hash of their content, which lets
+them be served with a far-future immutable ``Cache-Control`` header.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+logger = logging.getLogger(__name__)
+
+# name -> (width, height); variants are center-cropped to the exact box
+DEFAULT_PHOTO_VARIANTS = {
+    'thumb': (96, 96),
+    'card': (320, 320),
+}
+VARIANTS_DIR = 'doctors/variants'
+WEBP_QUALITY = 80
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+_executor = None
+
+
+def get_photo_variants():
+    return getattr(settings, 'DOCTOR_PHOTO_VARIANTS', DEFAULT_PHOTO_VARIANTS)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'DOCTOR_PHOTO_WORKERS', 2)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='photo-variants')
+    return _executor
+
+
+def render_variant(image, size):
+    """Return WebP bytes of ``image`` cropped and resized to ``size``."""
+    from PIL import ImageOps
+
+    variant = ImageOps.fit(image, size)
+    if variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGB')
+    buffer = io.BytesIO()
+    variant.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def generate_photo_variants(doctor):
+    """
+    Build every configured variant for ``doctor.photo`` and return a
+    ``{name: storage_path}`` mapping. Existing files with the same content
+    hash are reused rather than rewritten.
+    """
+    from PIL import Image, ImageOps
+
+    if not doctor.photo:
+        return {}
+
+    with doctor.photo.open('rb') as fh:
+        image = Image.open(fh)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    variants = {}
+    for name, size in get_photo_variants().items():
+        data = render_variant(image, tuple(size))
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        path = f"{VARIANTS_DIR}/{doctor.pk}-{name}-{digest}.webp"
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(data))
+        variants[name] = path
+    return variants
+
+
+def process_doctor_photo(doctor_id):
+    """Regenerate variants for one doctor and store them on the row."""
+    from django.core.cache import cache
+
+    from .cache import doctor_profile_key, invalidate_doctor_list
+    from .models import Doctor, DoctorCard
+
+    try:
+        doctor = Doctor.objects.only('id', 'photo', 'photo_variants').get(pk=doctor_id)
+        variants = generate_photo_variants(doctor)
+        stale = set(doctor.photo_variants.values()) - set(variants.values())
+        # update() so saving the variants does not re-trigger the post_save pipeline
+        Doctor.objects.filter(pk=doctor_id).update(photo_variants=variants)
+        DoctorCard.objects.filter(doctor_id=doctor_id).update(photo_variants=variants)
+        cache.delete(doctor_profile_key(doctor_id))
+        invalidate_doctor_list()
+        for path in stale:
+            default_storage.delete(path)
+        return variants
+    except Doctor.DoesNotExist:
+        return {}
+    except Exception:
+        logger.exception("Photo variant generation failed for doctor %s", doctor_id)
+        return {}
+
+
+def _process_in_worker(doctor_id):
+    from django.db import connection
+
+    try:
+        return process_doctor_photo(doctor_id)
+    finally:
+        # Worker threads open their own DB connection; don't leak it
+        connection.close()
+
+
+def schedule_photo_processing(doctor_id):
+    """Queue variant generation once the surrounding transaction commits."""
+    transaction.on_commit(lambda: _get_executor().submit(_process_in_worker, doctor_id))
+
+
+def variant_urls(doctor, request=None):
+    urls = {}
+    for name, path in (doctor.photo_variants or {}).items():
+        url = default_storage.url(path)
+        urls[name] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def serve_photo_variant(request, path):
+    """
+    Serve a content-hashed variant with an immutable cache header, under
+    ``DEBUG`` only. In production the web server serves ``MEDIA_ROOT`` and
+    sends ``Cache-Control: public, max-age=31536000, immutable`` for
+    ``media/doctors/variants/``.
+    """
+    response = serve(request, f"{VARIANTS_DIR}/{path}", document_root=settings.MEDIA_ROOT)
+    patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from reservations.archive import archive_appointments
+
+
+class Command(BaseCommand):
+    help = "Move old terminé appointments from the hot table to AppointmentArchive, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, help="Default: APPOINTMENT_ARCHIVE_AFTER_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int)
+
+    def handle(self, *args, **options):
+        stats = archive_appointments(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(json.dumps(stats))
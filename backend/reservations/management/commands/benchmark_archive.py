@@ -0,0 +1,98 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from reservations.archive import archive_appointments
+from reservations.models import Appointment, AppointmentArchive, Doctor, Specialty, User
+
+RECENT_ROWS = 500
+
+
+class Rollback(Exception):
+    pass
+
+
+def time_hot_path(doctor, repeat):
+    """Best-of-``repeat`` timings (ms) of the queries dashboards run on every load."""
+    now = timezone.now()
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    queries = {
+        'doctor_today_count': lambda: Appointment.objects.filter(
+            doctor=doctor, date_time__gte=day_start, date_time__lt=day_start + timedelta(days=1)).count(),
+        'doctor_upcoming_list': lambda: list(Appointment.objects.filter(
+            doctor=doctor, date_time__gte=now).order_by('date_time')[:20]),
+        'pending_count': lambda: Appointment.objects.filter(status='pending').count(),
+        'total_count': lambda: Appointment.objects.count(),
+    }
+    timings = {}
+    for name, query in queries.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = round(best * 1000, 3)
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        "Show that hot-path appointment queries stay flat as history grows once old rows are archived. "
+        "Runs inside a transaction that is rolled back, so no data is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,50000,200000', help="Comma-separated history sizes to test.")
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        report = []
+        try:
+            with transaction.atomic():
+                specialty = Specialty.objects.create(name='Benchmark archive')
+                user = User.objects.create_user('bench-archive-doctor@example.com', None, user_role='doctor')
+                client = User.objects.create_user('bench-archive-client@example.com', None)
+                doctor = Doctor.objects.create(
+                    user=user, first_name='Bench', last_name='Archive', email=user.email, phone='0',
+                    address='-', city='-', state='-', zip_code='0', specialization=specialty,
+                )
+                now = timezone.now()
+                Appointment.objects.bulk_create([
+                    Appointment(client=client, doctor=doctor, date_time=now + timedelta(hours=i - 100), status='pending')
+                    for i in range(RECENT_ROWS)
+                ])
+
+                inserted = 0
+                for size in sizes:
+                    old_start = now - timedelta(days=400)
+                    Appointment.objects.bulk_create([
+                        Appointment(client=client, doctor=doctor, date_time=old_start - timedelta(minutes=i), status='terminé')
+                        for i in range(inserted, size)
+                    ], batch_size=5000)
+                    inserted = size
+
+                    without_archive = time_hot_path(doctor, options['repeat'])
+                    archive_appointments(batch_size=5000)
+                    with_archive = time_hot_path(doctor, options['repeat'])
+                    report.append({
+                        'history_rows': size,
+                        'hot_rows_without_archive': RECENT_ROWS + size,
+                        'hot_rows_with_archive': Appointment.objects.count(),
+                        'without_archive_ms': without_archive,
+                        'with_archive_ms': with_archive,
+                    })
+                    # Put the history back in the hot table for the next, larger, round
+                    AppointmentArchive.objects.all().delete()
+                    Appointment.objects.bulk_create([
+                        Appointment(client=client, doctor=doctor, date_time=old_start - timedelta(minutes=i), status='terminé')
+                        for i in range(size)
+                    ], batch_size=5000)
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(json.dumps(report, indent=2))
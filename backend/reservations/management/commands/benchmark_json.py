@@ -0,0 +1,88 @@
+import gzip
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from reservations.models import Appointment, Doctor, Specialty, User
+from reservations.renderers import ORJSONRenderer
+from reservations.serializers import AppointmentSerializer, DoctorSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def synthetic_doctors(count):
+    specialty = Specialty(id=1, name='Cardiologie')
+    today = timezone.localdate()
+    availability = {
+        (today + timedelta(days=d)).isoformat(): [f'{h:02d}:00' for h in range(9, 17)]
+        for d in range(30)
+    }
+    return [
+        Doctor(
+            id=i, first_name=f'Prénom{i}', last_name=f'Nom{i}', email=f'doctor{i}@example.com',
+            phone='0600000000', address=f'{i} rue de la Santé', city='Tunis', state='Tunis', zip_code='1000',
+            specialization=specialty, availability=availability, bio='Médecin généraliste. ' * 10,
+            consultation_fee=Decimal('60.00'),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def synthetic_appointments(count, doctors):
+    client = User(id=1, email='patient@example.com', first_name='Patient', last_name='Test')
+    now = timezone.now()
+    return [
+        Appointment(id=i, client=client, doctor=doctors[i % len(doctors)], date_time=now + timedelta(hours=i), status='pending')
+        for i in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSONRenderer with the orjson renderer (time and bytes on the wire) for the largest payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help="Rows per payload for synthetic data.")
+        parser.add_argument('--repeat', type=int, default=20, help="Renders per measurement (best time is kept).")
+        parser.add_argument('--from-db', action='store_true', help="Benchmark the real doctor and appointment lists instead of synthetic rows.")
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            doctors = list(Doctor.objects.all())
+            appointments = list(Appointment.objects.select_related('doctor', 'client'))
+        else:
+            doctors = synthetic_doctors(options['count'])
+            appointments = synthetic_appointments(options['count'], doctors)
+
+        payloads = {
+            'GET /api/doctors/': DoctorSerializer(doctors, many=True).data,
+            'GET /api/admin/appointments/list/': AppointmentSerializer(appointments, many=True).data,
+        }
+        renderers = {'drf': JSONRenderer(), 'orjson': ORJSONRenderer()}
+
+        report = {}
+        for name, data in payloads.items():
+            entry = {'rows': len(data)}
+            rendered = None
+            for label, renderer in renderers.items():
+                best = float('inf')
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    rendered = renderer.render(data)
+                    best = min(best, time.perf_counter() - start)
+                entry[f'{label}_render_ms'] = round(best * 1000, 3)
+            entry['speedup'] = round(entry['drf_render_ms'] / entry['orjson_render_ms'], 2) if entry['orjson_render_ms'] else None
+            entry['bytes_raw'] = len(rendered)
+            entry['bytes_gzip'] = len(gzip.compress(rendered, compresslevel=6))
+            if brotli is not None:
+                entry['bytes_br'] = len(brotli.compress(rendered, quality=4))
+            report[name] = entry
+
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What a worker does before serving its first request
+WORKER_BOOT = "import django; django.setup(); import PPG.urls"
+
+
+def measure(docs_enabled, runs):
+    """Run a fresh interpreter with -X importtime; return best total and drf_yasg import time (ms)."""
+    env = dict(os.environ, API_DOCS='1' if docs_enabled else '0')
+    best_total = best_yasg = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WORKER_BOOT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        total = yasg = 0
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, self_us, cumulative_us, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+            total += int(self_us)
+            if name.lstrip() == 'drf_yasg' or name.lstrip().startswith('drf_yasg.'):
+                yasg += int(self_us)
+        if best_total is None or total < best_total:
+            best_total, best_yasg = total, yasg
+    return {'import_ms': round(best_total / 1000, 1), 'drf_yasg_self_ms': round(best_yasg / 1000, 1)}
+
+
+class Command(BaseCommand):
+    help = "Measure per-worker import time (python -X importtime) with and without drf_yasg docs mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per mode (best run is kept).")
+
+    def handle(self, *args, **options):
+        with_docs = measure(True, options['runs'])
+        without_docs = measure(False, options['runs'])
+        report = {
+            'docs_enabled': with_docs,
+            'docs_disabled': without_docs,
+            'saved_ms_per_worker': round(with_docs['import_ms'] - without_docs['import_ms'], 1),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from reservations.images import process_doctor_photo
+from reservations.models import Doctor
+
+
+class Command(BaseCommand):
+    help = "Generate (or regenerate) thumbnail/WebP variants for doctor photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help="Only process doctors without variants.")
+
+    def handle(self, *args, **options):
+        doctors = Doctor.objects.exclude(photo='').exclude(photo__isnull=True)
+        if options['missing']:
+            doctors = doctors.filter(photo_variants={})
+
+        processed = 0
+        for doctor_id in doctors.values_list('id', flat=True).iterator():
+            if process_doctor_photo(doctor_id):
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f"{processed} doctor photo(s) processed"))
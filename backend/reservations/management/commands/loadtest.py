@@ -0,0 +1,269 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from reservations.models import Doctor, Specialty, User
+
+SEED_PASSWORD = 'LoadTest-Pass-2024'
+SEED_ADMIN_EMAIL = 'loadtest-admin@example.com'
+SEED_DOCTOR_EMAIL = 'loadtest-doctor@example.com'
+DEFAULT_MIX = 'patient=70,doctor=20,admin=10'
+
+
+class InProcessTransport:
+    """Calls the WSGI app directly through Django's test client (no sockets)."""
+
+    def __init__(self):
+        from django.test import Client
+        self.client = Client(HTTP_HOST='127.0.0.1')
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        handler = getattr(self.client, method.lower())
+        if body is None:
+            response = handler(path, **headers)
+        else:
+            response = handler(path, data=json.dumps(body), content_type='application/json', **headers)
+        try:
+            data = json.loads(response.content or b'null')
+        except ValueError:
+            data = None
+        return response.status_code, data
+
+    def close(self):
+        connection.close()
+
+
+class HttpTransport:
+    """Talks to a running server (runserver, gunicorn...) over HTTP."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        try:
+            return status, json.loads(raw or b'null')
+        except ValueError:
+            return status, None
+
+    def close(self):
+        pass
+
+
+class Recorder:
+    """Thread-safe collection of (endpoint, latency, ok) samples."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, transport, name, method, path, body=None, token=None, expected=(200, 201)):
+        start = time.perf_counter()
+        try:
+            status, data = transport.request(method, path, body, token)
+        except Exception:
+            status, data = None, None
+        elapsed = (time.perf_counter() - start) * 1000
+        ok = status in expected
+        with self.lock:
+            self.samples[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+        return ok, data
+
+    def report(self, wall_time):
+        endpoints = {}
+        total = 0
+        for name, latencies in sorted(self.samples.items()):
+            latencies.sort()
+            count = len(latencies)
+            total += count
+            endpoints[name] = {
+                'requests': count,
+                'errors': self.errors[name],
+                'error_rate': round(self.errors[name] / count, 4),
+                'throughput_rps': round(count / wall_time, 2),
+                'latency_ms': {
+                    'mean': round(sum(latencies) / count, 2),
+                    'p50': percentile(latencies, 50),
+                    'p90': percentile(latencies, 90),
+                    'p95': percentile(latencies, 95),
+                    'p99': percentile(latencies, 99),
+                    'max': round(latencies[-1], 2),
+                },
+            }
+        return {
+            'duration_s': round(wall_time, 2),
+            'total_requests': total,
+            'throughput_rps': round(total / wall_time, 2) if wall_time else 0,
+            'endpoints': endpoints,
+        }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[index], 2)
+
+
+def login(recorder, transport, path, email, password):
+    ok, data = recorder.call(transport, f'POST {path}', 'POST', path, {'email': email, 'password': password})
+    return data.get('access') if ok and isinstance(data, dict) else None
+
+
+def patient_scenario(recorder, transport, options):
+    email = f'loadtest-{uuid.uuid4().hex[:12]}@example.com'
+    ok, _ = recorder.call(transport, 'POST /api/register/', 'POST', '/api/register/', {
+        'email': email, 'password': SEED_PASSWORD, 'first_name': 'Load', 'last_name': 'Test',
+    })
+    if not ok:
+        return
+    token = login(recorder, transport, '/api/client/login/', email, SEED_PASSWORD)
+    if not token:
+        return
+    ok, doctors = recorder.call(transport, 'GET /api/doctors/', 'GET', '/api/doctors/', token=token)
+    if not ok or not doctors:
+        return
+    doctor = random.choice(doctors)
+    when = timezone.now() + timedelta(days=random.randint(1, 30), minutes=random.randint(0, 600))
+    recorder.call(transport, 'POST /api/appointments/', 'POST', '/api/appointments/', {
+        'doctor': doctor['id'], 'date_time': when.isoformat(),
+    }, token=token)
+
+
+def doctor_scenario(recorder, transport, options):
+    token = login(recorder, transport, '/api/doctors/login/', options['doctor_email'], options['doctor_password'])
+    if not token:
+        return
+    for _ in range(options['polls']):
+        recorder.call(transport, 'GET /api/doctors/dashboard/stats/', 'GET', '/api/doctors/dashboard/stats/', token=token)
+
+
+def admin_scenario(recorder, transport, options):
+    token = login(recorder, transport, '/api/admin/login/', options['admin_email'], options['admin_password'])
+    if not token:
+        return
+    recorder.call(transport, 'GET /api/admin/dashboard/stats/', 'GET', '/api/admin/dashboard/stats/', token=token)
+    recorder.call(transport, 'GET /api/admin/dashboard/activities/', 'GET', '/api/admin/dashboard/activities/', token=token)
+
+
+SCENARIOS = {
+    'patient': patient_scenario,
+    'doctor': doctor_scenario,
+    'admin': admin_scenario,
+}
+
+
+def parse_mix(value):
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(f"Unknown scenario '{name}'. Choose from: {', '.join(SCENARIOS)}")
+        try:
+            weights[name] = int(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight for scenario '{name}': {weight}")
+    return weights
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a mix of patient booking, doctor dashboard and admin stats traffic "
+        "against the app and report per-endpoint throughput, latency percentiles and error rates as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Base URL of a running server (e.g. http://127.0.0.1:8000). Defaults to in-process WSGI calls.")
+        parser.add_argument('--users', type=int, default=10, help="Concurrent virtual users (threads).")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run.")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Scenario weights (default: {DEFAULT_MIX}).")
+        parser.add_argument('--polls', type=int, default=5, help="Dashboard polls per doctor session.")
+        parser.add_argument('--seed', action='store_true', help="Create the load-test admin, doctor and specialty if missing.")
+        parser.add_argument('--admin-email', default=SEED_ADMIN_EMAIL)
+        parser.add_argument('--admin-password', default=SEED_PASSWORD)
+        parser.add_argument('--doctor-email', default=SEED_DOCTOR_EMAIL)
+        parser.add_argument('--doctor-password', default=SEED_PASSWORD)
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        weights = parse_mix(options['mix'])
+        if options['seed']:
+            self.seed()
+
+        if options['url']:
+            make_transport = lambda: HttpTransport(options['url'])
+        else:
+            make_transport = InProcessTransport
+
+        recorder = Recorder()
+        names = list(weights)
+        deadline = time.monotonic() + options['duration']
+
+        def worker():
+            transport = make_transport()
+            try:
+                while time.monotonic() < deadline:
+                    scenario = random.choices(names, weights=[weights[n] for n in names])[0]
+                    SCENARIOS[scenario](recorder, transport, options)
+            finally:
+                transport.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(options['users'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall_time = time.perf_counter() - started
+
+        report = recorder.report(wall_time)
+        report.update({
+            'timestamp': timezone.now().isoformat(),
+            'target': options['url'] or 'in-process',
+            'users': options['users'],
+            'mix': weights,
+        })
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload)
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(payload)
+
+    def seed(self):
+        specialty, _ = Specialty.objects.get_or_create(name='Load Test')
+        if not User.objects.filter(email=SEED_ADMIN_EMAIL).exists():
+            User.objects.create_superuser(SEED_ADMIN_EMAIL, SEED_PASSWORD)
+        if not User.objects.filter(email=SEED_DOCTOR_EMAIL).exists():
+            user = User.objects.create_user(SEED_DOCTOR_EMAIL, SEED_PASSWORD, user_role='doctor',
+                                            first_name='Load', last_name='Doctor')
+            Doctor.objects.create(
+                user=user, first_name='Load', last_name='Doctor', email=SEED_DOCTOR_EMAIL,
+                phone='0000000000', address='-', city='-', state='-', zip_code='0000',
+                specialization=specialty,
+            )
@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.models import PurgeJob
+from reservations.purge import resume_purge_jobs, run_purge_job
+
+
+class Command(BaseCommand):
+    help = "Run pending or interrupted purges of soft-deleted doctors and users (resumable)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, help="Only run this PurgeJob id.")
+        parser.add_argument('--batch-size', type=int, help="Rows per transaction (default: PURGE_BATCH_SIZE).")
+        parser.add_argument('--status', action='store_true', help="Only list open jobs and their progress.")
+
+    def handle(self, *args, **options):
+        if options['status']:
+            for job in PurgeJob.objects.exclude(status='done').order_by('created_at'):
+                self.stdout.write(f"#{job.pk} {job.target_type} {job.target_id} {job.status} step={job.step or '-'} "
+                                  f"progress={json.dumps(job.progress)} attempts={job.attempts} {job.error}")
+            return
+        if options['job']:
+            if not PurgeJob.objects.filter(pk=options['job']).exists():
+                raise CommandError(f"Unknown purge job {options['job']}.")
+            result = run_purge_job(options['job'], batch_size=options['batch_size'])
+            self.stdout.write(json.dumps({'job': options['job'], 'status': result or 'busy or finished'}))
+            return
+        self.stdout.write(json.dumps(resume_purge_jobs(batch_size=options['batch_size'])))
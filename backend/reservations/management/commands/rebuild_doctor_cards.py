@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reservations.cards import rebuild_doctor_cards, refresh_stale_doctor_cards
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DoctorCard read model from doctors, specialties, users and appointments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--stale', action='store_true', help="Only refresh cards whose next available slot has passed.")
+
+    def handle(self, *args, **options):
+        if options['stale']:
+            count = refresh_stale_doctor_cards()
+        else:
+            count = rebuild_doctor_cards(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} doctor card(s) refreshed"))
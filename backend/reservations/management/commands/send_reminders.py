@@ -0,0 +1,25 @@
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.reminders import send_appointment_reminders
+
+
+class Command(BaseCommand):
+    help = "E-mail reminders for tomorrow's confirmé appointments (safe to rerun: sent reminders are skipped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to remind about (YYYY-MM-DD). Default: tomorrow.")
+        parser.add_argument('--chunk-size', type=int, help="Messages per SMTP batch (default: REMINDER_CHUNK_SIZE).")
+        parser.add_argument('--dry-run', action='store_true', help="Only count due reminders.")
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD.")
+        stats = send_appointment_reminders(day=day, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        self.stdout.write(json.dumps(stats))
@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import ExpressionWrapper, F, FloatField
+
+from reservations.models import SlowQuery
+
+ORDERINGS = {
+    'total': '-total_ms',
+    'max': '-max_ms',
+    'count': '-count',
+    'avg': '-avg_ms',
+    'recent': '-last_seen',
+}
+
+
+class Command(BaseCommand):
+    help = "Show slow queries aggregated per SQL fingerprint (see reservations.querylog)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('fingerprint', nargs='?', help="Show one fingerprint in full, with its EXPLAIN plan.")
+        parser.add_argument('--order', choices=sorted(ORDERINGS), default='total')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help="Output JSON instead of a table.")
+        parser.add_argument('--reset', action='store_true', help="Delete all recorded slow queries.")
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f"Deleted {deleted} fingerprints.")
+            return
+        if options['fingerprint']:
+            return self.show(options['fingerprint'], options['json'])
+
+        rows = SlowQuery.objects.annotate(
+            avg_ms=ExpressionWrapper(F('total_ms') / F('count'), output_field=FloatField())
+        ).order_by(ORDERINGS[options['order']])[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps([self.as_dict(row) for row in rows], indent=2, default=str))
+            return
+        self.stdout.write(f"{'fingerprint':<17}{'count':>8}{'total ms':>12}{'avg ms':>10}{'max ms':>10}  call site / sql")
+        for row in rows:
+            self.stdout.write(
+                f"{row.fingerprint:<17}{row.count:>8}{row.total_ms:>12.1f}{row.avg_ms:>10.1f}{row.max_ms:>10.1f}  {row.last_call_site}"
+            )
+            self.stdout.write(f"{'':<57}  {row.normalized_sql[:160]}")
+
+    def show(self, fingerprint, as_json):
+        row = SlowQuery.objects.filter(fingerprint=fingerprint).first()
+        if row is None:
+            raise CommandError(f"Unknown fingerprint '{fingerprint}'.")
+        data = self.as_dict(row)
+        data.update(sample_sql=row.sample_sql, explain=row.explain)
+        if as_json:
+            self.stdout.write(json.dumps(data, indent=2, default=str))
+            return
+        for key in ('fingerprint', 'count', 'total_ms', 'avg_ms', 'max_ms', 'first_seen', 'last_seen', 'last_call_site'):
+            self.stdout.write(f"{key}: {data[key]}")
+        self.stdout.write(f"\nnormalized:\n{row.normalized_sql}\n\nsample:\n{row.sample_sql}\n\nexplain:\n{row.explain or '(none)'}")
+
+    @staticmethod
+    def as_dict(row):
+        return {
+            'fingerprint': row.fingerprint,
+            'count': row.count,
+            'total_ms': round(row.total_ms, 2),
+            'avg_ms': round(row.total_ms / row.count, 2) if row.count else 0,
+            'max_ms': round(row.max_ms, 2),
+            'first_seen': row.first_seen,
+            'last_seen': row.last_seen,
+            'last_call_site': row.last_call_site,
+            'normalized_sql': row.normalized_sql,
+        }
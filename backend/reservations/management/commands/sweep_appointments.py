@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from reservations.services import sweep_overdue_appointments
+
+
+class Command(BaseCommand):
+    help = "Mark past pending/confirmé appointments as terminé, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Rows per batch/transaction (default: APPOINTMENT_SWEEP_BATCH_SIZE).")
+        parser.add_argument('--grace-minutes', type=int, help="Only sweep appointments older than this (default: APPOINTMENT_SWEEP_GRACE_MINUTES).")
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches.")
+
+    def handle(self, *args, **options):
+        stats = sweep_overdue_appointments(
+            batch_size=options['batch_size'],
+            grace_minutes=options['grace_minutes'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(json.dumps(stats))
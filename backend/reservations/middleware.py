@@ -0,0 +1,148 @@
+import gzip
+import logging
+import random
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # optional dependency; gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_accepts_br = _lazy_re_compile(r'\bbr\b')
+_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+
+
+class CompressionMiddleware:
+    """
+    Compress responses larger than ``API_COMPRESSION_MIN_SIZE`` bytes with
+    brotli (when installed and accepted) or gzip. Small responses are sent
+    as-is since compressing them costs more CPU than it saves on the wire.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = getattr(settings, 'API_COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'API_COMPRESSION_BROTLI_QUALITY', 4)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.min_size:
+            return response
+
+        accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and _accepts_br.search(accept):
+            encoding = 'br'
+            body = brotli.compress(response.content, quality=self.brotli_quality)
+        elif _accepts_gzip.search(accept):
+            encoding = 'gzip'
+            body = gzip.compress(response.content, compresslevel=self.gzip_level, mtime=0)
+        else:
+            return response
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        # The body changed, so a strong ETag no longer matches (as in Django's GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class RequestProfilerMiddleware:
+    """
+    Profile a request with cProfile and record its SQL (see
+    ``reservations.profiling``) when an admin sends ``X-Profile: 1`` or the
+    request is sampled at ``REQUEST_PROFILER_SAMPLE_RATE``. The snapshot id
+    is returned in the ``X-Profile-Id`` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_PROFILER_ENABLED', True)
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILER_SAMPLE_RATE', 0.0)
+
+    def __call__(self, request):
+        trigger = self._trigger(request) if self.enabled else None
+        if trigger is None:
+            return self.get_response(request)
+
+        from .profiling import profile_call, save_snapshot
+
+        response, profiler, recorders, wall_ms = profile_call(self.get_response, request)
+        try:
+            response['X-Profile-Id'] = save_snapshot(request, response, profiler, recorders, wall_ms, trigger)
+        except OSError:
+            logger.exception("Could not store profile snapshot for %s", request.path)
+        return response
+
+    def _trigger(self, request):
+        if request.META.get('HTTP_X_PROFILE') in ('1', 'true'):
+            user = self._admin(request)
+            if user is not None:
+                request.profiled_user = user
+                return 'header'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    @staticmethod
+    def _admin(request):
+        from rest_framework.exceptions import APIException
+
+        from .authentication import CachedJWTAuthentication
+
+        try:
+            result = CachedJWTAuthentication().authenticate(request)
+        except APIException:
+            return None
+        if result is None or result[0].user_role != 'admin':
+            return None
+        return result[0]
+
+
+class AdmissionControlMiddleware:
+    """
+    Bound the requests running at once per route class (see
+    ``reservations.admission``). A request that finds its class saturated
+    waits in a short bounded queue, then gets a fast 503 with
+    ``Retry-After`` rather than piling up behind slow endpoints.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'ADMISSION_CONTROL_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        from .admission import Rejected, get_controller
+
+        controller = get_controller()
+        name = controller.classify(request)
+        if name is None:
+            return self.get_response(request)
+        try:
+            controller.acquire(name)
+        except Rejected as e:
+            # Logged by django.request like any 503; the counters are in admission_stats()
+            response = JsonResponse({'error': 'Serveur surchargé, veuillez réessayer plus tard'}, status=503)
+            response['Retry-After'] = str(e.route_class.retry_after)
+            return response
+        try:
+            return self.get_response(request)
+        finally:
+            controller.release(name)
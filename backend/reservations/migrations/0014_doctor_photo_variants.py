@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0013_alter_appointment_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
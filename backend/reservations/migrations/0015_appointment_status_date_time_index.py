@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0014_doctor_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'date_time'], name='appointment_status_dt_idx'),
+        ),
+    ]
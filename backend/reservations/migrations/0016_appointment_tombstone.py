@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0015_appointment_status_date_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_id', models.BigIntegerField()),
+                ('client_id', models.BigIntegerField(null=True)),
+                ('doctor_id', models.BigIntegerField(null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['updated_at', 'id'], name='appointment_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0016_appointment_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorCard',
+            fields=[
+                ('doctor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='reservations.doctor')),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(blank=True, max_length=20)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('bio', models.TextField(blank=True)),
+                ('specialty_id', models.BigIntegerField(null=True)),
+                ('specialty_name', models.CharField(blank=True, max_length=100)),
+                ('consultation_fee', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('photo_variants', models.JSONField(blank=True, default=dict)),
+                ('is_active', models.BooleanField(default=True)),
+                ('date_joined', models.DateTimeField(blank=True, null=True)),
+                ('next_available_slot', models.DateTimeField(blank=True, null=True)),
+                ('appointment_count', models.PositiveIntegerField(default=0)),
+                ('upcoming_appointment_count', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['last_name', 'first_name', 'doctor_id'],
+                'indexes': [models.Index(fields=['last_name', 'first_name', 'doctor'], name='doctorcard_name_idx'), models.Index(fields=['specialty_id', 'last_name', 'first_name', 'doctor'], name='doctorcard_specialty_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0017_doctor_card'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date_time', models.DateTimeField()),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'date_time'], name='appointment_doctor_dt_idx'),
+        ),
+        migrations.AddField(
+            model_name='appointmentarchive',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_client_appointments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='appointmentarchive',
+            name='doctor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_doctor_appointments', to='reservations.doctor'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentarchive',
+            index=models.Index(fields=['client', 'date_time'], name='archive_client_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentarchive',
+            index=models.Index(fields=['doctor', 'date_time'], name='archive_doctor_dt_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0019_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='availability_rules',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
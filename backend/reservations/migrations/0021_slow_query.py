@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0020_doctor_availability_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=16, unique=True)),
+                ('normalized_sql', models.TextField()),
+                ('sample_sql', models.TextField()),
+                ('explain', models.TextField(blank=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('last_call_site', models.CharField(blank=True, max_length=255)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-total_ms'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0021_slow_query'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
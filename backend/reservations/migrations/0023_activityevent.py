@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:03
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+BACKFILL_APPOINTMENTS = 100
+
+
+def backfill_recent_appointments(apps, schema_editor):
+    """Seed the feed with the appointments the old synthesized feed showed."""
+    Appointment = apps.get_model('reservations', 'Appointment')
+    ActivityEvent = apps.get_model('reservations', 'ActivityEvent')
+    recent = Appointment.objects.select_related('client', 'doctor').order_by('-created_at')[:BACKFILL_APPOINTMENTS]
+    ActivityEvent.objects.bulk_create([
+        ActivityEvent(
+            type='appointment_created',
+            message=f"Nouveau RDV: {a.client.first_name} {a.client.last_name} avec Dr. {a.doctor.first_name} {a.doctor.last_name}"[:255],
+            status=a.status,
+            object_type='appointment',
+            object_id=a.id,
+            actor_id=a.client_id,
+            data={'client_id': a.client_id, 'doctor_id': a.doctor_id, 'date_time': a.date_time.isoformat()},
+            created_at=a.created_at,
+        )
+        for a in reversed(recent)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0022_appointment_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=50)),
+                ('message', models.CharField(max_length=255)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('object_type', models.CharField(blank=True, max_length=30)),
+                ('object_id', models.BigIntegerField(blank=True, null=True)),
+                ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at', 'id'], name='activity_created_idx'), models.Index(fields=['type', 'created_at', 'id'], name='activity_type_created_idx'), models.Index(fields=['object_type', 'object_id'], name='activity_object_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_recent_appointments, migrations.RunPython.noop),
+    ]
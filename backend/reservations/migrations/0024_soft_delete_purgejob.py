@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0023_activityevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='PurgeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('doctor', 'Doctor'), ('user', 'User')], max_length=10)),
+                ('target_id', models.BigIntegerField()),
+                ('label', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('step', models.CharField(blank=True, max_length=30)),
+                ('progress', models.JSONField(blank=True, default=dict)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('requested_by_id', models.BigIntegerField(blank=True, null=True)),
+                ('lease_until', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'lease_until'], name='purgejob_status_lease_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'done'), _negated=True), fields=('target_type', 'target_id'), name='purgejob_one_open_per_target')],
+            },
+        ),
+    ]
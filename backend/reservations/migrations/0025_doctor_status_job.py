@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0024_soft_delete_purgejob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('terminé', 'Terminé'), ('confirmé', 'Confirmé'), ('annulé', 'Annulé')], default='pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DoctorStatusJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('deactivate', 'Deactivate'), ('reactivate', 'Reactivate')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('step', models.CharField(blank=True, max_length=30)),
+                ('appointments', models.JSONField(blank=True, default=dict)),
+                ('progress', models.JSONField(blank=True, default=dict)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('requested_by_id', models.BigIntegerField(blank=True, null=True)),
+                ('lease_until', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_jobs', to='reservations.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'lease_until'], name='doctorstatusjob_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0025_doctor_status_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmenttombstone',
+            name='reassigned',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:20
+
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db import migrations
+from django.db.models import Count, Q
+from django.utils import timezone
+
+BATCH_SIZE = 500
+WINDOW_DAYS = 366
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+# Frozen copy of the slot search of reservations.cards / reservations.availability as of this
+# migration, so later changes to those modules don't change (or break) what it computes.
+def _minutes(value):
+    hour, minute = value.split(':')[:2]
+    return int(hour) * 60 + int(minute)
+
+
+def _rule_times(rules, day):
+    day_str = day.isoformat()
+    if (rules.get('start') and day_str < rules['start']) or (rules.get('until') and day_str > rules['until']):
+        return []
+    exceptions = rules.get('exceptions') or {}
+    if day_str in exceptions:
+        return sorted(exceptions[day_str])
+    slot = rules.get('slot_minutes', 30)
+    return [
+        f"{minute // 60:02d}:{minute % 60:02d}"
+        for start, end in (rules.get('weekly') or {}).get(WEEKDAYS[day.weekday()], ())
+        for minute in range(_minutes(start), _minutes(end) - slot + 1, slot)
+    ]
+
+
+def _day_times(availability, rules, day):
+    """Explicit dates win over the rules, as in iter_availability()."""
+    day_str = day.isoformat()
+    if day_str in (availability or {}):
+        return sorted(availability[day_str] or [])
+    return _rule_times(rules, day) if rules else []
+
+
+def next_free_slot(availability, booked, now, rules):
+    today = timezone.localdate(now)
+    for day in (today + timedelta(days=n) for n in range(WINDOW_DAYS + 1)):
+        for time_str in _day_times(availability, rules, day):
+            try:
+                hour, minute = (int(part) for part in time_str.split(':')[:2])
+                slot = timezone.make_aware(datetime.combine(day, dt_time(hour, minute)))
+            except (ValueError, TypeError):
+                continue
+            if slot > now and slot not in booked:
+                return slot
+    return None
+
+
+def backfill_doctor_cards(apps, schema_editor):
+    """Fill the cards the admin doctor list reads, as ``rebuild_doctor_cards`` would."""
+    Doctor = apps.get_model('reservations', 'Doctor')
+    DoctorCard = apps.get_model('reservations', 'DoctorCard')
+    Appointment = apps.get_model('reservations', 'Appointment')
+    AppointmentArchive = apps.get_model('reservations', 'AppointmentArchive')
+    now = timezone.now()
+    update_fields = [f.name for f in DoctorCard._meta.concrete_fields if f.name != 'doctor']
+
+    ids = list(Doctor.objects.filter(deleted_at__isnull=True).order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        doctors = Doctor.objects.filter(id__in=batch).select_related('specialization', 'user').annotate(
+            total_appointments=Count('doctor_appointments'),
+            upcoming_appointments=Count(
+                'doctor_appointments',
+                filter=Q(doctor_appointments__date_time__gte=now) & ~Q(doctor_appointments__status='annulé'),
+            ),
+        )
+        archived = dict(
+            AppointmentArchive.objects.filter(doctor_id__in=batch)
+            .values('doctor_id').annotate(n=Count('id')).values_list('doctor_id', 'n')
+        )
+        booked = {}
+        upcoming = Appointment.objects.filter(doctor_id__in=batch, date_time__gte=now).exclude(status='annulé')
+        for doctor_id, date_time in upcoming.values_list('doctor_id', 'date_time'):
+            booked.setdefault(doctor_id, set()).add(date_time)
+
+        DoctorCard.objects.bulk_create([
+            DoctorCard(
+                doctor_id=doctor.id,
+                first_name=doctor.first_name,
+                last_name=doctor.last_name,
+                email=doctor.email,
+                phone=doctor.phone,
+                city=doctor.city,
+                bio=doctor.bio,
+                specialty_id=doctor.specialization_id,
+                specialty_name=doctor.specialization.name if doctor.specialization else '',
+                consultation_fee=doctor.consultation_fee,
+                photo_variants=doctor.photo_variants,
+                is_active=doctor.user.is_active if doctor.user else True,
+                date_joined=doctor.user.date_joined if doctor.user else None,
+                next_available_slot=next_free_slot(doctor.availability, booked.get(doctor.id, set()), now, doctor.availability_rules),
+                appointment_count=doctor.total_appointments + archived.get(doctor.id, 0),
+                upcoming_appointment_count=doctor.upcoming_appointments,
+            )
+            for doctor in doctors
+        ], update_conflicts=True, unique_fields=['doctor'], update_fields=update_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0026_tombstone_reassigned'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_doctor_cards, migrations.RunPython.noop),
+    ]
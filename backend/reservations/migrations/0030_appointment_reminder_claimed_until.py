@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0029_appointment_reminder_refused_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='reminder_claimed_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
 
@@ -43,6 +45,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     )
     adresse = models.TextField(blank=True)
     gender = models.CharField(max_length=10, blank=True)
+    # Set when the account is soft-deleted; a PurgeJob removes it and its history later
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     objects = UserManager()
 
@@ -61,6 +65,13 @@ class Specialty(models.Model):
         return self.name
 
 
+class DoctorManager(models.Manager):
+    """Hides soft-deleted doctors; ``Doctor.all_objects`` still sees them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Doctor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE,null=True, blank=True)
     first_name = models.CharField(max_length=100)
@@ -75,10 +86,19 @@ class Doctor(models.Model):
 
     specialization = models.ForeignKey(Specialty, on_delete=models.CASCADE, related_name='doctors')
     availability = models.JSONField(default=dict)
+    # Recurring weekly template expanded on read, see reservations.availability
+    availability_rules = models.JSONField(default=dict, blank=True)
 
     bio = models.TextField(blank=True)
     photo = models.ImageField(upload_to='doctors/', blank=True, null=True)
+    # {variant_name: storage_path}, filled in by reservations.images
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     consultation_fee = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    # Set when the doctor is soft-deleted; hidden everywhere until a PurgeJob removes the rows
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = DoctorManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return f"Dr. {self.first_name} {self.last_name} - {self.specialization}"
@@ -90,6 +110,12 @@ class Doctor(models.Model):
 
 
 class Appointment(models.Model):
+    # target status -> statuses it may be reached from (pending -> confirmé -> terminé)
+    STATUS_TRANSITIONS = {
+        'confirmé': ['pending'],
+        'terminé': ['confirmé'],
+    }
+
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='client_appointments')
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='doctor_appointments')
     date_time = models.DateTimeField()
@@ -99,11 +125,249 @@ class Appointment(models.Model):
             ('pending', 'Pending'),
             ('terminé', 'Terminé'),
             ('confirmé', 'Confirmé'),
+            # Set by reservations.deactivation when the doctor is deactivated; undone on reactivation
+            ('annulé', 'Annulé'),
         ],
         default='pending'
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set by reservations.reminders once the next-day reminder went out; cleared when date_time changes
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Set when the mail server refused the client's address for good: no more reminder attempts
+    reminder_refused_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Lease of the reminder run sending this appointment's reminder right now
+    reminder_claimed_until = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Overdue sweeps and status counts scan (status, date_time)
+            models.Index(fields=['status', 'date_time'], name='appointment_status_dt_idx'),
+            # Keyset cursor of the changes feed
+            models.Index(fields=['updated_at', 'id'], name='appointment_updated_idx'),
+            # Per-doctor day/week counts and lists
+            models.Index(fields=['doctor', 'date_time'], name='appointment_doctor_dt_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client.email} - Dr. {self.doctor.last_name} on {self.date_time}"
+
+
+class AppointmentTombstone(models.Model):
+    """Records deleted appointments so the changes feed can report deletions."""
+    appointment_id = models.BigIntegerField()
+    client_id = models.BigIntegerField(null=True)
+    doctor_id = models.BigIntegerField(null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # The appointment still exists but moved to another doctor: only the old doctor's feed drops it
+    reassigned = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Appointment #{self.appointment_id} deleted on {self.deleted_at}"
+
+
+
+class DoctorCard(models.Model):
+    """
+    Denormalized read model for doctor listing pages, maintained by
+    ``reservations.cards`` from Doctor, Specialty, User and Appointment
+    changes. Rebuild with ``manage.py rebuild_doctor_cards``.
+    """
+    doctor = models.OneToOneField(Doctor, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+    email = models.EmailField()
+    phone = models.CharField(max_length=20, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    bio = models.TextField(blank=True)
+    specialty_id = models.BigIntegerField(null=True)
+    specialty_name = models.CharField(max_length=100, blank=True)
+    consultation_fee = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    photo_variants = models.JSONField(default=dict, blank=True)
+    is_active = models.BooleanField(default=True)
+    date_joined = models.DateTimeField(null=True, blank=True)
+    next_available_slot = models.DateTimeField(null=True, blank=True)
+    appointment_count = models.PositiveIntegerField(default=0)
+    upcoming_appointment_count = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['last_name', 'first_name', 'doctor_id']
+        indexes = [
+            models.Index(fields=['last_name', 'first_name', 'doctor'], name='doctorcard_name_idx'),
+            models.Index(fields=['specialty_id', 'last_name', 'first_name', 'doctor'], name='doctorcard_specialty_idx'),
+        ]
+
+    def __str__(self):
+        return f"Card Dr. {self.first_name} {self.last_name}"
+
+
+
+class AppointmentArchive(models.Model):
+    """
+    Cold storage for old ``terminé`` appointments, moved out of the hot
+    ``Appointment`` table by ``reservations.archive``. ``id`` keeps the
+    original appointment id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_client_appointments')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='archived_doctor_appointments')
+    date_time = models.DateTimeField()
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'date_time'], name='archive_client_dt_idx'),
+            models.Index(fields=['doctor', 'date_time'], name='archive_doctor_dt_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived appointment #{self.id} on {self.date_time}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a request sent with an ``Idempotency-Key`` header (see
+    ``reservations.idempotency``). ``status_code`` is null while the first
+    request is still running; it holds the key until ``locked_until``.
+    """
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotency_scope_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+
+class SlowQuery(models.Model):
+    """Per-fingerprint totals of queries over ``SLOW_QUERY_THRESHOLD_MS``, see ``reservations.querylog``."""
+    fingerprint = models.CharField(max_length=16, unique=True)
+    normalized_sql = models.TextField()
+    sample_sql = models.TextField()
+    explain = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    last_call_site = models.CharField(max_length=255, blank=True)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-total_ms']
+
+    def __str__(self):
+        return f"{self.fingerprint} x{self.count} ({self.total_ms:.0f} ms)"
+
+
+class ActivityEvent(models.Model):
+    """
+    Append-only activity log behind the admin feed, written when the event
+    happens (see ``reservations.activity``). Names are copied into
+    ``message``/``data`` and related rows are referenced by plain ids, so the
+    feed reads no other table and outlives deleted rows.
+    """
+    type = models.CharField(max_length=50)
+    message = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, blank=True)
+    object_type = models.CharField(max_length=30, blank=True)
+    object_id = models.BigIntegerField(null=True, blank=True)
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Feed cursor (newest first), unfiltered and per type
+            models.Index(fields=['created_at', 'id'], name='activity_created_idx'),
+            models.Index(fields=['type', 'created_at', 'id'], name='activity_type_created_idx'),
+            models.Index(fields=['object_type', 'object_id'], name='activity_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type}: {self.message}"
+
+
+class PurgeJob(models.Model):
+    """
+    Background removal of a soft-deleted doctor or user and their history,
+    one bounded batch per transaction (see ``reservations.purge``).
+    ``step``/``progress`` record how far it got, so a crashed job resumes
+    where it stopped.
+    """
+    TARGET_CHOICES = [('doctor', 'Doctor'), ('user', 'User')]
+    STATUS_CHOICES = [('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')]
+
+    target_type = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField()
+    label = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    step = models.CharField(max_length=30, blank=True)
+    progress = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by_id = models.BigIntegerField(null=True, blank=True)
+    lease_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'lease_until'], name='purgejob_status_lease_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['target_type', 'target_id'], condition=~models.Q(status='done'),
+                name='purgejob_one_open_per_target',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Purge {self.target_type} #{self.target_id} ({self.status})"
+
+
+class DoctorStatusJob(models.Model):
+    """
+    Follow-up of a doctor's (de)activation (see ``reservations.deactivation``):
+    deactivating cancels their future appointments, reactivating restores
+    them, and the patients concerned are e-mailed. ``appointments`` keeps
+    ``{id: status before}`` so the change can be reversed; ``progress``
+    reports the counts.
+    """
+    ACTION_CHOICES = [('deactivate', 'Deactivate'), ('reactivate', 'Reactivate')]
+    STATUS_CHOICES = [('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')]
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='status_jobs')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    step = models.CharField(max_length=30, blank=True)
+    appointments = models.JSONField(default=dict, blank=True)
+    progress = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by_id = models.BigIntegerField(null=True, blank=True)
+    lease_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'lease_until'], name='doctorstatusjob_status_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.client.email} - Dr. {self.doctor.last_name} on {self.date_time}"
\ No newline at end of file
+        return f"{self.action} doctor #{self.doctor_id} ({self.status})"
@@ -11,4 +11,8 @@ class IsClient(BasePermission):
 
 class IsDoctor(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.user_role == 'doctor'
\ No newline at end of file
+        return request.user.is_authenticated and request.user.user_role == 'doctor'
+
+class IsAdminOrDoctor(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.user_role in ('admin', 'doctor')
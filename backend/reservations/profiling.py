@@ -0,0 +1,189 @@
+"""
+On-demand request profiling.
+
+``RequestProfilerMiddleware`` runs a request under cProfile and records
+every SQL query it executes when either:
+
+* an admin sends the ``X-Profile: 1`` header (JWT-authenticated like the API), or
+* the request is picked by ``REQUEST_PROFILER_SAMPLE_RATE`` (0.0 - 1.0, default 0).
+
+Each snapshot is stored under ``REQUEST_PROFILER_DIR`` as ``<id>.prof``
+(a pstats dump that snakeviz and ``python -m pstats`` can open) plus
+``<id>.json`` (request, timings, queries, top functions). Only the newest
+``REQUEST_PROFILER_MAX_SNAPSHOTS`` are kept. Admins list and download them
+via ``/api/admin/profiles/``.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+SNAPSHOT_ID_RE = re.compile(r'^\d{14}-[0-9a-f]{8}$')
+MAX_QUERIES = 500
+MAX_SQL_LENGTH = 2000
+TOP_FUNCTIONS = 40
+
+_write_lock = threading.Lock()
+
+
+def profiler_dir():
+    return Path(getattr(settings, 'REQUEST_PROFILER_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callback collecting SQL, duration and errors."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        error = None
+        try:
+            return execute(sql, params, many, context)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            self.total += 1
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    'db': self.alias,
+                    'sql': sql[:MAX_SQL_LENGTH],
+                    'params': repr(params)[:500] if not many else f'<{len(params)} param sets>',
+                    'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                    'error': error,
+                })
+
+
+def profile_call(func, *args):
+    """
+    Run ``func(*args)`` under cProfile with every DB connection's queries
+    recorded. Returns ``(result, profiler, recorders, wall_ms)``; ``profiler``
+    is None when another profiler is already active in this thread.
+    """
+    recorders = [QueryRecorder(alias) for alias in connections]
+    profiler = cProfile.Profile()
+    with ExitStack() as stack:
+        for recorder in recorders:
+            stack.enter_context(connections[recorder.alias].execute_wrapper(recorder))
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None
+        try:
+            result = func(*args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        wall_ms = (time.perf_counter() - start) * 1000
+    return result, profiler, recorders, wall_ms
+
+
+def _top_functions(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def _atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def save_snapshot(request, response, profiler, recorders, wall_ms, trigger):
+    """Write the snapshot files, trim the ring buffer and return the snapshot id."""
+    directory = profiler_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    now = timezone.now()
+    snapshot_id = f"{now.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    queries = [q for recorder in recorders for q in recorder.queries]
+    user = getattr(request, 'profiled_user', None)
+    metadata = {
+        'id': snapshot_id,
+        'created_at': now.isoformat(),
+        'trigger': trigger,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': getattr(user, 'email', None),
+        'status': response.status_code,
+        'duration_ms': round(wall_ms, 2),
+        'query_count': sum(recorder.total for recorder in recorders),
+        'query_time_ms': round(sum(q['duration_ms'] for q in queries), 2),
+        'has_profile': profiler is not None,
+        'top_functions': _top_functions(profiler) if profiler is not None else '',
+        'queries': queries,
+    }
+
+    with _write_lock:
+        if profiler is not None:
+            _atomic_write(directory / f'{snapshot_id}.prof', profiler.dump_stats)
+
+        def write_json(tmp):
+            with open(tmp, 'w') as fh:
+                json.dump(metadata, fh, indent=1, default=str)
+
+        _atomic_write(directory / f'{snapshot_id}.json', write_json)
+        _trim(directory)
+    return snapshot_id
+
+
+def _trim(directory):
+    keep = getattr(settings, 'REQUEST_PROFILER_MAX_SNAPSHOTS', 50)
+    snapshots = sorted(p.stem for p in directory.glob('*.json'))
+    for stale in snapshots[:max(0, len(snapshots) - keep)]:
+        for suffix in ('.json', '.prof'):
+            (directory / f'{stale}{suffix}').unlink(missing_ok=True)
+
+
+def list_snapshots():
+    """Metadata of stored snapshots, newest first, without the query lists."""
+    summaries = []
+    for path in sorted(profiler_dir().glob('*.json'), reverse=True):
+        try:
+            with open(path) as fh:
+                metadata = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        metadata.pop('queries', None)
+        metadata.pop('top_functions', None)
+        summaries.append(metadata)
+    return summaries
+
+
+def snapshot_path(snapshot_id, suffix):
+    """Path of one snapshot file, or None for unknown/malformed ids."""
+    if not SNAPSHOT_ID_RE.match(snapshot_id or ''):
+        return None
+    path = profiler_dir() / f'{snapshot_id}{suffix}'
+    return path if path.exists() else None
+
+
+def load_snapshot(snapshot_id):
+    path = snapshot_path(snapshot_id, '.json')
+    if path is None:
+        return None
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,222 @@
+"""
+Soft-delete and background purge of doctors and users.
+
+Deleting an account with years of appointments used to run as one cascade
+inside the request. Now it happens in two phases:
+
+1. ``soft_delete_doctor()`` / ``soft_delete_user()`` (in the request): stamp
+   ``deleted_at`` and deactivate the login. This hides the doctor from every
+   ``Doctor.objects`` query, listing cards and booking, and creates a
+   ``PurgeJob``.
+2. ``run_purge_job()`` (in the background): delete the dependents in batches
+   of ``PURGE_BATCH_SIZE``, one short transaction each, then the account
+   itself. That final delete is a small cascade.
+
+Each batch commits its rows and the job's progress together. A job that
+crashed keeps its step, and its lease expires. ``resume_purge_jobs()`` (beat
+task, or ``manage.py purge_accounts``) picks it up again where it stopped.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import activity
+from .cache import doctor_profile_key, invalidate_doctor_list
+from .cards import refresh_doctor_cards
+from .models import Appointment, AppointmentArchive, AppointmentTombstone, Doctor, DoctorCard, PurgeJob, User
+from .slots import invalidate_free_slots
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300
+
+# target type -> ordered (step, model, column) of dependents removed before the account itself
+STEPS = {
+    'doctor': [
+        ('appointments', Appointment, 'doctor_id'),
+        ('archived_appointments', AppointmentArchive, 'doctor_id'),
+    ],
+    'user': [
+        ('appointments', Appointment, 'client_id'),
+        ('archived_appointments', AppointmentArchive, 'client_id'),
+    ],
+}
+FINAL_STEP = 'account'
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='purge')
+    return _executor
+
+
+def _run_in_worker(job_id):
+    try:
+        run_purge_job(job_id)
+    except Exception:
+        logger.exception("Purge job %s failed; it will be resumed by resume_purge_jobs()", job_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_purge(job_id):
+    """Start the purge once the surrounding transaction commits."""
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, job_id))
+
+
+def _open_job(target_type, target_id, label, actor):
+    job, _ = PurgeJob.objects.exclude(status='done').get_or_create(
+        target_type=target_type, target_id=target_id,
+        defaults={'label': label[:255], 'requested_by_id': getattr(actor, 'pk', None)},
+    )
+    if job.status == 'failed':
+        # Deleting again retries a job that gave up
+        PurgeJob.objects.filter(pk=job.pk).update(status='pending', attempts=0, lease_until=None)
+    return job
+
+
+@transaction.atomic
+def soft_delete_doctor(doctor, actor=None):
+    """Hide ``doctor`` (and lock its login) now; returns the PurgeJob removing it later."""
+    now = timezone.now()
+    Doctor.all_objects.filter(pk=doctor.pk).update(deleted_at=now)
+    doctor.deleted_at = now
+    if doctor.user_id:
+        user = doctor.user
+        user.deleted_at, user.is_active = now, False
+        user.save(update_fields=['deleted_at', 'is_active'])
+    DoctorCard.objects.filter(doctor_id=doctor.pk).delete()
+    # update() skips the post_save receivers that drop the cached profile and slots
+    transaction.on_commit(lambda: (
+        cache.delete(doctor_profile_key(doctor.pk)), invalidate_free_slots(doctor.pk), invalidate_doctor_list(),
+    ))
+    activity.doctor_deleted(doctor, actor=actor)
+    job = _open_job('doctor', doctor.pk, f"Dr. {doctor.first_name} {doctor.last_name}".strip(), actor)
+    schedule_purge(job.pk)
+    return job
+
+
+@transaction.atomic
+def soft_delete_user(user, actor=None):
+    """Lock ``user``'s login now; returns the PurgeJob removing the account later."""
+    doctor = Doctor.all_objects.filter(user_id=user.pk).first()
+    if doctor is not None:
+        return soft_delete_doctor(doctor, actor=actor)
+    user.deleted_at, user.is_active = timezone.now(), False
+    user.save(update_fields=['deleted_at', 'is_active'])
+    job = _open_job('user', user.pk, user.email, actor)
+    schedule_purge(job.pk)
+    return job
+
+
+def _claim(job_id):
+    """Take (or renew) the job's lease; False when another worker holds it or it is finished."""
+    now = timezone.now()
+    return PurgeJob.objects.filter(
+        Q(lease_until__isnull=True) | Q(lease_until__lt=now),
+        pk=job_id, status__in=['pending', 'running'],
+    ).update(status='running', lease_until=now + timedelta(seconds=LEASE_SECONDS), attempts=F('attempts') + 1) == 1
+
+
+def _purge_batch(job, model, column, batch_size):
+    """Delete one batch of ``model`` rows of the job's target; returns how many were deleted."""
+    with transaction.atomic():
+        rows = list(
+            model.objects.filter(**{column: job.target_id}).order_by('pk')
+            .values_list('pk', 'client_id', 'doctor_id')[:batch_size]
+        )
+        if rows:
+            if model is Appointment:
+                # Delta-sync clients must drop them; nothing references Appointment rows,
+                # so the raw DELETE below is safe and skips per-row signals
+                AppointmentTombstone.objects.bulk_create([
+                    AppointmentTombstone(appointment_id=pk, client_id=client_id, doctor_id=doctor_id)
+                    for pk, client_id, doctor_id in rows
+                ])
+            model.objects.filter(pk__in=[row[0] for row in rows])._raw_delete(router.db_for_write(model))
+        progress = dict(job.progress)
+        progress[job.step] = progress.get(job.step, 0) + len(rows)
+        PurgeJob.objects.filter(pk=job.pk).update(
+            progress=progress, lease_until=timezone.now() + timedelta(seconds=LEASE_SECONDS), updated_at=timezone.now(),
+        )
+        job.progress = progress
+    if rows and job.target_type == 'user':
+        # The client's appointments counted on doctor cards
+        refresh_doctor_cards({row[2] for row in rows})
+    return len(rows)
+
+
+def _delete_account(job):
+    with transaction.atomic():
+        if job.target_type == 'doctor':
+            doctor = Doctor.all_objects.filter(pk=job.target_id).select_related('user').first()
+            if doctor is not None:
+                # Deleting the linked user cascades to the doctor row
+                (doctor.user or doctor).delete()
+        else:
+            User.objects.filter(pk=job.target_id).delete()
+
+
+def run_purge_job(job_id, batch_size=None, max_batches=None):
+    """
+    Advance one job; returns its status. Stops after ``max_batches`` (the
+    lease is released so it can be resumed) or when the job is done.
+    """
+    batch_size = batch_size or getattr(settings, 'PURGE_BATCH_SIZE', 500)
+    if not _claim(job_id):
+        return None
+    job = PurgeJob.objects.get(pk=job_id)
+    steps = STEPS[job.target_type]
+    names = [name for name, _, _ in steps] + [FINAL_STEP]
+    batches = 0
+    try:
+        start = names.index(job.step) if job.step in names else 0
+        for name, model, column in steps[start:]:
+            if job.step != name:
+                job.step = name
+                PurgeJob.objects.filter(pk=job.pk).update(step=name)
+            while True:
+                if max_batches is not None and batches >= max_batches:
+                    PurgeJob.objects.filter(pk=job.pk).update(lease_until=None)
+                    return 'running'
+                batches += 1
+                if _purge_batch(job, model, column, batch_size) < batch_size:
+                    break
+        job.step = FINAL_STEP
+        PurgeJob.objects.filter(pk=job.pk).update(step=FINAL_STEP)
+        _delete_account(job)
+    except Exception as e:
+        PurgeJob.objects.filter(pk=job.pk).update(error=f'{type(e).__name__}: {e}'[:2000], lease_until=None)
+        max_attempts = getattr(settings, 'PURGE_MAX_ATTEMPTS', 5)
+        PurgeJob.objects.filter(pk=job.pk, attempts__gte=max_attempts).update(status='failed')
+        raise
+    PurgeJob.objects.filter(pk=job.pk).update(status='done', lease_until=None, error='', finished_at=timezone.now())
+    logger.info("Purge of %s #%s done: %s", job.target_type, job.target_id, job.progress)
+    return 'done'
+
+
+def resume_purge_jobs(batch_size=None):
+    """Run every pending job and every running job whose worker lost its lease."""
+    now = timezone.now()
+    stats = {'done': 0, 'failed': 0, 'skipped': 0}
+    open_jobs = PurgeJob.objects.filter(
+        Q(lease_until__isnull=True) | Q(lease_until__lt=now), status__in=['pending', 'running'],
+    ).order_by('created_at').values_list('pk', flat=True)
+    for job_id in list(open_jobs):
+        try:
+            result = run_purge_job(job_id, batch_size=batch_size)
+        except Exception:
+            logger.exception("Purge job %s failed", job_id)
+            stats['failed'] += 1
+            continue
+        stats['done' if result == 'done' else 'skipped'] += 1
+    return stats
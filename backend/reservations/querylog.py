@@ -0,0 +1,187 @@
+"""
+Slow-query log.
+
+Every database connection gets an ``execute_wrapper`` (installed from
+``ReservationsConfig.ready`` through the ``connection_created`` signal) that
+times each query. Queries slower than ``SLOW_QUERY_THRESHOLD_MS`` are
+logged on the ``reservations.slow_queries`` logger with their call site, and
+aggregated per normalized SQL fingerprint in the ``SlowQuery`` table. The
+first time a fingerprint is seen, its ``EXPLAIN`` output is stored with it.
+
+The aggregate is never written inside the caller's transaction: its row
+lock on the fingerprint would serialize every transaction hitting the same
+slow query until they commit, and a rollback would drop it. Samples are
+buffered on the connection and written once it is outside any atomic
+block: after the caller's commit (``on_commit``), or before the next
+autocommit query after a rollback.
+
+Inspect the aggregates with ``manage.py slow_queries``.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger('reservations.slow_queries')
+
+_state = threading.local()
+_THIS_FILE = Path(__file__).resolve()
+MAX_BUFFERED = 100
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_SPACE_RE = re.compile(r'\s+')
+_TRANSACTION_RE = re.compile(r'\s*(BEGIN|SAVEPOINT|RELEASE|ROLLBACK|COMMIT)\b', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """SQL with literals, parameters, IN lists and multi-row VALUES collapsed."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _VALUES_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+
+def call_site():
+    """``path:line in function`` of the innermost project frame that issued the query."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    for frame in reversed(traceback.extract_stack()):
+        path = Path(frame.filename).resolve()
+        if path == _THIS_FILE or 'site-packages' in path.parts:
+            continue
+        try:
+            relative = path.relative_to(base_dir)
+        except ValueError:
+            continue
+        return f'{relative}:{frame.lineno} in {frame.name}'
+    return ''
+
+
+def explain(connection, sql, params):
+    """EXPLAIN output for a SELECT, or '' when unsupported or it fails."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    try:
+        prefix = connection.ops.explain_query_prefix()
+    except Exception:
+        return ''
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except DatabaseError:
+        return ''
+    return '\n'.join(' '.join(str(col) for col in row) for row in rows)
+
+
+def record_slow_query(connection, sql, params, duration_ms, site, now):
+    """Add one sample to its fingerprint's ``SlowQuery`` row; runs outside any atomic block."""
+    from .models import SlowQuery
+
+    normalized = normalize_sql(sql)
+    digest = fingerprint(normalized)
+    manager = SlowQuery.objects.using(connection.alias)
+    updated = manager.filter(fingerprint=digest).update(
+        count=F('count') + 1,
+        total_ms=F('total_ms') + duration_ms,
+        max_ms=Greatest('max_ms', duration_ms),
+        last_seen=now,
+        last_call_site=site,
+    )
+    if updated:
+        return
+    plan = explain(connection, sql, params) if getattr(settings, 'SLOW_QUERY_EXPLAIN', True) else ''
+    try:
+        with transaction.atomic(using=connection.alias):
+            manager.create(
+                fingerprint=digest, normalized_sql=normalized, sample_sql=sql[:10000], explain=plan,
+                count=1, total_ms=duration_ms, max_ms=duration_ms,
+                first_seen=now, last_seen=now, last_call_site=site,
+            )
+    except IntegrityError:
+        # Another process recorded the first occurrence meanwhile
+        manager.filter(fingerprint=digest).update(
+            count=F('count') + 1, total_ms=F('total_ms') + duration_ms,
+            max_ms=Greatest('max_ms', duration_ms), last_seen=now, last_call_site=site,
+        )
+
+
+def flush_slow_queries(connection):
+    """Write the samples buffered on ``connection``, unless it is inside a transaction again."""
+    samples = getattr(connection, 'slow_query_samples', None)
+    if not samples or connection.in_atomic_block:
+        return
+    connection.slow_query_samples = []
+    _state.active = True
+    try:
+        for sample in samples:
+            try:
+                record_slow_query(connection, *sample)
+            except Exception:
+                logger.exception("Could not record slow query")
+    finally:
+        _state.active = False
+
+
+class SlowQueryWrapper:
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_state, 'active', False):
+            # Our own bookkeeping queries (and their EXPLAIN) are not measured
+            return execute(sql, params, many, context)
+        connection = context['connection']
+        # Not on the BEGIN that sqlite issues while opening a transaction, still in autocommit mode
+        can_flush = connection.get_autocommit() and not _TRANSACTION_RE.match(sql)
+        if can_flush:
+            # Samples left by a rolled back transaction
+            flush_slow_queries(connection)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= self.threshold_ms and not many:
+            self.sample(connection, sql, params, duration_ms, can_flush)
+        return result
+
+    def sample(self, connection, sql, params, duration_ms, can_flush):
+        site = call_site()
+        normalized = normalize_sql(sql)
+        logger.warning("Slow query (%.1f ms) at %s [%s]: %s", duration_ms, site or '?', fingerprint(normalized), normalized[:500])
+        samples = getattr(connection, 'slow_query_samples', None)
+        if samples is None:
+            samples = connection.slow_query_samples = []
+        if len(samples) >= MAX_BUFFERED:
+            return
+        samples.append((sql, params, duration_ms, site, timezone.now()))
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: flush_slow_queries(connection), using=connection.alias)
+        elif can_flush:
+            flush_slow_queries(connection)
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """``connection_created`` receiver adding the wrapper to each new connection."""
+    if not any(isinstance(w, SlowQueryWrapper) for w in connection.execute_wrappers):
+        # Insert first: execute_wrapper() context managers pop() the last entry on exit,
+        # and a connection can be created while one of them is active
+        connection.execute_wrappers.insert(0, SlowQueryWrapper(getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)))
@@ -0,0 +1,187 @@
+"""
+Next-day appointment reminders.
+
+``send_appointment_reminders()`` streams tomorrow's ``confirmé``
+appointments (one range query on ``(status, date_time)`` joined to client
+and doctor) with ``.iterator()``, renders the e-mails a chunk at a time and
+sends each chunk over one SMTP connection that stays open for the run.
+
+The appointments of a chunk are claimed in a short transaction
+(``select_for_update(skip_locked=True)``, then a ``reminder_claimed_until``
+lease of ``REMINDER_CLAIM_SECONDS``), so overlapping runs skip them. Their
+messages are then sent one at a time outside any transaction: no row lock
+is held while the mail server is slow, and patient, admin and bulk updates
+of those appointments do not wait. Each appointment is stamped on its own
+once its message is out: ``reminder_sent_at`` when it went out, or
+``reminder_refused_at`` when the server refused the address permanently
+(5xx). That address is not retried. A message that fails (connection
+lost, temporary refusal) gives its claim back and is retried on the next
+run. A run that dies mid-chunk leaves leases that expire on their own.
+"""
+import logging
+import smtplib
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment
+
+logger = logging.getLogger(__name__)
+
+REMINDER_SUBJECT = "Rappel : votre rendez-vous demain à {time}"
+REMINDER_BODY = (
+    "Bonjour {client_name},\n\n"
+    "Nous vous rappelons votre rendez-vous avec Dr. {doctor_name} demain, le {date} à {time}.\n"
+    "Adresse : {address}\n\n"
+    "En cas d'empêchement, merci d'annuler votre rendez-vous depuis votre espace patient "
+    "afin de libérer le créneau.\n\n"
+    "L'équipe Cura-time"
+)
+
+ROW_FIELDS = (
+    'id', 'date_time',
+    'client__email', 'client__first_name', 'client__last_name',
+    'doctor__first_name', 'doctor__last_name', 'doctor__address', 'doctor__city',
+)
+
+
+def reminder_window(day=None):
+    """``[start, end)`` of ``day`` (default: tomorrow) in the current time zone."""
+    day = day or timezone.localdate() + timedelta(days=1)
+    start = timezone.make_aware(datetime.combine(day, dt_time.min))
+    return start, start + timedelta(days=1)
+
+
+def due_reminders(day=None):
+    start, end = reminder_window(day)
+    return Appointment.objects.filter(
+        status='confirmé', date_time__gte=start, date_time__lt=end,
+        reminder_sent_at__isnull=True, reminder_refused_at__isnull=True,
+    ).order_by('date_time', 'id')
+
+
+def _claim(ids):
+    """Lease the due appointments among ``ids`` to this run; returns their fresh rows."""
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'REMINDER_CLAIM_SECONDS', 900))
+    with transaction.atomic():
+        claimed = list(
+            Appointment.objects.filter(
+                Q(reminder_claimed_until__isnull=True) | Q(reminder_claimed_until__lt=now),
+                id__in=ids, status='confirmé', reminder_sent_at__isnull=True, reminder_refused_at__isnull=True,
+            ).select_for_update(skip_locked=True).values_list('id', flat=True)
+        )
+        # update() keeps reminder bookkeeping out of post_save (live events, doctor cards)
+        Appointment.objects.filter(id__in=claimed).update(reminder_claimed_until=now + lease)
+    # Read after claiming: a reschedule or cancellation since the run started is taken into account
+    return list(Appointment.objects.filter(id__in=claimed).order_by('date_time', 'id').values_list(*ROW_FIELDS))
+
+
+def _release(row, **stamps):
+    """End this run's claim on ``row``, stamping it unless it was rescheduled in the meantime."""
+    Appointment.objects.filter(pk=row[0], date_time=row[1]).update(reminder_claimed_until=None, **stamps)
+
+
+def render_reminder(row, from_email):
+    local = timezone.localtime(row[1])
+    values = {
+        'client_name': f"{row[3]} {row[4]}".strip() or row[2],
+        'doctor_name': f"{row[5]} {row[6]}".strip(),
+        'date': local.strftime('%d/%m/%Y'),
+        'time': local.strftime('%H:%M'),
+        'address': ', '.join(part for part in (row[7], row[8]) if part),
+    }
+    return EmailMessage(
+        subject=REMINDER_SUBJECT.format(**values),
+        body=REMINDER_BODY.format(**values),
+        from_email=from_email,
+        to=[row[2]],
+    )
+
+
+def send_appointment_reminders(day=None, chunk_size=None, dry_run=False):
+    """Send reminders for ``day`` (default: tomorrow). Returns counts."""
+    chunk_size = chunk_size or getattr(settings, 'REMINDER_CHUNK_SIZE', 200)
+    from_email = getattr(settings, 'REMINDER_FROM_EMAIL', None) or settings.EMAIL_HOST_USER
+    rows = due_reminders(day).values_list(*ROW_FIELDS)
+    stats = {'sent': 0, 'skipped': 0, 'failed': 0, 'refused': 0, 'chunks': 0, 'failed_chunks': 0}
+    started = time.monotonic()
+
+    if dry_run:
+        stats['due'] = rows.count()
+        return stats
+
+    connection = get_connection(fail_silently=False)
+    connection.open()
+    try:
+        chunk = []
+        for row in rows.iterator(chunk_size=2000):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                _send_chunk(chunk, connection, from_email, stats)
+                chunk = []
+        if chunk:
+            _send_chunk(chunk, connection, from_email, stats)
+    finally:
+        connection.close()
+
+    stats['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+    logger.info("Appointment reminders: %s", stats)
+    return stats
+
+
+def permanently_refused(error):
+    """True when every recipient was refused with a 5xx code (bad address, unknown user)."""
+    return isinstance(error, smtplib.SMTPRecipientsRefused) and bool(error.recipients) and all(
+        code >= 500 for code, _ in error.recipients.values()
+    )
+
+
+def _send_one(message, connection):
+    """Send ``message``; returns None on success, else 'refused' (permanent) or 'failed' (retry later)."""
+    try:
+        connection.send_messages([message])
+    except Exception as e:
+        if permanently_refused(e):
+            logger.warning("Reminder to %s refused permanently: %s", message.to[0], e)
+            return 'refused'
+        logger.warning("Reminder to %s failed, it will be retried on the next run: %s", message.to[0], e)
+        # The connection may be left broken: start the next message on a fresh one
+        connection.close()
+        try:
+            connection.open()
+        except Exception:
+            pass  # send_messages() opens one itself if this failed
+        return 'failed'
+    return None
+
+
+def _send_chunk(chunk, connection, from_email, stats):
+    stats['chunks'] += 1
+    try:
+        rows = _claim([row[0] for row in chunk])
+    except Exception:
+        stats['failed_chunks'] += 1
+        logger.exception("Reminder chunk of %s appointments failed; it will be retried on the next run", len(chunk))
+        return
+    stats['skipped'] += len(chunk) - len(rows)
+    for row in rows:
+        if not row[2]:
+            stats['skipped'] += 1
+            _release(row, reminder_sent_at=timezone.now())
+            continue
+        outcome = _send_one(render_reminder(row, from_email), connection)
+        if outcome is None:
+            stats['sent'] += 1
+            _release(row, reminder_sent_at=timezone.now())
+        elif outcome == 'refused':
+            stats['refused'] += 1
+            _release(row, reminder_refused_at=timezone.now())
+        else:
+            stats['failed'] += 1
+            _release(row)
@@ -0,0 +1,43 @@
+"""
+orjson-backed JSON renderer and parser.
+
+Output matches DRF's ``JSONRenderer`` (Decimal as number, ``Z``-suffixed
+UTC datetimes, lazy translations as strings) but is several times faster
+on large lists. Falls back to the stock DRF classes when orjson is not
+installed.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Decimal, lazy translation strings, timedelta, querysets... as DRF would encode them
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,347 @@
+"""
+GraphQL read API (``/api/graphql/``) over users, doctors, specialties and
+appointments.
+
+Relations are resolved through per-request batch loaders: every list
+resolver primes the loaders with the foreign keys of its rows, so a nested
+query such as ``appointments { doctor { specialization { name } } client { email } }``
+costs one query per type no matter how many rows come back.
+Depth and cost limits are enforced at validation time, before any resolver runs.
+"""
+from collections import defaultdict
+
+import graphene
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from graphene.types.generic import GenericScalar
+from graphene.validation import depth_limit_validator
+from graphene_django import DjangoObjectType
+from graphene_django.views import GraphQLView
+from graphql import (
+    FieldNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode, IntValueNode,
+    ValidationRule, get_named_type, get_nullable_type, is_list_type, specified_rules,
+)
+from rest_framework.exceptions import AuthenticationFailed
+from django.http import JsonResponse
+
+from .authentication import CachedJWTAuthentication
+from .availability import expand_availability
+from .images import variant_urls
+from .models import Appointment, Doctor, Specialty, User
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+# ---------------
+# Batch loaders
+# ---------------
+class BatchLoader:
+    """
+    Synchronous DataLoader: keys queued with ``prime()`` are fetched together
+    by ``batch_fn`` on the first ``load()`` that misses the cache.
+    """
+
+    def __init__(self, batch_fn, default=None):
+        self.batch_fn = batch_fn
+        self.default = default
+        self.cache = {}
+        self.pending = set()
+
+    def prime(self, keys):
+        self.pending.update(k for k in keys if k is not None and k not in self.cache)
+
+    def seed(self, values):
+        """Cache objects that were already fetched by another query."""
+        self.cache.update(values)
+        self.pending.difference_update(values)
+
+    def load(self, key):
+        if key is None:
+            return self.default
+        if key not in self.cache:
+            self.pending.add(key)
+            keys, self.pending = self.pending, set()
+            found = self.batch_fn(list(keys))
+            for k in keys:
+                self.cache[k] = found.get(k, self.default)
+        return self.cache[key]
+
+
+class Loaders:
+    def __init__(self):
+        self.users = BatchLoader(self._users)
+        self.doctors = BatchLoader(self._doctors)
+        self.doctors_by_user = BatchLoader(self._doctors_by_user)
+        self.specialties = BatchLoader(self._specialties)
+        self.doctors_by_specialty = BatchLoader(self._doctors_by_specialty, default=[])
+        self.upcoming_by_doctor = BatchLoader(self._upcoming_by_doctor, default=[])
+
+    def prime_doctors(self, doctors):
+        self.doctors.seed({d.id: d for d in doctors})
+        self.specialties.prime(d.specialization_id for d in doctors)
+        self.users.prime(d.user_id for d in doctors)
+
+    def prime_appointments(self, appointments):
+        self.doctors.prime(a.doctor_id for a in appointments)
+        self.users.prime(a.client_id for a in appointments)
+
+    def _users(self, ids):
+        return {u.id: u for u in User.objects.filter(id__in=ids)}
+
+    def _doctors(self, ids):
+        doctors = list(Doctor.objects.filter(id__in=ids))
+        self.prime_doctors(doctors)
+        return {d.id: d for d in doctors}
+
+    def _doctors_by_user(self, user_ids):
+        doctors = list(Doctor.objects.filter(user_id__in=user_ids))
+        self.prime_doctors(doctors)
+        return {d.user_id: d for d in doctors}
+
+    def _specialties(self, ids):
+        return {s.id: s for s in Specialty.objects.filter(id__in=ids)}
+
+    def _doctors_by_specialty(self, specialty_ids):
+        grouped = defaultdict(list)
+        doctors = list(Doctor.objects.filter(specialization_id__in=specialty_ids))
+        self.prime_doctors(doctors)
+        for doctor in doctors:
+            grouped[doctor.specialization_id].append(doctor)
+        return grouped
+
+    def _upcoming_by_doctor(self, keys):
+        """Keys are ``(doctor_id, limit)``: at most ``limit`` future appointments per doctor."""
+        grouped = defaultdict(list)
+        limit = max(k[1] for k in keys)
+        appointments = list(
+            Appointment.objects.filter(doctor_id__in={k[0] for k in keys}, date_time__gte=timezone.now())
+            .annotate(rank=Window(RowNumber(), partition_by=[F('doctor_id')], order_by=[F('date_time').asc(), F('id').asc()]))
+            .filter(rank__lte=limit)
+            .order_by('doctor_id', 'date_time', 'id')
+        )
+        self.prime_appointments(appointments)
+        for appointment in appointments:
+            grouped[appointment.doctor_id].append(appointment)
+        return {k: grouped[k[0]][:k[1]] for k in keys}
+
+
+def get_loaders(info):
+    request = info.context
+    if not hasattr(request, '_graphql_loaders'):
+        request._graphql_loaders = Loaders()
+    return request._graphql_loaders
+
+
+def page(first, offset):
+    first = max(0, min(first or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    offset = max(0, offset or 0)
+    return slice(offset, offset + first)
+
+
+def current_user(info):
+    user = info.context.user
+    return user if user.is_authenticated else None
+
+
+# -------
+# Types
+# -------
+class SpecialtyType(DjangoObjectType):
+    doctors = graphene.List(graphene.NonNull(lambda: DoctorType), first=graphene.Int())
+
+    class Meta:
+        model = Specialty
+        fields = ('id', 'name', 'description')
+
+    def resolve_doctors(root, info, first=None):
+        return get_loaders(info).doctors_by_specialty.load(root.id)[page(first, 0)]
+
+
+class UserType(DjangoObjectType):
+    doctor = graphene.Field(lambda: DoctorType)
+
+    class Meta:
+        model = User
+        fields = ('id', 'email', 'first_name', 'last_name', 'user_role', 'is_active', 'date_joined', 'adresse', 'gender')
+
+    def resolve_doctor(root, info):
+        return get_loaders(info).doctors_by_user.load(root.id)
+
+
+class DoctorType(DjangoObjectType):
+    specialization = graphene.Field(SpecialtyType)
+    user = graphene.Field(UserType)
+    availability = GenericScalar()
+    photo_variants = GenericScalar()
+    upcoming_appointments = graphene.List(graphene.NonNull(lambda: AppointmentType), first=graphene.Int())
+
+    class Meta:
+        model = Doctor
+        fields = (
+            'id', 'first_name', 'last_name', 'email', 'phone', 'address', 'city', 'state', 'zip_code',
+            'bio', 'photo', 'consultation_fee', 'specialization', 'user', 'availability',
+        )
+
+    def resolve_specialization(root, info):
+        return get_loaders(info).specialties.load(root.specialization_id)
+
+    def resolve_availability(root, info):
+        return expand_availability(root)
+
+    def resolve_photo_variants(root, info):
+        return variant_urls(root, info.context)
+
+    @staticmethod
+    def _is_self_or_admin(root, info):
+        user = current_user(info)
+        return user is not None and (user.user_role == 'admin' or user.email == root.email)
+
+    def resolve_user(root, info):
+        if not DoctorType._is_self_or_admin(root, info):
+            return None
+        return get_loaders(info).users.load(root.user_id)
+
+    def resolve_upcoming_appointments(root, info, first=None):
+        if not DoctorType._is_self_or_admin(root, info):
+            return []
+        # Only loaded for the doctor being resolved (self or admin), never primed for whole lists
+        return get_loaders(info).upcoming_by_doctor.load((root.id, page(first, 0).stop))
+
+
+class AppointmentType(DjangoObjectType):
+    doctor = graphene.Field(DoctorType)
+    client = graphene.Field(UserType)
+
+    class Meta:
+        model = Appointment
+        fields = ('id', 'date_time', 'status', 'created_at', 'updated_at', 'doctor', 'client')
+
+    def resolve_doctor(root, info):
+        return get_loaders(info).doctors.load(root.doctor_id)
+
+    def resolve_client(root, info):
+        return get_loaders(info).users.load(root.client_id)
+
+
+class Query(graphene.ObjectType):
+    me = graphene.Field(UserType)
+    specialties = graphene.List(graphene.NonNull(SpecialtyType))
+    doctors = graphene.List(graphene.NonNull(DoctorType), specialty=graphene.ID(), first=graphene.Int(), offset=graphene.Int())
+    doctor = graphene.Field(DoctorType, id=graphene.ID(required=True))
+    appointments = graphene.List(graphene.NonNull(AppointmentType), status=graphene.String(), first=graphene.Int(), offset=graphene.Int())
+
+    def resolve_me(root, info):
+        return current_user(info)
+
+    def resolve_specialties(root, info):
+        specialties = list(Specialty.objects.order_by('name'))
+        loaders = get_loaders(info)
+        loaders.specialties.seed({s.id: s for s in specialties})
+        loaders.doctors_by_specialty.prime(s.id for s in specialties)
+        return specialties
+
+    def resolve_doctors(root, info, specialty=None, first=None, offset=None):
+        queryset = Doctor.objects.all()
+        if specialty is not None:
+            queryset = queryset.filter(specialization_id=specialty)
+        doctors = list(queryset[page(first, offset)])
+        get_loaders(info).prime_doctors(doctors)
+        return doctors
+
+    def resolve_doctor(root, info, id):
+        return get_loaders(info).doctors.load(int(id))
+
+    def resolve_appointments(root, info, status=None, first=None, offset=None):
+        user = current_user(info)
+        if user is None:
+            raise GraphQLError("Authentification requise")
+        queryset = Appointment.objects.order_by('-date_time')
+        if user.user_role == 'doctor':
+            queryset = queryset.filter(doctor__email=user.email)
+        elif user.user_role != 'admin':
+            queryset = queryset.filter(client=user)
+        if status:
+            queryset = queryset.filter(status=status)
+        appointments = list(queryset[page(first, offset)])
+        get_loaders(info).prime_appointments(appointments)
+        return appointments
+
+
+schema = graphene.Schema(query=Query)
+
+
+# ------------------
+# Validation limits
+# ------------------
+class QueryCostRule(ValidationRule):
+    """
+    Rejects operations whose estimated cost exceeds ``GRAPHQL_MAX_COST``.
+    Each field costs 1, multiplied by the page size of every enclosing list
+    (``first`` when given literally, else the default/maximum page size).
+    """
+
+    def enter_operation_definition(self, node, *args):
+        max_cost = getattr(settings, 'GRAPHQL_MAX_COST', 20000)
+        root_type = self.context.schema.get_root_type(node.operation)
+        cost = self._cost(node.selection_set, root_type, 1, frozenset())
+        if cost > max_cost:
+            self.report_error(GraphQLError(
+                f"Requête trop coûteuse: coût estimé {cost}, maximum {max_cost}.", node
+            ))
+
+    def _cost(self, selection_set, parent_type, multiplier, visited):
+        schema = self.context.schema
+        total = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                total += multiplier
+                fields = getattr(parent_type, 'fields', {})
+                field = fields.get(selection.name.value)
+                if field is None or selection.selection_set is None:
+                    continue
+                field_type = get_nullable_type(field.type)
+                child_multiplier = multiplier
+                if is_list_type(field_type):
+                    child_multiplier *= self._list_size(selection)
+                total += self._cost(selection.selection_set, get_named_type(field_type), child_multiplier, visited)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent_type
+                total += self._cost(selection.selection_set, fragment_type, multiplier, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.context.get_fragment(name)
+                if fragment is None or name in visited:
+                    continue  # unknown fragments and cycles are reported by the standard rules
+                fragment_type = schema.get_type(fragment.type_condition.name.value)
+                total += self._cost(fragment.selection_set, fragment_type, multiplier, visited | {name})
+        return total
+
+    @staticmethod
+    def _list_size(node):
+        for argument in node.arguments or ():
+            if argument.name.value == 'first':
+                if isinstance(argument.value, IntValueNode):
+                    return max(1, min(int(argument.value.value), MAX_PAGE_SIZE))
+                return MAX_PAGE_SIZE  # variable: assume the worst
+        return DEFAULT_PAGE_SIZE
+
+
+class AuthenticatedGraphQLView(GraphQLView):
+    """GraphQL endpoint authenticated with the same JWT bearer tokens as the REST API."""
+
+    validation_rules = tuple(specified_rules) + (
+        depth_limit_validator(max_depth=getattr(settings, 'GRAPHQL_MAX_DEPTH', 6)),
+        QueryCostRule,
+    )
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            result = CachedJWTAuthentication().authenticate(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({'errors': [{'message': str(e.detail)}]}, status=401)
+        if result is not None:
+            request.user = result[0]
+        return super().dispatch(request, *args, **kwargs)
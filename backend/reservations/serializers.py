@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from .models import User, Doctor, Appointment, Specialty
+from .models import User, Doctor, Appointment, Specialty, DoctorCard, ActivityEvent, PurgeJob, DoctorStatusJob
 from datetime import datetime
 from django.utils import timezone
+from .images import variant_urls
+from .availability import compact_overrides, expand_availability, normalize_rules
+from .fieldsets import SparseFieldsMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['first_name', 'last_name', 'email', 'password', 'adresse', 'gender', 'user_role']
@@ -31,7 +34,7 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
-class UserUpdateSerializer(serializers.ModelSerializer):
+class UserUpdateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False, allow_blank=False)
 
     class Meta:
@@ -60,11 +63,52 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         return instance
 
 
-class DoctorSerializer(serializers.ModelSerializer):
+class SpecializationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Specialty
+        fields = ['id', 'name', 'description']
+
+
+class DoctorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Resized WebP variants of `photo` ({'thumb': url, 'card': url}); prefer these on list pages
+    photo_variants = serializers.SerializerMethodField()
+
+    expandable_fields = {
+        'specialization': (SpecializationSerializer, {}),
+    }
+    sparse_requires = {
+        'photo_variants': ('photo_variants',),
+        'availability': ('availability', 'availability_rules'),
+    }
+
     class Meta:
         model = Doctor
         fields = '__all__'  # All fields including availability
 
+    def get_photo_variants(self, obj):
+        return variant_urls(obj, self.context.get('request'))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Old clients only read `availability`: give them the rules expanded over the requested window
+        if 'availability' in data and instance.availability_rules:
+            start, end = self.context.get('availability_window') or (None, None)
+            data['availability'] = expand_availability(instance, start, end)
+        return data
+
+    def validate_availability_rules(self, value):
+        try:
+            return normalize_rules(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate(self, attrs):
+        rules = attrs.get('availability_rules', getattr(self.instance, 'availability_rules', None))
+        if 'availability' in attrs and rules:
+            previous = expand_availability(self.instance) if self.instance is not None else None
+            attrs['availability'] = compact_overrides(attrs['availability'], rules, previous)
+        return attrs
+
     def validate_availability(self, value):
         # Validate the availability format (keys are dates, values are lists of strings)
         if not isinstance(value, dict):
@@ -85,13 +129,23 @@ class DoctorSerializer(serializers.ModelSerializer):
         return value
 
 
-class SpecializationSerializer(serializers.ModelSerializer):
+class DoctorCardSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='doctor_id', read_only=True)
+    photo_variants = serializers.SerializerMethodField()
+
     class Meta:
-        model = Specialty
-        fields = ['id', 'name', 'description']
+        model = DoctorCard
+        fields = [
+            'id', 'first_name', 'last_name', 'email', 'phone', 'city', 'specialty_id', 'specialty_name',
+            'consultation_fee', 'photo_variants', 'is_active', 'next_available_slot',
+            'appointment_count', 'upcoming_appointment_count',
+        ]
+
+    def get_photo_variants(self, obj):
+        return variant_urls(obj, self.context.get('request'))
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     doctor = DoctorSerializer(read_only=True)
     client = UserSerializer(read_only=True)
 
@@ -119,6 +173,12 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         fields = ['id', 'doctor', 'date_time', 'status']
         read_only_fields = ['client']
 
+    def validate_doctor(self, value):
+        """A deactivated doctor's slots are not bookable (see reservations.deactivation)."""
+        if value.user_id and not value.user.is_active:
+            raise serializers.ValidationError("Ce médecin ne prend plus de rendez-vous pour le moment.")
+        return value
+
     def validate_date_time(self, value):
         """Ensure the appointment date and time is in the future."""
         if value < timezone.now():
@@ -137,6 +197,56 @@ class AppointmentStatusSerializer(serializers.ModelSerializer):
         fields = ['status']
 
 
+class AppointmentBulkFilterSerializer(serializers.Serializer):
+    doctor = serializers.IntegerField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=['pending', 'confirmé', 'terminé', 'annulé'], required=False)
+
+
+class AppointmentBulkStatusSerializer(serializers.Serializer):
+    """Either `ids` or `filter` selects the appointments to move to `status`."""
+    MAX_IDS = 1000
+
+    status = serializers.ChoiceField(choices=list(Appointment.STATUS_TRANSITIONS))
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=MAX_IDS)
+    filter = AppointmentBulkFilterSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Fournir soit 'ids', soit 'filter'.")
+        filters = attrs.get('filter')
+        if filters is not None and not filters:
+            raise serializers.ValidationError("'filter' doit contenir au moins un critère.")
+        return attrs
+
+
+class ActivityEventSerializer(serializers.ModelSerializer):
+    date = serializers.DateTimeField(source='created_at', read_only=True)
+
+    class Meta:
+        model = ActivityEvent
+        fields = ['id', 'type', 'message', 'status', 'object_type', 'object_id', 'actor_id', 'data', 'date']
+
+
+class PurgeJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PurgeJob
+        fields = [
+            'id', 'target_type', 'target_id', 'label', 'status', 'step', 'progress', 'attempts', 'error',
+            'requested_by_id', 'created_at', 'updated_at', 'finished_at',
+        ]
+
+
+class DoctorStatusJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DoctorStatusJob
+        fields = [
+            'id', 'doctor', 'action', 'status', 'step', 'progress', 'attempts', 'error',
+            'requested_by_id', 'created_at', 'updated_at', 'finished_at',
+        ]
+
+
 class ForgotPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
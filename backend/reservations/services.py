@@ -0,0 +1,100 @@
+"""
+Write paths shared by several views and background jobs.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Appointment
+from .signals import appointments_bulk_status_changed
+
+logger = logging.getLogger(__name__)
+
+
+def bulk_transition_status(queryset, new_status, ids=None, allowed_from=None):
+    """
+    Move the appointments of ``queryset`` (optionally narrowed to ``ids``) to
+    ``new_status`` with a single UPDATE, honouring ``Appointment.STATUS_TRANSITIONS``.
+
+    Rows are locked for the duration of the read + update so the returned
+    per-id outcomes match what was actually written. Returns
+    ``(updated_ids, outcomes)`` where ``outcomes`` maps every requested id to
+    ``{'outcome': 'updated'|'unchanged'|'invalid_transition'|'not_found', 'status': ...}``
+    (updated rows also carry their ``previous`` status).
+
+    ``allowed_from`` overrides the source statuses for system jobs.
+    """
+    if allowed_from is None:
+        allowed_from = Appointment.STATUS_TRANSITIONS[new_status]
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+
+    with transaction.atomic():
+        current = dict(queryset.select_for_update().values_list('id', 'status'))
+        updated_ids = [pk for pk, old in current.items() if old in allowed_from]
+        if updated_ids:
+            Appointment.objects.filter(id__in=updated_ids).update(
+                status=new_status, updated_at=timezone.now()
+            )
+
+    outcomes = {}
+    for pk in (ids if ids is not None else current):
+        old = current.get(pk)
+        if old is None:
+            outcomes[pk] = {'outcome': 'not_found', 'status': None}
+        elif old == new_status:
+            outcomes[pk] = {'outcome': 'unchanged', 'status': old}
+        elif old in allowed_from:
+            outcomes[pk] = {'outcome': 'updated', 'status': new_status, 'previous': old}
+        else:
+            outcomes[pk] = {'outcome': 'invalid_transition', 'status': old}
+
+    if updated_ids:
+        # One notification for the whole batch: listeners refresh counters/caches in a single pass
+        previous = {pk: current[pk] for pk in updated_ids}
+        transaction.on_commit(lambda: appointments_bulk_status_changed.send(
+            sender=Appointment, ids=updated_ids, previous=previous, status=new_status
+        ))
+    return updated_ids, outcomes
+
+
+def sweep_overdue_appointments(batch_size=None, grace_minutes=None, max_batches=None):
+    """
+    Mark past ``pending``/``confirmé`` appointments as ``terminé``.
+
+    Works in batches of ``batch_size`` ids read from the (status, date_time)
+    index, each updated in its own short transaction, so the table is never
+    locked for long. Returns counts for monitoring.
+    """
+    batch_size = batch_size or getattr(settings, 'APPOINTMENT_SWEEP_BATCH_SIZE', 500)
+    if grace_minutes is None:
+        grace_minutes = getattr(settings, 'APPOINTMENT_SWEEP_GRACE_MINUTES', 60)
+    sources = ['pending', 'confirmé']
+    cutoff = timezone.now() - timedelta(minutes=grace_minutes)
+
+    started = time.monotonic()
+    stats = {'batches': 0, 'completed': 0, 'from_pending': 0, 'from_confirmed': 0}
+    overdue = Appointment.objects.filter(status__in=sources, date_time__lt=cutoff).order_by('date_time', 'id')
+
+    while max_batches is None or stats['batches'] < max_batches:
+        ids = list(overdue.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        updated_ids, outcomes = bulk_transition_status(
+            Appointment.objects.filter(date_time__lt=cutoff), 'terminé', ids=ids, allowed_from=sources
+        )
+        stats['batches'] += 1
+        if not updated_ids:
+            break
+        stats['completed'] += len(updated_ids)
+        for pk in updated_ids:
+            key = 'from_pending' if outcomes[pk]['previous'] == 'pending' else 'from_confirmed'
+            stats[key] += 1
+    stats['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+    stats['cutoff'] = cutoff.isoformat()
+    logger.info("Appointment sweep: %s", stats)
+    return stats
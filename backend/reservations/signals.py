@@ -0,0 +1,258 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import activity
+from .bootstrap import appointment_section_keys, profile_section_keys, specialty_section_keys
+from .cache import SPECIALTIES_KEY, auth_user_key, doctor_profile_key, invalidate_doctor_list, invalidate_single_flight
+from .cards import refresh_doctor_cards
+from .events import publish_appointment_event, publish_stream_revoked
+from .images import schedule_photo_processing
+from .models import Appointment, AppointmentTombstone, Doctor, DoctorCard, Specialty, User
+from .slots import invalidate_free_slots
+
+# Sent once per bulk status UPDATE (which bypasses post_save).
+# kwargs: ids (list), previous ({id: old_status}), status (new status)
+appointments_bulk_status_changed = Signal()
+
+
+@receiver(post_init, sender=Doctor)
+def remember_doctor_photo(sender, instance, **kwargs):
+    if 'photo' not in instance.__dict__:
+        # Deferred by .only(); saving such an instance only writes its loaded fields
+        return
+    instance._original_photo = instance.photo.name if instance.photo else None
+
+
+@receiver(post_save, sender=Doctor)
+def process_doctor_photo_on_change(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'photo' not in update_fields:
+        return
+    current = instance.photo.name if instance.photo else None
+    if current != getattr(instance, '_original_photo', None):
+        schedule_photo_processing(instance.pk)
+    instance._original_photo = current
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_date_time(sender, instance, **kwargs):
+    instance._original_date_time = instance.__dict__.get('date_time')
+    instance._original_status = instance.__dict__.get('status')
+    instance._original_doctor_id = instance.__dict__.get('doctor_id')
+
+
+@receiver(pre_save, sender=Appointment)
+def reset_reminder_on_reschedule(sender, instance, **kwargs):
+    # A rescheduled appointment needs a new reminder for its new day
+    if instance.pk and instance.reminder_sent_at and instance.date_time != instance._original_date_time:
+        instance.reminder_sent_at = None
+
+
+@receiver(post_delete, sender=Appointment)
+def record_appointment_tombstone(sender, instance, **kwargs):
+    AppointmentTombstone.objects.create(
+        appointment_id=instance.pk,
+        client_id=instance.client_id,
+        doctor_id=instance.doctor_id,
+    )
+
+
+@receiver(post_save, sender=Appointment)
+def record_reassignment_tombstone(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_original_doctor_id', None)
+    if not created and previous is not None and previous != instance.doctor_id:
+        # Leaves the old doctor's changes feed, which no longer returns the appointment
+        AppointmentTombstone.objects.create(
+            appointment_id=instance.pk, client_id=None, doctor_id=previous, reassigned=True,
+        )
+    instance._original_doctor_id = instance.doctor_id
+
+
+@receiver(post_save, sender=Appointment)
+def publish_appointment_saved(sender, instance, created, **kwargs):
+    event_type = 'appointment.created' if created else 'appointment.updated'
+    transaction.on_commit(lambda: publish_appointment_event(
+        event_type, instance.pk, instance.doctor_id, instance.status
+    ))
+
+
+@receiver(appointments_bulk_status_changed)
+def publish_appointments_bulk_status(sender, ids, previous, status, **kwargs):
+    # Sent after commit already; one query for all doctor ids of the batch
+    for appointment_id, doctor_id in Appointment.objects.filter(id__in=ids).values_list('id', 'doctor_id'):
+        publish_appointment_event('appointment.updated', appointment_id, doctor_id, status)
+
+
+@receiver(post_save, sender=User)
+def revoke_streams_of_inactive_user(sender, instance, **kwargs):
+    # Deactivation and soft delete both clear is_active
+    if not instance.is_active:
+        user_id = instance.pk
+        transaction.on_commit(lambda: publish_stream_revoked(user_id))
+
+
+@receiver(post_delete, sender=User)
+def revoke_streams_of_deleted_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: publish_stream_revoked(user_id))
+
+
+# --- DoctorCard read model ---
+
+@receiver(post_save, sender=Doctor)
+def refresh_card_on_doctor_save(sender, instance, **kwargs):
+    refresh_doctor_cards([instance.pk])
+
+
+@receiver(post_save, sender=Specialty)
+def refresh_cards_on_specialty_save(sender, instance, **kwargs):
+    DoctorCard.objects.filter(specialty_id=instance.pk).update(specialty_name=instance.name)
+
+
+@receiver(post_save, sender=User)
+def refresh_card_on_user_save(sender, instance, **kwargs):
+    if instance.user_role == User.UserRole.DOCTOR:
+        DoctorCard.objects.filter(doctor__user_id=instance.pk).update(
+            is_active=instance.is_active, date_joined=instance.date_joined
+        )
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def refresh_card_on_appointment_change(sender, instance, **kwargs):
+    doctor_id = instance.doctor_id
+    transaction.on_commit(lambda: refresh_doctor_cards([doctor_id]))
+
+
+# --- Hot lookup cache ---
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_auth_user(sender, instance, **kwargs):
+    cache.delete(auth_user_key(instance.pk))
+
+
+@receiver(post_save, sender=Specialty)
+@receiver(post_delete, sender=Specialty)
+def drop_cached_specialties(sender, instance, **kwargs):
+    invalidate_single_flight(SPECIALTIES_KEY)
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def drop_cached_doctor_profile(sender, instance, **kwargs):
+    cache.delete(doctor_profile_key(instance.pk))
+    invalidate_doctor_list()
+
+
+# --- Dashboard bootstrap sections ---
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def drop_bootstrap_appointment_sections(sender, instance, **kwargs):
+    keys = appointment_section_keys(instance.doctor_id, instance.client_id)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver(appointments_bulk_status_changed)
+def drop_bootstrap_bulk_sections(sender, ids, previous, status, **kwargs):
+    pairs = set(Appointment.objects.filter(id__in=ids).values_list('doctor_id', 'client_id'))
+    cache.delete_many([key for doctor_id, client_id in pairs for key in appointment_section_keys(doctor_id, client_id)])
+
+
+@receiver(post_save, sender=User)
+def drop_bootstrap_user_profile(sender, instance, **kwargs):
+    doctor_id = None
+    if instance.user_role == User.UserRole.DOCTOR:
+        doctor_id = Doctor.objects.filter(user_id=instance.pk).values_list('id', flat=True).first()
+    cache.delete_many(profile_section_keys(user_id=instance.pk, doctor_id=doctor_id))
+
+
+@receiver(post_save, sender=Doctor)
+def drop_bootstrap_doctor_profile(sender, instance, **kwargs):
+    cache.delete_many(profile_section_keys(doctor_id=instance.pk))
+
+
+@receiver(post_save, sender=Specialty)
+@receiver(post_delete, sender=Specialty)
+def drop_bootstrap_specialties(sender, instance, **kwargs):
+    cache.delete_many(specialty_section_keys())
+
+
+# --- Batch free slots ---
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def drop_free_slots_on_appointment_change(sender, instance, **kwargs):
+    doctor_id = instance.doctor_id
+    transaction.on_commit(lambda: invalidate_free_slots(doctor_id))
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def drop_free_slots_on_doctor_change(sender, instance, **kwargs):
+    invalidate_free_slots(instance.pk)
+
+
+@receiver(appointments_bulk_status_changed)
+def free_cancelled_slots(sender, ids, previous, status, **kwargs):
+    # Only cancellations (and their reversal) change which slots are booked
+    if status != 'annulé' and 'annulé' not in previous.values():
+        return
+    doctor_ids = set(Appointment.objects.filter(id__in=ids).values_list('doctor_id', flat=True))
+    for doctor_id in doctor_ids:
+        invalidate_free_slots(doctor_id)
+    refresh_doctor_cards(doctor_ids)
+
+
+# --- Admin activity feed ---
+
+@receiver(post_save, sender=Appointment)
+def record_appointment_activity(sender, instance, created, **kwargs):
+    if created:
+        activity.appointment_created(instance)
+    elif instance._original_status is not None and instance.status != instance._original_status:
+        activity.appointment_status_changed(instance, instance._original_status)
+    instance._original_status = instance.status
+
+
+@receiver(appointments_bulk_status_changed)
+def record_bulk_status_activity(sender, ids, previous, status, **kwargs):
+    activity.appointments_bulk_status_changed(ids, previous, status)
+
+
+@receiver(post_delete, sender=Appointment)
+def record_appointment_deleted_activity(sender, instance, origin=None, **kwargs):
+    # Cascades (a deleted doctor or client) are covered by the event of their origin
+    if origin is None or isinstance(origin, Appointment):
+        activity.appointment_deleted(instance)
+
+
+@receiver(post_save, sender=Doctor)
+def record_doctor_created_activity(sender, instance, created, **kwargs):
+    if created:
+        activity.doctor_created(instance)
+
+
+@receiver(post_delete, sender=Doctor)
+def record_doctor_deleted_activity(sender, instance, **kwargs):
+    if instance.deleted_at is None:
+        # Soft-deleted doctors were recorded when they were hidden (reservations.purge)
+        activity.doctor_deleted(instance)
+
+
+@receiver(post_save, sender=Specialty)
+def record_specialty_activity(sender, instance, created, **kwargs):
+    activity.specialty_changed(instance, created)
+
+
+@receiver(post_delete, sender=Specialty)
+def record_specialty_deleted_activity(sender, instance, **kwargs):
+    activity.specialty_deleted(instance)
+
+
+@receiver(post_save, sender=User)
+def record_client_registered_activity(sender, instance, created, **kwargs):
+    if created and instance.user_role == User.UserRole.CLIENT:
+        activity.client_registered(instance)
@@ -0,0 +1,108 @@
+"""
+Free slots of many doctors over a short date window.
+
+``free_slots(ids, start, end)`` backs ``GET /api/doctors/availability/``.
+It expands explicit dates and recurring rules (see ``availability``) and
+removes booked times (a cancelled appointment frees its slot). Doctors
+missing from the cache cost two queries in total, whatever their number:
+one for their availability columns, one for their appointments in the
+window.
+
+Results are cached per doctor and window. Each key embeds a per-doctor
+generation, and ``invalidate_free_slots()`` replaces that generation when
+the doctor or one of their appointments changes. Every cached window of
+that doctor goes stale at once, without anyone tracking which windows were
+cached. Slots already past are filtered when the response is built, so a
+cached day stays valid all day.
+"""
+import uuid
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .availability import iter_availability
+from .models import Appointment, Doctor
+
+MAX_DOCTORS = 100
+MAX_WINDOW_DAYS = 31
+DEFAULT_WINDOW_DAYS = 7
+
+
+def _generation_key(doctor_id):
+    return f'slots:{doctor_id}:gen'
+
+
+def _slots_key(doctor_id, generation, start, end):
+    return f'slots:{doctor_id}:{generation}:{start.isoformat()}:{end.isoformat()}'
+
+
+def invalidate_free_slots(doctor_id):
+    cache.delete(_generation_key(doctor_id))
+
+
+def _generations(doctor_ids):
+    keys = {_generation_key(doctor_id): doctor_id for doctor_id in doctor_ids}
+    found = cache.get_many(list(keys))
+    generations = {keys[key]: value for key, value in found.items()}
+    for key, doctor_id in keys.items():
+        if doctor_id not in generations:
+            cache.add(key, uuid.uuid4().hex[:12], timeout=None)
+            generations[doctor_id] = cache.get(key)
+    return generations
+
+
+def compute_free_slots(doctor_ids, start, end):
+    """``{doctor_id: [[date, [times]], ...]}`` for existing doctors, booked times removed."""
+    doctors = Doctor.objects.filter(id__in=doctor_ids).only('id', 'availability', 'availability_rules')
+    window_start = timezone.make_aware(datetime.combine(start, dt_time.min))
+    window_end = timezone.make_aware(datetime.combine(end + timedelta(days=1), dt_time.min))
+    booked = {}
+    appointments = Appointment.objects.filter(
+        doctor_id__in=doctor_ids, date_time__gte=window_start, date_time__lt=window_end,
+    ).exclude(status='annulé').values_list('doctor_id', 'date_time')
+    for doctor_id, date_time in appointments:
+        local = timezone.localtime(date_time)
+        booked.setdefault(doctor_id, set()).add((local.date().isoformat(), local.strftime('%H:%M')))
+
+    result = {}
+    for doctor in doctors:
+        taken = booked.get(doctor.id, set())
+        days = []
+        for date_str, times in iter_availability(doctor.availability, doctor.availability_rules, start, end):
+            free = [t for t in times if (date_str, t[:5]) not in taken]
+            if free:
+                days.append([date_str, free])
+        result[doctor.id] = days
+    return result
+
+
+def free_slots(doctor_ids, start, end, now=None):
+    """Cached ``compute_free_slots`` with slots before ``now`` dropped."""
+    doctor_ids = list(dict.fromkeys(doctor_ids))
+    generations = _generations(doctor_ids)
+    keys = {_slots_key(doctor_id, generations[doctor_id], start, end): doctor_id for doctor_id in doctor_ids}
+    cached = cache.get_many(list(keys))
+    result = {keys[key]: value for key, value in cached.items()}
+
+    missing = [doctor_id for doctor_id in doctor_ids if doctor_id not in result]
+    if missing:
+        computed = compute_free_slots(missing, start, end)
+        timeout = getattr(settings, 'FREE_SLOTS_CACHE_TIMEOUT', 300)
+        cache.set_many({
+            _slots_key(doctor_id, generations[doctor_id], start, end): days
+            for doctor_id, days in computed.items()
+        }, timeout=timeout)
+        result.update(computed)
+
+    now = timezone.localtime(now or timezone.now())
+    today, current = now.date().isoformat(), now.strftime('%H:%M')
+    for doctor_id, days in result.items():
+        if days and days[0][0] <= today:
+            result[doctor_id] = [
+                [date_str, times if date_str > today else [t for t in times if t > current]]
+                for date_str, times in days
+                if date_str >= today and (date_str > today or any(t > current for t in times))
+            ]
+    return result
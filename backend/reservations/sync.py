@@ -0,0 +1,101 @@
+"""
+Cursor handling for the appointment changes feed.
+
+A cursor packs the keyset positions (updated_at, id) of the last
+appointment a client has seen and the id of the last tombstone. It is
+opaque to clients; they just echo back the value from the last response.
+
+``updated_at`` and tombstone ids are assigned before their transaction
+commits, so a row can become visible after a later position was already
+handed out. The cursor therefore also carries a "settled" time: the read
+time minus ``SYNC_OVERLAP_SECONDS``, before which every write has
+committed. The next call re-reads the rows between that time and the
+position. A row can then be returned twice (clients upsert by id), but
+none is skipped. While a client pages through a backlog (``has_more``),
+the settled time is the position itself, so pages do not repeat.
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AppointmentTombstone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1) if value else 0
+
+
+def encode_cursor(updated_at, appointment_id, tombstone_id, settled_at=None):
+    raw = f"{_micros(updated_at)}.{appointment_id}.{tombstone_id}.{_micros(settled_at or updated_at)}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """``(updated_at, appointment_id, tombstone_id, settled_at)``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded).decode().split('.')
+        if len(parts) == 3:
+            # Cursor issued before the overlap window: nothing to re-read
+            parts.append(parts[0])
+        micros, appointment_id, tombstone_id, settled = parts
+        updated_at = EPOCH + timedelta(microseconds=int(micros))
+        return updated_at, int(appointment_id), int(tombstone_id), EPOCH + timedelta(microseconds=int(settled))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+
+
+def appointment_changes(appointments, tombstones, cursor=None, limit=500):
+    """
+    Return ``(changed_appointments, deleted_ids, next_cursor, has_more)``.
+
+    ``appointments`` and ``tombstones`` are querysets already scoped to what
+    the caller may see. Without a cursor the full current list is returned
+    (no deletions), as the initial sync.
+    """
+    read_at = timezone.now()
+    if cursor:
+        since_ts, since_id, since_tombstone, settled_at = decode_cursor(cursor)
+        after = Q(updated_at__gt=since_ts) | Q(updated_at=since_ts, id__gt=since_id)
+        new_tombstones = Q(id__gt=since_tombstone)
+        if settled_at < since_ts:
+            # Overlap window: rows that may have committed after the previous read
+            after |= Q(updated_at__gte=settled_at, updated_at__lte=since_ts)
+            new_tombstones |= Q(deleted_at__gte=settled_at)
+        appointments = appointments.filter(after)
+        deleted = list(tombstones.filter(new_tombstones).order_by('id').values_list('id', 'appointment_id'))
+    else:
+        since_ts, since_id = None, 0
+        deleted = []
+        # Start tombstone tracking from "now" for a fresh sync
+        last = AppointmentTombstone.objects.order_by('-id').values_list('id', flat=True).first()
+        since_tombstone = last or 0
+
+    page = list(appointments.order_by('updated_at', 'id')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    if page:
+        since_ts, since_id = page[-1].updated_at, page[-1].id
+    if deleted:
+        since_tombstone = max(since_tombstone, deleted[-1][0])
+
+    settled_at = None
+    if not has_more and since_ts is not None:
+        overlap = timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 5))
+        settled_at = min(since_ts, read_at - overlap)
+    next_cursor = encode_cursor(since_ts, since_id, since_tombstone, settled_at)
+
+    # An appointment moved back to a doctor is both in their tombstones and in the page: keep the row
+    changed_ids = {appointment.id for appointment in page}
+    deleted_ids = [appointment_id for _, appointment_id in deleted if appointment_id not in changed_ids]
+    return page, deleted_ids, next_cursor, has_more
@@ -0,0 +1,48 @@
+try:
+    from celery import shared_task
+except ImportError:  # celery is optional
+    def shared_task(func=None, **kwargs):
+        return func if func is not None else (lambda f: f)
+
+from .archive import archive_appointments
+from .cards import refresh_stale_doctor_cards
+from .deactivation import resume_doctor_status_jobs
+from .idempotency import purge_expired_idempotency_keys
+from .purge import resume_purge_jobs
+from .reminders import send_appointment_reminders
+from .services import sweep_overdue_appointments
+
+
+@shared_task
+def sweep_overdue_appointments_task(batch_size=None, grace_minutes=None, max_batches=None):
+    return sweep_overdue_appointments(batch_size=batch_size, grace_minutes=grace_minutes, max_batches=max_batches)
+
+
+@shared_task
+def archive_appointments_task(older_than_days=None, batch_size=1000, max_batches=None):
+    return archive_appointments(older_than_days=older_than_days, batch_size=batch_size, max_batches=max_batches)
+
+
+@shared_task
+def purge_idempotency_keys_task():
+    return purge_expired_idempotency_keys()
+
+
+@shared_task
+def send_appointment_reminders_task(chunk_size=None):
+    return send_appointment_reminders(chunk_size=chunk_size)
+
+
+@shared_task
+def resume_purge_jobs_task(batch_size=None):
+    return resume_purge_jobs(batch_size=batch_size)
+
+
+@shared_task
+def resume_doctor_status_jobs_task():
+    return resume_doctor_status_jobs()
+
+
+@shared_task
+def refresh_stale_doctor_cards_task():
+    return refresh_stale_doctor_cards()
@@ -1,3 +1,555 @@
-from django.test import TestCase
+import smtplib
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .availability import compact_overrides, expand_availability, normalize_rules
+from .cache import VERSION_SUFFIX, TwoLevelCache, invalidate_single_flight, single_flight
+from .deactivation import run_doctor_status_job, toggle_doctor_active
+from .idempotency import request_fingerprint
+from .models import (
+    ActivityEvent, Appointment, AppointmentTombstone, Doctor, DoctorCard, IdempotencyKey, Specialty, User,
+)
+from .purge import run_purge_job, soft_delete_doctor
+from .reminders import send_appointment_reminders
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'single-flight-tests'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SingleFlightTests(SimpleTestCase):
+    KEY = 'tests:single-flight'
+    THREADS = 12
+
+    def setUp(self):
+        caches['default'].clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def compute(self, value):
+        def _compute():
+            with self.calls_lock:
+                self.calls += 1
+            time.sleep(0.2)  # long enough for every thread to arrive while it runs
+            return value
+        return _compute
+
+    def fire(self, value, **kwargs):
+        """Call single_flight() from THREADS threads released at the same instant."""
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(single_flight(self.KEY, self.compute(value), **kwargs))
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        results = self.fire('fresh', timeout=60)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['fresh'] * self.THREADS)
+
+    def test_stale_value_is_served_while_one_request_recomputes(self):
+        caches['default'].set(self.KEY, {'value': 'stale', 'fresh_until': time.time() - 1}, timeout=60)
+        results = self.fire('fresh', timeout=60)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results.count('fresh'), 1)
+        self.assertEqual(results.count('stale'), self.THREADS - 1)
+        self.assertEqual(single_flight(self.KEY, self.compute('newer'), timeout=60), 'fresh')
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidated_value_is_recomputed_once(self):
+        single_flight(self.KEY, self.compute('old'), timeout=60)
+        invalidate_single_flight(self.KEY)
+        results = self.fire('new', timeout=60)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(results, ['new'] * self.THREADS)
+
+
+
+TWO_LEVEL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'two-level-tests-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'two-level-tests-shared'},
+}
+TWO_LEVEL_OPTIONS = {'SHARED_ALIAS': 'shared', 'LOCAL_TIMEOUT': 60, 'VERSION_CHECK_INTERVAL': 1.0}
+
+
+@override_settings(CACHES=TWO_LEVEL_CACHES)
+class TwoLevelCacheTests(SimpleTestCase):
+    """Two processes sharing one cache: each TwoLevelCache location has its own local level."""
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.now = 1_000_000.0
+        # Both levels read the clock through the time module: locmem uses time(), the local level monotonic()
+        for name in ('time', 'monotonic'):
+            patcher = mock.patch(f'time.{name}', side_effect=lambda: self.now)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.process_a = self.two_level('process-a')
+        self.process_b = self.two_level('process-b')
+
+    def two_level(self, location):
+        cache = TwoLevelCache(location, {'OPTIONS': TWO_LEVEL_OPTIONS})
+        cache.clear()
+        return cache
+
+    def stamp(self, key):
+        return caches['shared'].get(self.process_a.make_key(key) + VERSION_SUFFIX)
+
+    def test_stamp_does_not_outlive_its_entry(self):
+        self.process_a.set('code', '1234', timeout=30)
+        self.now += 30 + 60 - 1
+        self.assertIsNotNone(self.stamp('code'))
+        self.now += 2
+        self.assertIsNone(self.stamp('code'))
+
+    def test_stamp_of_a_deleted_key_expires(self):
+        self.process_a.set('ticket', 'user-1', timeout=30)
+        self.process_a.delete('ticket')
+        self.now += 60 + 1 + 1
+        self.assertIsNone(self.stamp('ticket'))
+
+    def test_expired_shared_value_is_not_served_from_another_local_level(self):
+        self.process_a.set('section', 'payload', timeout=15)
+        self.assertEqual(self.process_b.get('section'), 'payload')  # copied into b's local level
+        self.now += 16
+        self.assertIsNone(self.process_b.get('section'))
+        self.assertIsNone(self.process_a.get('section'))
+
+    def test_delete_reaches_other_local_levels_within_the_check_interval(self):
+        self.process_a.set('profile', 'old', timeout=300)
+        self.assertEqual(self.process_b.get('profile'), 'old')
+        self.process_a.delete('profile')
+        self.now += 1.5
+        self.assertIsNone(self.process_b.get('profile'))
+
+
+def create_doctor(specialty, email, **fields):
+    user = User.objects.create_user(email, 'pw', user_role='doctor')
+    return Doctor.objects.create(**{
+        'user': user, 'first_name': 'Anne', 'last_name': 'Martin', 'email': email, 'phone': '0600000000',
+        'address': '1 rue de la Paix', 'city': 'Paris', 'state': 'IDF', 'zip_code': '75000',
+        'specialization': specialty, **fields,
+    })
+
+
+class RejectingEmailBackend(LocMemEmailBackend):
+    """locmem backend whose server refuses some recipients, like an SMTP server would."""
+    refused = {}  # address -> SMTP code
+
+    def send_messages(self, messages):
+        for message in messages:
+            code = self.refused.get(message.to[0])
+            if code is not None:
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (code, b'refused')})
+        return super().send_messages(messages)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    EMAIL_BACKEND='reservations.tests.RejectingEmailBackend',
+    REMINDER_FROM_EMAIL='noreply@example.com',
+    REMINDER_CHUNK_SIZE=10,
+)
+class AppointmentReminderTests(TestCase):
+    def setUp(self):
+        RejectingEmailBackend.refused = {}
+        self.doctor = create_doctor(Specialty.objects.create(name='Cardiologie'), 'doctor@example.com')
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.appointments = {}
+        for hour, name in enumerate(('a', 'b', 'c', 'd'), start=9):
+            client = User.objects.create_user(f'{name}@example.com', 'pw')
+            self.appointments[name] = Appointment.objects.create(
+                client=client, doctor=self.doctor, status='confirmé',
+                date_time=timezone.make_aware(datetime.combine(tomorrow, dt_time(hour))),
+            )
+
+    def recipients(self):
+        return sorted(message.to[0] for message in mail.outbox)
+
+    def test_rerun_sends_nothing_twice(self):
+        stats = send_appointment_reminders()
+        self.assertEqual(stats['sent'], 4)
+        self.assertEqual(self.recipients(), ['a@example.com', 'b@example.com', 'c@example.com', 'd@example.com'])
+
+        stats = send_appointment_reminders()
+        self.assertEqual(stats['sent'], 0)
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_failed_message_does_not_resend_the_rest_of_its_chunk(self):
+        RejectingEmailBackend.refused = {'b@example.com': 451}  # temporary
+        for _ in range(3):
+            send_appointment_reminders()
+        self.assertEqual(self.recipients(), ['a@example.com', 'c@example.com', 'd@example.com'])
+        self.assertIsNone(Appointment.objects.get(pk=self.appointments['b'].pk).reminder_sent_at)
+
+        RejectingEmailBackend.refused = {}
+        stats = send_appointment_reminders()
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(self.recipients(), ['a@example.com', 'b@example.com', 'c@example.com', 'd@example.com'])
+
+    def test_reminders_claimed_by_another_run_are_skipped_until_the_lease_expires(self):
+        claimed = Appointment.objects.filter(pk=self.appointments['a'].pk)
+        claimed.update(reminder_claimed_until=timezone.now() + timedelta(minutes=5))
+        stats = send_appointment_reminders()
+        self.assertEqual((stats['sent'], stats['skipped']), (3, 1))
+
+        claimed.update(reminder_claimed_until=timezone.now() - timedelta(seconds=1))  # that run died
+        stats = send_appointment_reminders()
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertFalse(Appointment.objects.filter(reminder_claimed_until__isnull=False).exists())
+
+    def test_permanently_refused_address_is_not_retried(self):
+        RejectingEmailBackend.refused = {'c@example.com': 550}
+        stats = send_appointment_reminders()
+        self.assertEqual((stats['sent'], stats['refused']), (3, 1))
+        self.assertIsNotNone(Appointment.objects.get(pk=self.appointments['c'].pk).reminder_refused_at)
+
+        stats = send_appointment_reminders()
+        self.assertEqual((stats['sent'], stats['refused']), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+
+# One worker: sections run inline, inside the test's transaction
+@override_settings(CACHES=LOCMEM_CACHES, BOOTSTRAP_WORKERS=1)
+class BootstrapSharedSectionTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        Specialty.objects.create(name='Cardiologie', description='Coeur')
+        self.admins = [User.objects.create_superuser(f'admin{i}@example.com', 'pw') for i in range(2)]
+
+    def get_bootstrap(self, user, query=''):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f'/api/bootstrap/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['sections']
+
+    def test_sparse_params_do_not_shape_shared_sections(self):
+        sparse = self.get_bootstrap(self.admins[0], '?fields=id')
+        self.assertIn('name', sparse['specialties'][0])
+
+        sections = self.get_bootstrap(self.admins[1])
+        self.assertEqual(sections['specialties'][0]['name'], 'Cardiologie')
+        self.assertIn('description', sections['specialties'][0])
+
+    def test_caller_query_params_do_not_reach_shared_sections(self):
+        ActivityEvent.objects.create(type='appointment_created', message='Nouveau RDV')
+        ActivityEvent.objects.create(type='doctor_created', message='Nouveau médecin')
+        self.get_bootstrap(self.admins[0], '?type=doctor_created&page_size=1')
+
+        sections = self.get_bootstrap(self.admins[1])
+        messages = [event['message'] for event in sections['activities']['results']]
+        self.assertIn('Nouveau RDV', messages)
+        self.assertIn('Nouveau médecin', messages)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PurgeJobTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.doctor = create_doctor(Specialty.objects.create(name='Cardiologie'), 'doctor@example.com')
+        client = User.objects.create_user('client@example.com', 'pw')
+        start = timezone.now() + timedelta(days=1)
+        self.appointment_ids = [
+            Appointment.objects.create(client=client, doctor=self.doctor, date_time=start + timedelta(hours=hour)).pk
+            for hour in range(5)
+        ]
+        AppointmentTombstone.objects.all().delete()
+
+    def soft_delete(self):
+        # Runs the cache invalidation hooks; the background purge is driven by the test
+        with mock.patch('reservations.purge.schedule_purge'), self.captureOnCommitCallbacks(execute=True):
+            return soft_delete_doctor(self.doctor)
+
+    def test_soft_deleted_doctor_is_hidden_right_away(self):
+        client = APIClient()
+        self.assertEqual(len(client.get('/api/doctors/').data), 1)
+        self.assertTrue(DoctorCard.objects.filter(doctor_id=self.doctor.pk).exists())
+
+        self.soft_delete()
+
+        self.assertFalse(Doctor.objects.filter(pk=self.doctor.pk).exists())
+        self.assertTrue(Doctor.all_objects.filter(pk=self.doctor.pk).exists())
+        self.assertEqual(client.get('/api/doctors/').data, [])
+        self.assertEqual(client.get('/api/doctors/cards/').data['results'], [])
+        self.assertEqual(client.get(f'/api/doctors/{self.doctor.pk}/').status_code, 404)
+
+    def test_interrupted_purge_resumes_where_it_stopped(self):
+        job = self.soft_delete()
+
+        self.assertEqual(run_purge_job(job.pk, batch_size=2, max_batches=1), 'running')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.step, job.progress, job.lease_until), ('running', 'appointments', {'appointments': 2}, None))
+        tombstoned = set(AppointmentTombstone.objects.values_list('appointment_id', flat=True))
+        self.assertEqual(tombstoned, set(self.appointment_ids[:2]))
+        self.assertEqual(Appointment.objects.filter(doctor_id=self.doctor.pk).count(), 3)
+
+        self.assertEqual(run_purge_job(job.pk, batch_size=2), 'done')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress['appointments']), ('done', 5))
+        self.assertEqual(
+            sorted(AppointmentTombstone.objects.values_list('appointment_id', flat=True)), self.appointment_ids,
+        )
+        self.assertFalse(Doctor.all_objects.filter(pk=self.doctor.pk).exists())
+        self.assertFalse(User.objects.filter(email='doctor@example.com').exists())
+        self.assertIsNone(run_purge_job(job.pk, batch_size=2))
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    EMAIL_BACKEND='reservations.tests.RejectingEmailBackend',
+    REMINDER_FROM_EMAIL='noreply@example.com',
+    DOCTOR_STATUS_NOTIFY_CHUNK_SIZE=2,
+)
+class DoctorStatusJobTests(TestCase):
+    # Jobs are run directly: the on_commit hook scheduling them never fires in a TestCase
+
+    def setUp(self):
+        RejectingEmailBackend.refused = {}
+        self.doctor = create_doctor(Specialty.objects.create(name='Cardiologie'), 'doctor@example.com')
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.appointments = {}
+        for hour, (name, status) in enumerate((('a', 'pending'), ('b', 'confirmé'), ('c', 'confirmé'), ('d', 'pending')), start=9):
+            client = User.objects.create_user(f'{name}@example.com', 'pw')
+            self.appointments[name] = Appointment.objects.create(
+                client=client, doctor=self.doctor, status=status,
+                date_time=timezone.make_aware(datetime.combine(tomorrow, dt_time(hour))),
+            )
+        self.past = Appointment.objects.create(
+            client=self.appointments['a'].client, doctor=self.doctor, status='confirmé',
+            date_time=timezone.now() - timedelta(days=1),
+        )
+
+    def toggle(self):
+        is_active, job = toggle_doctor_active(self.doctor)
+        self.doctor.user.refresh_from_db()
+        return job
+
+    def statuses(self):
+        return {name: Appointment.objects.get(pk=appointment.pk).status for name, appointment in self.appointments.items()}
+
+    def recipients(self):
+        return sorted(message.to[0] for message in mail.outbox)
+
+    def test_reactivation_restores_previous_statuses_except_rebooked_slots(self):
+        deactivation = self.toggle()
+        self.assertEqual(run_doctor_status_job(deactivation.pk), 'done')
+        self.assertEqual(set(self.statuses().values()), {'annulé'})
+        self.assertEqual(Appointment.objects.get(pk=self.past.pk).status, 'confirmé')
+        self.assertEqual(self.recipients(), ['a@example.com', 'b@example.com', 'c@example.com', 'd@example.com'])
+
+        # d's freed slot is booked by another patient before the doctor comes back
+        Appointment.objects.create(
+            client=User.objects.create_user('e@example.com', 'pw'), doctor=self.doctor,
+            status='pending', date_time=self.appointments['d'].date_time,
+        )
+        mail.outbox = []
+        reactivation = self.toggle()
+        self.assertEqual(run_doctor_status_job(reactivation.pk), 'done')
+
+        self.assertEqual(self.statuses(), {'a': 'pending', 'b': 'confirmé', 'c': 'confirmé', 'd': 'annulé'})
+        reactivation.refresh_from_db()
+        self.assertEqual(reactivation.progress, {'total': 3, 'restored': 3, 'not_restored': 1, 'notified': 3})
+        self.assertEqual(self.recipients(), ['a@example.com', 'b@example.com', 'c@example.com'])
+
+    def test_failed_notification_resumes_at_the_failed_message(self):
+        RejectingEmailBackend.refused = {'c@example.com': 451}
+        job = self.toggle()
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            run_doctor_status_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.step, job.progress['notified'], job.lease_until), ('running', 'notify', 2, None))
+        self.assertEqual(self.recipients(), ['a@example.com', 'b@example.com'])
+
+        RejectingEmailBackend.refused = {}
+        self.assertEqual(run_doctor_status_job(job.pk), 'done')
+        self.assertEqual(self.recipients(), ['a@example.com', 'b@example.com', 'c@example.com', 'd@example.com'])
+        self.assertEqual(set(self.statuses().values()), {'annulé'})
+
+    def test_permanently_refused_address_is_counted_and_skipped(self):
+        RejectingEmailBackend.refused = {'b@example.com': 550}
+        job = self.toggle()
+        self.assertEqual(run_doctor_status_job(job.pk), 'done')
+        job.refresh_from_db()
+        self.assertEqual((job.progress['notified'], job.progress['refused']), (4, 1))
+        self.assertEqual(self.recipients(), ['a@example.com', 'c@example.com', 'd@example.com'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, IDEMPOTENCY_LOCK_SECONDS=60)
+class IdempotencyKeyTests(TestCase):
+    payload = {'email': 'new@example.com', 'password': 'pw', 'first_name': 'Léa'}
+
+    def register(self, key, payload=None):
+        return APIClient().post('/api/register/', payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def claim(self, key, locked_until):
+        """The row of a first request that is still running (or whose worker died)."""
+        request = Request(APIRequestFactory().post('/api/register/', self.payload, format='json'), parsers=[JSONParser()])
+        IdempotencyKey.objects.create(
+            scope='anonymous', key=key, fingerprint=request_fingerprint(request),
+            locked_until=locked_until, expires_at=timezone.now() + timedelta(days=1),
+        )
+
+    def test_retry_replays_the_first_response(self):
+        first = self.register('k1')
+        self.assertEqual(first.status_code, 201)
+
+        retry = self.register('k1')
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(User.objects.filter(email='new@example.com').count(), 1)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.register('k1')
+        response = self.register('k1', dict(self.payload, email='other@example.com'))
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(User.objects.filter(email='other@example.com').exists())
+
+    def test_in_flight_key_conflicts_until_its_lease_expires(self):
+        self.claim('k1', timezone.now() + timedelta(seconds=30))
+        response = self.register('k1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(User.objects.filter(email='new@example.com').exists())
+
+        # The first worker died: once its lease expires, a retry takes the key over
+        IdempotencyKey.objects.filter(key='k1').update(locked_until=timezone.now() - timedelta(seconds=1))
+        response = self.register('k1')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.filter(email='new@example.com').exists())
+        record = IdempotencyKey.objects.get(key='k1')
+        self.assertEqual((record.status_code, record.locked_until), (201, None))
+        self.assertEqual(self.register('k1')['Idempotent-Replayed'], 'true')
+
+
+class AvailabilityRulesTests(SimpleTestCase):
+    # 2030-01-07 is a Monday
+    rules = normalize_rules({
+        'slot_minutes': 30,
+        'weekly': {'mon': [['09:00', '10:30']]},
+        'exceptions': {'2030-01-14': []},
+    })
+    monday = ['09:00', '09:30', '10:00']
+
+    def doctor(self, availability=None, rules=None):
+        return Doctor(availability=availability or {}, availability_rules=rules or {})
+
+    def test_rules_are_expanded_over_the_window_under_exceptions_and_explicit_dates(self):
+        rules = dict(self.rules, until='2030-01-28')
+        doctor = self.doctor({'2030-01-08': ['15:00'], '2030-01-21': ['11:00'], '2030-03-04': ['09:00']}, rules)
+
+        self.assertEqual(expand_availability(doctor, date(2030, 1, 7), date(2030, 2, 5)), {
+            '2030-01-07': self.monday,
+            '2030-01-08': ['15:00'],
+            '2030-01-21': ['11:00'],
+            '2030-01-28': self.monday,
+        })
+
+    def test_legacy_availability_is_returned_untouched_without_rules(self):
+        availability = {'2020-01-06': ['09:00'], '2030-01-07': ['10:00', '09:00']}
+        self.assertIs(expand_availability(self.doctor(availability)), availability)
+
+    def test_written_back_expansion_keeps_only_overrides_and_closed_days(self):
+        shown = expand_availability(self.doctor({'2030-01-21': ['11:00']}, self.rules), date(2030, 1, 7), date(2030, 2, 4))
+        # The client adds a Tuesday and removes a Monday
+        written = dict(shown)
+        written['2030-01-08'] = ['15:00']
+        del written['2030-01-28']
+
+        self.assertEqual(compact_overrides(written, self.rules, previous=shown), {
+            '2030-01-08': ['15:00'],
+            '2030-01-21': ['11:00'],
+            '2030-01-28': [],
+        })
+
+    def test_compaction_leaves_legacy_and_empty_writes_alone(self):
+        availability = {'2030-01-07': self.monday}
+        self.assertIs(compact_overrides(availability, {}), availability)
+        self.assertEqual(compact_overrides({}, self.rules, previous={'2030-01-07': self.monday}), {})
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SYNC_OVERLAP_SECONDS=5)
+class AppointmentChangesTests(TestCase):
+    def setUp(self):
+        specialty = Specialty.objects.create(name='Cardiologie')
+        self.doctor = create_doctor(specialty, 'doctor@example.com')
+        self.other_doctor = create_doctor(specialty, 'other@example.com', last_name='Durand')
+        self.client_user = User.objects.create_user('client@example.com', 'pw')
+        start = timezone.now() + timedelta(days=1)
+        self.appointments = [
+            Appointment.objects.create(client=self.client_user, doctor=self.doctor, date_time=start + timedelta(hours=hour))
+            for hour in range(3)
+        ]
+
+    def changes(self, user, cursor=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/appointments/changes/', {'since': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def updated_ids(self, data):
+        return sorted(appointment['id'] for appointment in data['updated'])
+
+    def test_deleted_and_reassigned_appointments_come_back_as_tombstones(self):
+        first = self.changes(self.doctor.user)
+        client_first = self.changes(self.client_user)
+        self.assertEqual(self.updated_ids(first), [a.pk for a in self.appointments])
+
+        deleted, moved, _ = self.appointments
+        deleted_id = deleted.pk
+        deleted.delete()
+        moved.doctor = self.other_doctor
+        moved.save()
+
+        doctor_sync = self.changes(self.doctor.user, first['cursor'])
+        self.assertEqual(sorted(doctor_sync['deleted']), [deleted_id, moved.pk])
+        self.assertNotIn(moved.pk, self.updated_ids(doctor_sync))
+
+        # The patient still has the reassigned appointment, with its new doctor
+        client_sync = self.changes(self.client_user, client_first['cursor'])
+        self.assertEqual(client_sync['deleted'], [deleted_id])
+        self.assertIn(moved.pk, self.updated_ids(client_sync))
+
+        self.assertEqual(self.changes(self.other_doctor.user)['deleted'], [])
+
+    def test_rows_committed_late_within_the_overlap_window_are_read_again(self):
+        first = self.changes(self.doctor.user)
+        position = max(a.updated_at for a in Appointment.objects.filter(doctor=self.doctor))
+
+        # Stamped before the position handed out, but committed after that read
+        late, too_old = (
+            Appointment.objects.create(client=self.client_user, doctor=self.doctor, date_time=timezone.now() + timedelta(days=2, hours=hour))
+            for hour in range(2)
+        )
+        Appointment.objects.filter(pk=late.pk).update(updated_at=position - timedelta(seconds=1))
+        Appointment.objects.filter(pk=too_old.pk).update(updated_at=position - timedelta(seconds=60))
+
+        second = self.changes(self.doctor.user, first['cursor'])
+        self.assertIn(late.pk, self.updated_ids(second))
+        self.assertNotIn(too_old.pk, self.updated_ids(second))
+
+        with override_settings(SYNC_OVERLAP_SECONDS=0):
+            settled = self.changes(self.doctor.user, second['cursor'])
+            self.assertEqual(self.changes(self.doctor.user, settled['cursor'])['updated'], [])
@@ -1,4 +1,7 @@
+from django.conf import settings
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from .schema import AuthenticatedGraphQLView
 from .views import (
     # Auth
     RegisterView,
@@ -8,6 +11,8 @@ from .views import (
     # Doctor (Client & Admin)
     DoctorListView,
     DoctorDetailView,
+    DoctorCardListView,
+    DoctorAvailabilityBatchView,
     DoctorCreateView,
     DoctorUpdateDeleteView,
 
@@ -15,9 +20,12 @@ from .views import (
     AppointmentCreateView,
     ClientAppointmentListView,
     AppointmentDeleteView,
+    AppointmentChangesView,
+    AppointmentHistoryView,
     ClientAppointmentUpdateView,
     AdminAppointmentStatusUpdateView,
     AdminAppointmentListView,
+    AppointmentBulkStatusUpdateView,
     SpecialtyListCreateView,
     SpecialtyRetrieveUpdateDestroyView,
     DoctorsBySpecialtyView,
@@ -30,6 +38,16 @@ from .views import (
     # Admin Dashboard
     AdminDashboardStatsView,
     AdminDashboardActivitiesView,
+    AdminCacheStatsView,
+    AdminUserDeleteView,
+    AppointmentEventsTicketView,
+    AdminPurgeJobListView,
+    AdminAdmissionStatsView,
+    AdminPurgeJobDetailView,
+    AdminDoctorStatusJobDetailView,
+    AdminProfileListView,
+    AdminProfileDetailView,
+    AdminProfileDownloadView,
 
     # Admin Management
     AdminDoctorsListView,
@@ -46,6 +64,9 @@ from .views import (
     # Support & Doctor self endpoints
     SupportContactView,
     DoctorMeView,
+
+    # Dashboard bootstrap (all roles)
+    BootstrapView,
 )
 
 urlpatterns = [
@@ -59,6 +80,8 @@ urlpatterns = [
 
     # 👨‍⚕️ Doctor APIs
     path('doctors/', DoctorListView.as_view(), name='doctor-list'),                         # Client: list doctors
+    path('doctors/cards/', DoctorCardListView.as_view(), name='doctor-card-list'),             # Client: lightweight listing (read model)
+    path('doctors/availability/', DoctorAvailabilityBatchView.as_view(), name='doctor-availability-batch'),  # Client: free slots of many doctors
     path('doctors/<int:pk>/', DoctorDetailView.as_view(), name='doctor-detail'),            # Client: doctor details
 
     path('admin/doctors/<int:pk>/', DoctorUpdateDeleteView.as_view(), name='doctor-update-delete'),  # Admin: update/delete doctor
@@ -67,10 +90,14 @@ urlpatterns = [
     path('appointments/', AppointmentCreateView.as_view(), name='appointment-create'),      # Client: create appointment
     path('appointments/list/', ClientAppointmentListView.as_view(), name='appointment-list'),     # Client: list own appointments
     path('appointments/update/<int:pk>/', ClientAppointmentUpdateView.as_view(), name='client-appointment-update'),  # Client: update appointment
+    path('appointments/changes/', AppointmentChangesView.as_view(), name='appointment-changes'),  # Delta sync (?since=<cursor>)
+    path('events/appointments/ticket/', AppointmentEventsTicketView.as_view(), name='appointment-events-ticket'),  # Stream ticket (POST) for the SSE endpoint
+    path('appointments/history/', AppointmentHistoryView.as_view(), name='appointment-history'),  # Includes archived appointments
     path('appointments/<int:pk>/delete/', AppointmentDeleteView.as_view(), name='appointment-delete'),
 
 
     path('admin/appointments/update/<int:pk>/', AdminAppointmentStatusUpdateView.as_view(), name='appointment-update'),  # Admin/Client: update
+    path('appointments/bulk-status/', AppointmentBulkStatusUpdateView.as_view(), name='appointment-bulk-status'),  # Admin/Doctor: bulk status transition
     path('admin/appointments/list/', AdminAppointmentListView.as_view(), name='appointment-list-admin'),   # Admin: list all
 
     # Public specialties list (patients & guests)
@@ -83,11 +110,20 @@ urlpatterns = [
     # Admin Dashboard
     path('admin/dashboard/stats/', AdminDashboardStatsView.as_view(), name='admin-dashboard-stats'),
     path('admin/dashboard/activities/', AdminDashboardActivitiesView.as_view(), name='admin-dashboard-activities'),
+    path('admin/cache/stats/', AdminCacheStatsView.as_view(), name='admin-cache-stats'),
+    path('admin/admission/stats/', AdminAdmissionStatsView.as_view(), name='admin-admission-stats'),  # Queue depth per route class (never shed)
+    path('admin/users/<int:user_id>/', AdminUserDeleteView.as_view(), name='admin-user-delete'),                # DELETE: soft-delete + background purge
+    path('admin/purge-jobs/', AdminPurgeJobListView.as_view(), name='admin-purge-jobs'),
+    path('admin/purge-jobs/<int:pk>/', AdminPurgeJobDetailView.as_view(), name='admin-purge-job-detail'),
+    path('admin/profiles/', AdminProfileListView.as_view(), name='admin-profiles'),
+    path('admin/profiles/<str:snapshot_id>/', AdminProfileDetailView.as_view(), name='admin-profile-detail'),
+    path('admin/profiles/<str:snapshot_id>/download/', AdminProfileDownloadView.as_view(), name='admin-profile-download'),
 
     # Admin Management
     path('admin/doctors/', AdminDoctorsListView.as_view(), name='admin-doctors-list'),
     path('admin/doctors/<int:doctor_id>/', AdminDoctorsListView.as_view(), name='admin-doctors-detail'),
     path('admin/doctors/<int:doctor_id>/toggle-status/', AdminDoctorToggleStatusView.as_view(), name='admin-doctor-toggle-status'),
+    path('admin/doctor-status-jobs/<int:pk>/', AdminDoctorStatusJobDetailView.as_view(), name='admin-doctor-status-job-detail'),  # progress of a toggle-status follow-up
     path('admin/doctors/count/', AdminDoctorsCountView.as_view(), name='admin-doctors-count'),  # Debug endpoint
     path('admin/specialties/', AdminSpecialtiesListView.as_view(), name='admin-specialties-list'),
     path('admin/specialties/<int:specialty_id>/', AdminSpecialtyDetailView.as_view(), name='admin-specialty-detail'),  # DELETE only
@@ -100,4 +136,10 @@ urlpatterns = [
     # Support & Doctor self endpoints
     path('support/contact/', SupportContactView.as_view(), name='support-contact'),
     path('doctors/me/', DoctorMeView.as_view(), name='doctor-me'),
+
+    # One-request dashboard bootstrap (per role)
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
+
+    # GraphQL read API (batched, depth/cost limited)
+    path('graphql/', csrf_exempt(AuthenticatedGraphQLView.as_view(graphiql=settings.DEBUG)), name='graphql'),
 ]
\ No newline at end of file
@@ -3,13 +3,22 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.exceptions import NotAuthenticated
 from rest_framework import generics, status
+from rest_framework.pagination import CursorPagination
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from .models import User, Doctor, Appointment, Specialty
-from .serializers import UserSerializer, DoctorSerializer, AppointmentSerializer, AppointmentCreateSerializer, SpecializationSerializer, ForgotPasswordSerializer, VerifyCodeSerializer, AppointmentStatusSerializer, UserUpdateSerializer
-from .permissions import IsAdmin, IsClient, IsDoctor
+from .docs import swagger_auto_schema, openapi
+from .models import User, Doctor, Appointment, Specialty, AppointmentTombstone, DoctorCard, AppointmentArchive, ActivityEvent, PurgeJob, DoctorStatusJob
+from .serializers import UserSerializer, DoctorSerializer, AppointmentSerializer, AppointmentCreateSerializer, SpecializationSerializer, ForgotPasswordSerializer, VerifyCodeSerializer, AppointmentStatusSerializer, UserUpdateSerializer, AppointmentBulkStatusSerializer, DoctorCardSerializer, ActivityEventSerializer, PurgeJobSerializer, DoctorStatusJobSerializer
+from .permissions import IsAdmin, IsClient, IsDoctor, IsAdminOrDoctor
+from .services import bulk_transition_status
+from .idempotency import idempotent
+from .fieldsets import SparseFieldsViewMixin
+from .availability import compact_overrides, expand_availability, normalize_rules, parse_window
+from .cache import ADMIN_STATS_KEY, SPECIALTIES_KEY, cache_stats, doctor_list_key, doctor_profile_key, hot_lookup_timeout, single_flight
+from .sync import appointment_changes, InvalidCursor
+from .bootstrap import ROLE_SECTIONS, build_bootstrap
+from .purge import soft_delete_doctor, soft_delete_user
+from .deactivation import toggle_doctor_active
 import random
 from django.core.mail import send_mail
 from django.core.cache import cache
@@ -70,6 +79,7 @@ class RegisterView(APIView):
             500: "Internal Server Error",
         }
     )
+    @idempotent
     def post(self, request):
         print(f"📝 RegisterView - Données reçues: {request.data}")
 
@@ -209,7 +219,7 @@ class DoctorLoginView(APIView):
                 'date_joined': user.date_joined,
             })
         return Response({'error': 'Invalid credentials or not a doctor'}, status=401)
-class DoctorAppointmentListView(generics.ListAPIView):
+class DoctorAppointmentListView(SparseFieldsViewMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = AppointmentSerializer
 
@@ -231,22 +241,128 @@ class UserUpdateView(generics.UpdateAPIView):
         # Ensure user only updates their own profile
         return self.request.user
 
-class DoctorListView(generics.ListAPIView):
+class DoctorListView(SparseFieldsViewMixin, generics.ListAPIView):
     permission_classes = [AllowAny]
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
 
-class DoctorDetailView(generics.RetrieveAPIView):
+    def list(self, request, *args, **kwargs):
+        if self.get_sparse_spec() is not None:
+            return super().list(request, *args, **kwargs)
+        # Full list: one request rebuilds it when it expires, the others get the previous one meanwhile
+        data = single_flight(
+            doctor_list_key(request.get_host()),
+            lambda: super(DoctorListView, self).list(request, *args, **kwargs).data,
+            timeout=hot_lookup_timeout(),
+        )
+        return Response(data)
+
+class DoctorCardPagination(CursorPagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('last_name', 'first_name', 'doctor_id')
+
+class DoctorCardListView(generics.ListAPIView):
+    """
+    Listing-page view of doctors served from the DoctorCard read model:
+    one indexed query per page, no joins. Filters: ?specialty=<id>, ?active=1.
+    """
+    permission_classes = [AllowAny]
+    serializer_class = DoctorCardSerializer
+    pagination_class = DoctorCardPagination
+
+    def get_queryset(self):
+        queryset = DoctorCard.objects.all()
+        specialty = self.request.query_params.get('specialty')
+        if specialty and specialty.isdigit():
+            queryset = queryset.filter(specialty_id=int(specialty))
+        if self.request.query_params.get('active') in ('1', 'true'):
+            queryset = queryset.filter(is_active=True)
+        return queryset
+
+class DoctorAvailabilityBatchView(APIView):
+    """
+    Free slots of several doctors: ?ids=1,2,3&from=YYYY-MM-DD&to=YYYY-MM-DD
+    (default: the next 7 days). Response: {"from", "to", "doctors": {id: [[date, [times]], ...]}}.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .slots import DEFAULT_WINDOW_DAYS, MAX_DOCTORS, MAX_WINDOW_DAYS, free_slots
+
+        raw_ids = [part.strip() for part in request.query_params.get('ids', '').split(',') if part.strip()]
+        if not raw_ids or not all(part.isdigit() for part in raw_ids):
+            return Response({'error': "ids doit être une liste d'identifiants séparés par des virgules."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(raw_ids) > MAX_DOCTORS:
+            return Response({'error': f"Au maximum {MAX_DOCTORS} médecins par requête."}, status=status.HTTP_400_BAD_REQUEST)
+
+        date_from = request.query_params.get('from')
+        date_to = request.query_params.get('to')
+        try:
+            start, end = parse_window(date_from, date_to)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not date_to:
+            end = start + timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+        if (end - start).days >= MAX_WINDOW_DAYS:
+            return Response({'error': f"Fenêtre trop large (maximum {MAX_WINDOW_DAYS} jours)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        today = timezone.localdate()
+        if end < today:
+            slots = {}
+        else:
+            slots = free_slots([int(part) for part in raw_ids], max(start, today), end)
+        response = Response({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'doctors': {str(doctor_id): days for doctor_id, days in slots.items()},
+        })
+        response['Cache-Control'] = 'public, max-age=30'
+        return response
+
+class DoctorDetailView(SparseFieldsViewMixin, generics.RetrieveAPIView):
     # Make doctor details public so patients and guests can view profiles
     permission_classes = [AllowAny]
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        # ?from=YYYY-MM-DD&to=YYYY-MM-DD picks the window recurring availability is expanded over
+        try:
+            self.availability_window = parse_window(request.query_params.get('from'), request.query_params.get('to'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if 'from' in request.query_params or 'to' in request.query_params or self.get_sparse_spec() is not None:
+            return super().retrieve(request, *args, **kwargs)
+
+        # Default window: served from the hot lookup cache, keyed by day since availability is expanded from today
+        from django.utils import timezone
+        key = doctor_profile_key(kwargs['pk'])
+        marker = {'day': timezone.localdate().isoformat(), 'host': request.get_host()}
+        cached = cache.get(key)
+        if cached is not None and cached['marker'] == marker:
+            return Response(cached['data'])
+        response = super().retrieve(request, *args, **kwargs)
+        cache.set(key, {'marker': marker, 'data': response.data}, timeout=hot_lookup_timeout())
+        return response
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['availability_window'] = getattr(self, 'availability_window', None)
+        return context
+
 class AppointmentCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Appointment.objects.all()
     serializer_class = AppointmentCreateSerializer
 
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         if getattr(self, 'swagger_fake_view', False):
             return Appointment.objects.none()
@@ -255,7 +371,7 @@ class AppointmentCreateView(generics.CreateAPIView):
         else:
             raise NotAuthenticated("User must be authenticated to create an appointment.")
 
-class ClientAppointmentListView(generics.ListAPIView):
+class ClientAppointmentListView(SparseFieldsViewMixin, generics.ListAPIView):
     permission_classes = [IsClient]
     serializer_class = AppointmentSerializer
 
@@ -264,6 +380,90 @@ class ClientAppointmentListView(generics.ListAPIView):
             return Appointment.objects.none()
         return Appointment.objects.filter(client=self.request.user)
 
+class AppointmentChangesView(APIView):
+    """
+    Delta sync for appointment lists: returns appointments changed and ids
+    deleted since `?since=<cursor>`, scoped like the role's list endpoint.
+    Call without `since` for the initial full sync, then keep passing the
+    returned `cursor`.
+    """
+    permission_classes = [IsAuthenticated]
+    PAGE_SIZE = 500
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Cursor returned by the previous call'),
+    ])
+    def get(self, request):
+        user = request.user
+        appointments = Appointment.objects.select_related('doctor', 'client')
+        tombstones = AppointmentTombstone.objects.all()
+        if user.user_role == 'admin':
+            tombstones = tombstones.filter(reassigned=False)
+        elif user.user_role == 'doctor':
+            doctor = Doctor.objects.filter(email=user.email).only('id').first()
+            if doctor is None:
+                return Response({'error': 'Profil médecin introuvable'}, status=status.HTTP_404_NOT_FOUND)
+            appointments = appointments.filter(doctor=doctor)
+            tombstones = tombstones.filter(doctor_id=doctor.id)
+        else:
+            appointments = appointments.filter(client=user)
+            tombstones = tombstones.filter(client_id=user.id)
+
+        try:
+            changed, deleted, cursor, has_more = appointment_changes(
+                appointments, tombstones, request.query_params.get('since'), limit=self.PAGE_SIZE
+            )
+        except InvalidCursor:
+            return Response({'error': 'Curseur invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'cursor': cursor,
+            'has_more': has_more,
+            'updated': AppointmentSerializer(changed, many=True, context={'request': request}).data,
+            'deleted': deleted,
+        })
+
+class AppointmentEventsTicketView(APIView):
+    """Single-use ticket for the live events stream (GET /api/events/appointments/?ticket=...)."""
+    permission_classes = [IsAuthenticated, IsAdminOrDoctor]
+
+    def post(self, request):
+        from .events import STREAM_TICKET_TTL, issue_stream_ticket
+        ticket = issue_stream_ticket(request.user, request.auth['exp'])
+        return Response({'ticket': ticket, 'expires_in': STREAM_TICKET_TTL})
+
+class AppointmentHistoryView(APIView):
+    """Newest-first appointment history across the hot table and the archive."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from .archive import appointment_history
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 50)), 200))
+        except ValueError:
+            return Response({'error': 'limit doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        if user.user_role == 'doctor':
+            doctor = Doctor.objects.filter(email=user.email).only('id').first()
+            if doctor is None:
+                return Response({'error': 'Profil médecin introuvable'}, status=status.HTTP_404_NOT_FOUND)
+            filters = {'doctor_id': doctor.id}
+        elif user.user_role == 'admin':
+            filters = {}
+            for param in ('doctor_id', 'client_id'):
+                value = request.query_params.get(param)
+                if value and value.isdigit():
+                    filters[param] = int(value)
+        else:
+            filters = {'client_id': user.id}
+
+        history = appointment_history(limit=limit, **filters)
+        return Response({
+            'results': AppointmentSerializer(history, many=True, context={'request': request}).data,
+        })
+
 class AppointmentDeleteView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = AppointmentSerializer
@@ -277,7 +477,7 @@ class AppointmentDeleteView(generics.DestroyAPIView):
         else:
             return Appointment.objects.filter(client=user)
 
-class DoctorsBySpecialtyView(generics.ListAPIView):
+class DoctorsBySpecialtyView(SparseFieldsViewMixin, generics.ListAPIView):
     serializer_class = DoctorSerializer
     permission_classes = [AllowAny]
 
@@ -300,14 +500,9 @@ class DoctorUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = DoctorSerializer
 
     def destroy(self, request, *args, **kwargs):
-        doctor = self.get_object()
-        # If a linked user exists, delete the user (will cascade and remove the doctor)
-        linked_user = doctor.user
-        if linked_user:
-            linked_user.delete()
-            return Response(status=204)
-        # Otherwise, delete the doctor record only
-        return super().destroy(request, *args, **kwargs)
+        # Hidden right away; the doctor, their user and their history are purged in the background
+        job = soft_delete_doctor(self.get_object(), actor=request.user)
+        return Response({'message': 'Suppression du médecin en cours', 'purge_job': job.id}, status=status.HTTP_202_ACCEPTED)
 
 class ClientAppointmentUpdateView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
@@ -341,7 +536,64 @@ class AdminAppointmentStatusUpdateView(generics.UpdateAPIView):
                 serializer.fields.pop(field)
         return serializer
 
-class AdminAppointmentListView(generics.ListAPIView):
+class AppointmentBulkStatusUpdateView(APIView):
+    """
+    Apply one status transition to many appointments with a single UPDATE.
+    Admins can target any appointment, doctors only their own.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrDoctor]
+
+    @swagger_auto_schema(request_body=AppointmentBulkStatusSerializer)
+    def post(self, request):
+        serializer = AppointmentBulkStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        queryset = Appointment.objects.all()
+        if request.user.user_role == 'doctor':
+            try:
+                doctor = Doctor.objects.get(email=request.user.email)
+            except Doctor.DoesNotExist:
+                return Response({'error': 'Profil médecin introuvable'}, status=status.HTTP_404_NOT_FOUND)
+            queryset = queryset.filter(doctor=doctor)
+
+        filters = data.get('filter')
+        if filters:
+            from datetime import datetime, time, timedelta
+            from django.utils import timezone
+
+            if 'doctor' in filters:
+                queryset = queryset.filter(doctor_id=filters['doctor'])
+            if 'status' in filters:
+                queryset = queryset.filter(status=filters['status'])
+            # Plain range on date_time (rather than __date) so the index can be used
+            if 'date_from' in filters:
+                start = timezone.make_aware(datetime.combine(filters['date_from'], time.min))
+                queryset = queryset.filter(date_time__gte=start)
+            if 'date_to' in filters:
+                end = timezone.make_aware(datetime.combine(filters['date_to'] + timedelta(days=1), time.min))
+                queryset = queryset.filter(date_time__lt=end)
+
+        ids = data.get('ids')
+        if filters:
+            # Same cap as explicit ids: the rows are locked and reported one by one
+            max_ids = AppointmentBulkStatusSerializer.MAX_IDS
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:max_ids + 1])
+            if len(ids) > max_ids:
+                return Response(
+                    {'error': f"Le filtre sélectionne plus de {max_ids} rendez-vous, veuillez le restreindre."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        updated_ids, outcomes = bulk_transition_status(queryset, data['status'], ids=ids)
+        return Response({
+            'status': data['status'],
+            'updated': len(updated_ids),
+            'results': [{'id': pk, **outcome} for pk, outcome in outcomes.items()],
+        })
+
+class AdminAppointmentListView(SparseFieldsViewMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsAdmin]
     serializer_class = AppointmentSerializer
 
@@ -354,14 +606,21 @@ class AdminDashboardStatsView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
 
     def get(self, request):
+        # A dozen aggregate queries: recomputed by one request at a time, the others get the previous result
+        timeout = getattr(settings, 'ADMIN_STATS_CACHE_TIMEOUT', 60)
+        return Response(single_flight(ADMIN_STATS_KEY, self.compute_stats, timeout=timeout, stale_timeout=timeout * 5))
+
+    def compute_stats(self):
         from django.db.models import Count
         from django.utils import timezone
         from datetime import date
 
         # Compter les statistiques
         total_doctors = Doctor.objects.count()
-        total_patients = User.objects.filter(user_role='client').count()
-        total_appointments = Appointment.objects.count()
+        total_patients = User.objects.filter(user_role='client', deleted_at__isnull=True).count()
+        # Historique archivé inclus (tous les rendez-vous archivés sont terminés)
+        archived_appointments = AppointmentArchive.objects.count()
+        total_appointments = Appointment.objects.count() + archived_appointments
         total_specialties = Specialty.objects.count()
 
         # Rendez-vous d'aujourd'hui
@@ -373,7 +632,7 @@ class AdminDashboardStatsView(APIView):
         pending_appointments = Appointment.objects.filter(status='pending').count()
 
         # Rendez-vous terminés
-        completed_appointments = Appointment.objects.filter(status='terminé').count()
+        completed_appointments = Appointment.objects.filter(status='terminé').count() + archived_appointments
 
         # Utilisateurs actifs (connectés dans les 30 derniers jours)
         thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
@@ -407,7 +666,7 @@ class AdminDashboardStatsView(APIView):
                     'count': doctors_count
                 })
 
-        return Response({
+        return {
             'totalDoctors': total_doctors,
             'totalPatients': total_patients,
             'totalAppointments': total_appointments,
@@ -418,58 +677,141 @@ class AdminDashboardStatsView(APIView):
             'activeUsers': active_users,
             'monthlyAppointments': monthly_appointments,
             'specialtyStats': specialty_stats
-        })
+        }
 
-class AdminDashboardActivitiesView(APIView):
+class ActivityFeedPagination(CursorPagination):
+    page_size = 10
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+class AdminDashboardActivitiesView(generics.ListAPIView):
+    """
+    Admin activity feed from the append-only ActivityEvent log, newest first.
+    Filters: ?type=a,b  ?object_type=doctor  ?object_id=12  ?since=/?until= (ISO datetimes).
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    serializer_class = ActivityEventSerializer
+    pagination_class = ActivityFeedPagination
+
+    def get_queryset(self):
+        from django.utils.dateparse import parse_datetime
+        queryset = ActivityEvent.objects.all()
+        params = self.request.query_params
+        if params.get('type'):
+            queryset = queryset.filter(type__in=[t.strip() for t in params['type'].split(',') if t.strip()])
+        if params.get('object_type'):
+            queryset = queryset.filter(object_type=params['object_type'])
+            if params.get('object_id', '').isdigit():
+                queryset = queryset.filter(object_id=int(params['object_id']))
+        for name, lookup in (('since', 'created_at__gte'), ('until', 'created_at__lt')):
+            value = parse_datetime(params.get(name) or '')
+            if value is not None:
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+class AdminUserDeleteView(APIView):
+    """Soft-delete a user account; its appointments and the account are purged in the background."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def delete(self, request, user_id):
+        user = User.objects.filter(pk=user_id, deleted_at__isnull=True).first()
+        if user is None:
+            return Response({'error': 'Utilisateur non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+        if user.pk == request.user.pk:
+            return Response({'error': 'Impossible de supprimer votre propre compte'}, status=status.HTTP_400_BAD_REQUEST)
+        job = soft_delete_user(user, actor=request.user)
+        return Response({'message': 'Suppression du compte en cours', 'purge_job': job.id}, status=status.HTTP_202_ACCEPTED)
+
+class AdminPurgeJobListView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
 
     def get(self, request):
-        # Récupérer les dernières activités (derniers rendez-vous créés)
-        recent_appointments = Appointment.objects.select_related('client', 'doctor').order_by('-created_at')[:10]
+        jobs = PurgeJob.objects.order_by('-created_at')
+        if request.query_params.get('status'):
+            jobs = jobs.filter(status=request.query_params['status'])
+        return Response({'results': PurgeJobSerializer(jobs[:50], many=True).data})
 
-        activities = []
-        for appointment in recent_appointments:
-            activities.append({
-                'id': appointment.id,
-                'type': 'appointment_created',
-                'message': f"Nouveau RDV: {appointment.client.first_name} {appointment.client.last_name} avec Dr. {appointment.doctor.first_name} {appointment.doctor.last_name}",
-                'date': appointment.created_at,
-                'status': appointment.status
-            })
+class AdminPurgeJobDetailView(generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+    queryset = PurgeJob.objects.all()
+    serializer_class = PurgeJobSerializer
 
-        return Response({
-            'results': activities
-        })
+class AdminDoctorStatusJobDetailView(generics.RetrieveAPIView):
+    """Progress of the appointments cancelled (or restored) after a doctor's (de)activation."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+    queryset = DoctorStatusJob.objects.all()
+    serializer_class = DoctorStatusJobSerializer
 
-class AdminDoctorsListView(APIView):
+class AdminCacheStatsView(APIView):
+    """Hit/miss counters of the two-level cache, for the process that serves the request."""
     permission_classes = [IsAuthenticated, IsAdmin]
 
     def get(self, request):
-        # Récupérer tous les médecins avec leurs spécialisations
-        doctors = Doctor.objects.all().order_by('first_name', 'last_name')
-        print(f"DEBUG: Nombre de médecins trouvés: {doctors.count()}")
+        import os
+        return Response({'pid': os.getpid(), 'caches': cache_stats()})
 
-        doctors_data = []
-        for doctor in doctors:
-            try:
-                doctor_data = {
-                    'id': doctor.id,
-                    'first_name': doctor.first_name,
-                    'last_name': doctor.last_name,
-                    'email': doctor.email,
-                    'phone': doctor.phone,
-                    'specialization': doctor.specialization.name if doctor.specialization else 'Non spécifié',
-                    'is_active': doctor.user.is_active if doctor.user else True,
-                    'date_joined': doctor.user.date_joined.isoformat() if doctor.user and doctor.user.date_joined else None,
-                    'consultation_fee': doctor.consultation_fee,
-                    'bio': doctor.bio
-                }
-                doctors_data.append(doctor_data)
-                print(f"DEBUG: Ajouté Dr. {doctor.first_name} {doctor.last_name}")
-            except Exception as e:
-                print(f"DEBUG: Erreur avec Dr. {doctor.first_name} {doctor.last_name}: {e}")
+class AdminAdmissionStatsView(APIView):
+    """Concurrency and queue depth per route class, for the process that serves the request."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        import os
+        from .admission import admission_stats
+        return Response({'pid': os.getpid(), **admission_stats()})
 
-        print(f"DEBUG: Nombre de médecins retournés: {len(doctors_data)}")
+class AdminProfileListView(APIView):
+    """Stored request profiles (newest first); see reservations.profiling."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        from .profiling import list_snapshots
+        return Response({'results': list_snapshots()})
+
+class AdminProfileDetailView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request, snapshot_id):
+        from .profiling import load_snapshot
+        snapshot = load_snapshot(snapshot_id)
+        if snapshot is None:
+            return Response({'error': 'Profil introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(snapshot)
+
+class AdminProfileDownloadView(APIView):
+    """The raw pstats dump, e.g. for `python -m pstats` or snakeviz."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request, snapshot_id):
+        from django.http import FileResponse
+        from .profiling import snapshot_path
+        path = snapshot_path(snapshot_id, '.prof')
+        if path is None:
+            return Response({'error': 'Profil introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name,
+                            content_type='application/octet-stream')
+
+class AdminDoctorsListView(APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        # Servi depuis le modèle de lecture DoctorCard (une seule requête, sans jointure)
+        cards = DoctorCard.objects.order_by('first_name', 'last_name').values(
+            'doctor_id', 'first_name', 'last_name', 'email', 'phone', 'specialty_name',
+            'is_active', 'date_joined', 'consultation_fee', 'bio',
+        )
+        doctors_data = [{
+            'id': card['doctor_id'],
+            'first_name': card['first_name'],
+            'last_name': card['last_name'],
+            'email': card['email'],
+            'phone': card['phone'],
+            'specialization': card['specialty_name'] or 'Non spécifié',
+            'is_active': card['is_active'],
+            'date_joined': card['date_joined'].isoformat() if card['date_joined'] else None,
+            'consultation_fee': card['consultation_fee'],
+            'bio': card['bio'],
+        } for card in cards]
         return Response(doctors_data)
 
     def post(self, request):
@@ -536,17 +878,17 @@ class AdminDoctorToggleStatusView(APIView):
 
     def patch(self, request, doctor_id):
         try:
-            doctor = Doctor.objects.get(id=doctor_id)
+            doctor = Doctor.objects.select_related('user').get(id=doctor_id)
 
-            # Basculer le statut actif/inactif
+            # Basculer le statut actif/inactif; les rendez-vous à venir sont annulés (ou rétablis) en arrière-plan
             if doctor.user:
-                doctor.user.is_active = not doctor.user.is_active
-                doctor.user.save()
+                is_active, job = toggle_doctor_active(doctor, actor=request.user)
 
-                status = "activé" if doctor.user.is_active else "désactivé"
+                status = "activé" if is_active else "désactivé"
                 return Response({
                     'message': f'Médecin {status} avec succès',
-                    'is_active': doctor.user.is_active
+                    'is_active': is_active,
+                    'status_job': job.id,
                 })
             else:
                 return Response({'error': 'Utilisateur associé non trouvé'}, status=404)
@@ -801,7 +1143,7 @@ class DoctorRecentAppointmentsView(APIView):
             'results': appointments_data
         })
 
-class SpecialtyListCreateView(generics.ListCreateAPIView):
+class SpecialtyListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
     queryset = Specialty.objects.all()
     serializer_class = SpecializationSerializer
     # Allow listing for anyone; restrict creation to admin
@@ -810,6 +1152,15 @@ class SpecialtyListCreateView(generics.ListCreateAPIView):
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    def list(self, request, *args, **kwargs):
+        if self.get_sparse_spec() is not None:
+            return super().list(request, *args, **kwargs)
+        data = single_flight(
+            SPECIALTIES_KEY, lambda: self.get_serializer(self.get_queryset(), many=True).data,
+            timeout=hot_lookup_timeout(),
+        )
+        return Response(data)
+
 class SpecialtyRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Specialty.objects.all()
     serializer_class = SpecializationSerializer
@@ -879,6 +1230,23 @@ class VerifyCodeAPIView(APIView):
         except User.DoesNotExist:
             return Response({"error": "Utilisateur introuvable."}, status=status.HTTP_404_NOT_FOUND)
 
+class OpenAPISchemaFileView(APIView):
+    """Serve the OpenAPI document generated at build time by `manage.py generate_openapi`."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    swagger_schema = None
+
+    def get(self, request):
+        from django.http import FileResponse, Http404
+
+        path = settings.API_SCHEMA_FILE
+        try:
+            response = FileResponse(open(path, 'rb'), content_type='application/json')
+        except FileNotFoundError:
+            raise Http404("Schéma non généré: exécuter `manage.py generate_openapi`.")
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
+
 class AdminDoctorsCountView(APIView):
     """Vue simple pour compter les médecins - pour debug"""
     permission_classes = [AllowAny]  # Temporaire pour debug
@@ -940,25 +1308,30 @@ class SupportContactView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def get_request_doctor(request):
+    """Doctor profile of the authenticated user, looked up once per request (None if missing)."""
+    if not hasattr(request, '_request_doctor'):
+        request._request_doctor = Doctor.objects.filter(email=request.user.email).first()
+    return request._request_doctor
+
 class DoctorDashboardStatsView(APIView):
     permission_classes = [IsAuthenticated, IsDoctor]
 
     def get(self, request):
         from django.utils import timezone
         from django.db.models import Count
-        try:
-            doctor = Doctor.objects.get(email=request.user.email)
-        except Doctor.DoesNotExist:
+        doctor = get_request_doctor(request)
+        if doctor is None:
             return Response({'error': 'Profil médecin introuvable'}, status=status.HTTP_404_NOT_FOUND)
 
         today = timezone.localdate()
         start_week = today - timezone.timedelta(days=today.weekday())
         end_week = start_week + timezone.timedelta(days=6)
 
-        # Total distinct patients
-        total_patients = User.objects.filter(
-            client_appointments__doctor=doctor
-        ).distinct().count()
+        # Total distinct patients (hot + archived history; UNION removes duplicates)
+        total_patients = Appointment.objects.filter(doctor=doctor).values('client_id').union(
+            AppointmentArchive.objects.filter(doctor=doctor).values('client_id')
+        ).count()
 
         # Today appointments
         today_appointments = Appointment.objects.filter(
@@ -977,7 +1350,7 @@ class DoctorDashboardStatsView(APIView):
         completed_appointments = Appointment.objects.filter(
             doctor=doctor,
             status='terminé'
-        ).count()
+        ).count() + AppointmentArchive.objects.filter(doctor=doctor).count()
 
         return Response({
             'totalPatients': total_patients,
@@ -990,12 +1363,11 @@ class DoctorRecentAppointmentsView(APIView):
     permission_classes = [IsAuthenticated, IsDoctor]
 
     def get(self, request):
-        try:
-            doctor = Doctor.objects.get(email=request.user.email)
-        except Doctor.DoesNotExist:
+        doctor = get_request_doctor(request)
+        if doctor is None:
             return Response({'results': []})
 
-        qs = Appointment.objects.filter(doctor=doctor).order_by('-date_time')[:10]
+        qs = Appointment.objects.filter(doctor=doctor).select_related('client').order_by('-date_time')[:10]
         results = []
         for a in qs:
             results.append({
@@ -1011,14 +1383,13 @@ class DoctorMeView(APIView):
     permission_classes = [IsAuthenticated, IsDoctor]
 
     def get(self, request):
-        try:
-            doctor = Doctor.objects.get(email=request.user.email)
-            return Response({
-                'user': UserUpdateSerializer(request.user).data,
-                'doctor': DoctorSerializer(doctor).data
-            })
-        except Doctor.DoesNotExist:
+        doctor = get_request_doctor(request)
+        if doctor is None:
             return Response({'error': 'Profil médecin introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'user': UserUpdateSerializer(request.user).data,
+            'doctor': DoctorSerializer(doctor).data
+        })
 
     def patch(self, request):
         # Update either user fields or doctor's own fields (including availability) safely
@@ -1032,6 +1403,8 @@ class DoctorMeView(APIView):
         user_data = {k: v for k, v in request.data.items() if k in allowed_user_fields}
 
         availability = request.data.get('availability', None)
+        # What an old client was shown, to tell the days it removed from the ones the rules fill
+        previous_availability = expand_availability(doctor)
 
         if availability is not None:
             # Accept either a dict { "YYYY-MM-DD": ["HH:MM", ...] } or a list of items { date, times|slots }
@@ -1061,6 +1434,15 @@ class DoctorMeView(APIView):
                     return Response({'error': f"Format invalide pour {date_str}"}, status=status.HTTP_400_BAD_REQUEST)
             doctor.availability = availability
 
+        if 'availability_rules' in request.data:
+            try:
+                doctor.availability_rules = normalize_rules(request.data.get('availability_rules'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if availability is not None:
+            # Dates that just repeat the weekly template are not stored
+            doctor.availability = compact_overrides(doctor.availability, doctor.availability_rules, previous_availability)
+
         # Update doctor simple fields if provided (handle decimals safely)
         for field in ['phone', 'address', 'city', 'state', 'zip_code', 'bio']:
             if field in request.data:
@@ -1098,4 +1480,32 @@ class DoctorMeView(APIView):
             'message': 'Profil mis à jour',
             'user': user_payload,
             'doctor': DoctorSerializer(doctor).data
-        })
\ No newline at end of file
+        })
+
+
+class BootstrapView(APIView):
+    """Everything a dashboard needs on load, in one response (see reservations/bootstrap.py)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        role = request.user.user_role
+        if role not in ROLE_SECTIONS:
+            return Response({'error': 'Rôle non pris en charge'}, status=status.HTTP_400_BAD_REQUEST)
+
+        doctor_id = None
+        if role == 'doctor':
+            doctor = get_request_doctor(request)
+            if doctor is None:
+                return Response({'error': 'Profil médecin introuvable'}, status=status.HTTP_404_NOT_FOUND)
+            doctor_id = doctor.id
+
+        only = None
+        if request.query_params.get('sections'):
+            only = {name.strip() for name in request.query_params['sections'].split(',') if name.strip()}
+            unknown = only - set(ROLE_SECTIONS[role])
+            if unknown:
+                return Response(
+                    {'error': f"Sections inconnues : {', '.join(sorted(unknown))}", 'available': list(ROLE_SECTIONS[role])},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        return Response(build_bootstrap(request, role, doctor_id=doctor_id, only=only))
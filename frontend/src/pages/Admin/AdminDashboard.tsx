@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { apiService } from '../../services/apiService';
+import { appointmentService } from '../../services/appointmentService';
 import { useAuth } from '../../contexts/AuthContext';
 
 const AdminDashboard: React.FC = () => {
@@ -34,18 +35,31 @@ const AdminDashboard: React.FC = () => {
     loadDashboardData();
   }, [navigate, user]);
 
+  // Rafraîchir le tableau de bord quand un rendez-vous est créé ou modifié (SSE, sans polling)
+  useEffect(() => {
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const unsubscribe = appointmentService.subscribeToAppointmentEvents(() => {
+      clearTimeout(timer);
+      timer = setTimeout(() => loadDashboardData(), 1000);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, []);
+
   const loadDashboardData = async () => {
     try {
       setLoading(true);
       
-      // Charger les statistiques globales
-      const [statsResponse, activitiesResponse] = await Promise.all([
-        apiService.get<any>('/admin/dashboard/stats/'),
-        apiService.get<any>('/admin/dashboard/activities/')
-      ]);
+      // Statistiques globales et activités récentes en une seule requête
+      const data = await apiService.get<any>('/bootstrap/?sections=stats,activities');
+      if (!data?.sections?.stats) {
+        throw new Error(data?.errors?.stats || 'Statistiques indisponibles');
+      }
 
-      setStats(statsResponse as any);
-      setRecentActivities((activitiesResponse as any)?.results || []);
+      setStats(data.sections.stats);
+      setRecentActivities(data.sections.activities?.results || []);
     } catch (error) {
       console.error('Erreur lors du chargement des données:', error);
       // Données de démonstration en cas d'erreur
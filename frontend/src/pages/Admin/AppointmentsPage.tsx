@@ -351,7 +351,8 @@ const AdminAppointmentsPage: React.FC = () => {
                         }}>
                           {appointment.status === 'pending' ? 'En attente' :
                            appointment.status === 'confirmé' ? 'Confirmé' :
-                           appointment.status === 'terminé' ? 'Terminé' : appointment.status}
+                           appointment.status === 'terminé' ? 'Terminé' :
+                           appointment.status === 'annulé' ? 'Annulé' : appointment.status}
                         </span>
                       </div>
 
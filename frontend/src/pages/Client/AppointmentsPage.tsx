@@ -55,6 +55,8 @@ const AppointmentsPage: React.FC = () => {
         return '#d97706';
       case 'terminé':
         return '#6b7280';
+      case 'annulé':
+        return '#dc2626';
       default:
         return '#6b7280';
     }
@@ -68,6 +70,8 @@ const AppointmentsPage: React.FC = () => {
         return 'En attente';
       case 'terminé':
         return 'Terminé';
+      case 'annulé':
+        return 'Annulé';
       default:
         return status;
     }
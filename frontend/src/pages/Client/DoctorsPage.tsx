@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { Link, useNavigate, useSearchParams } from 'react-router-dom';
 import { doctorService } from '../../services/doctorService';
-import { Doctor, Specialty } from '../../types';
+import { Doctor, DoctorFreeSlots, Specialty } from '../../types';
 import LoadingSpinner from '../../components/UI/LoadingSpinner';
 import ErrorMessage from '../../components/UI/ErrorMessage';
 
@@ -10,6 +10,7 @@ const DoctorsPage: React.FC = () => {
   const [doctors, setDoctors] = useState<Doctor[]>([]);
   const [specialties, setSpecialties] = useState<Specialty[]>([]);
   const [filteredDoctors, setFilteredDoctors] = useState<Doctor[]>([]);
+  const [freeSlots, setFreeSlots] = useState<Record<number, DoctorFreeSlots>>({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [selectedSpecialty, setSelectedSpecialty] = useState<string>('');
@@ -21,10 +22,14 @@ const DoctorsPage: React.FC = () => {
       try {
         setLoading(true);
         const [doctorsData, specialtiesData] = await Promise.all([
-          doctorService.getAllDoctors(),
+          doctorService.getAllDoctors(['availability', 'availability_rules']),
           doctorService.getAllSpecialties()
         ]);
         setDoctors(doctorsData);
+        // Slot previews come from one batched request instead of every doctor's full schedule
+        doctorService.getFreeSlots(doctorsData.map(doctor => doctor.id))
+          .then(setFreeSlots)
+          .catch(err => console.error('Error fetching free slots:', err));
         setSpecialties(specialtiesData);
         setFilteredDoctors(doctorsData);
 
@@ -547,14 +552,10 @@ const DoctorsPage: React.FC = () => {
                   {(() => {
                     try {
                       const slots: string[] = [];
-                      const now = new Date();
-                      const availability = doctor.availability || {} as Record<string, string[]>;
-                      const dates = Object.keys(availability).sort();
-                      for (const date of dates) {
-                        const times = availability[date] || [];
+                      // Already free and upcoming: the server drops booked and past slots
+                      for (const [date, times] of freeSlots[doctor.id] || []) {
                         for (const t of times) {
-                          const dt = new Date(`${date}T${t}:00`);
-                          if (dt > now) slots.push(`${date} ${t}`);
+                          slots.push(`${date} ${t}`);
                           if (slots.length >= 3) break;
                         }
                         if (slots.length >= 3) break;
@@ -90,6 +90,8 @@ const DoctorAppointmentsPage: React.FC = () => {
         return '#d97706';
       case 'terminé':
         return '#6b7280';
+      case 'annulé':
+        return '#dc2626';
       default:
         return '#6b7280';
     }
@@ -103,6 +105,8 @@ const DoctorAppointmentsPage: React.FC = () => {
         return 'En attente';
       case 'terminé':
         return 'Terminé';
+      case 'annulé':
+        return 'Annulé';
       default:
         return status;
     }
@@ -74,6 +74,8 @@ const DoctorDashboard: React.FC = () => {
         return '#d97706';
       case 'terminé':
         return '#6b7280';
+      case 'annulé':
+        return '#dc2626';
       default:
         return '#6b7280';
     }
@@ -87,6 +89,8 @@ const DoctorDashboard: React.FC = () => {
         return 'En attente';
       case 'terminé':
         return 'Terminé';
+      case 'annulé':
+        return 'Annulé';
       default:
         return status;
     }
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { apiService } from '../../services/apiService';
+import { appointmentService } from '../../services/appointmentService';
 import { useAuth } from '../../contexts/AuthContext';
 
 const DoctorDashboard: React.FC = () => {
@@ -32,18 +33,30 @@ const DoctorDashboard: React.FC = () => {
     }
   }, [navigate]);
 
+  // Rafraîchir le tableau de bord quand un rendez-vous est créé ou modifié (SSE, sans polling)
+  useEffect(() => {
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const unsubscribe = appointmentService.subscribeToAppointmentEvents(() => {
+      clearTimeout(timer);
+      timer = setTimeout(() => loadDashboardData(), 1000);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, []);
+
   const loadDashboardData = async () => {
     try {
       setLoading(true);
 
-      // Charger les statistiques du médecin
-      const [statsResponse, appointmentsResponse] = await Promise.all([
-        apiService.get<any>('/doctors/dashboard/stats/'),
-        apiService.get<any>('/doctors/appointments/recent/')
-      ]);
+      // Statistiques du médecin et rendez-vous récents en une seule requête
+      const data = await apiService.get<any>('/bootstrap/?sections=stats,recent_appointments');
 
-      setStats(statsResponse as any);
-      setRecentAppointments((appointmentsResponse as any)?.results || []);
+      if (data?.sections?.stats) {
+        setStats(data.sections.stats);
+      }
+      setRecentAppointments(data?.sections?.recent_appointments?.results || []);
     } catch (error) {
       console.error('Erreur lors du chargement des données:', error);
     } finally {
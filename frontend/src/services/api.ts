@@ -1,7 +1,7 @@
 import axios, { AxiosInstance, AxiosResponse } from 'axios';
 import { toast } from 'react-toastify';
 
-const API_BASE_URL = 'http://127.0.0.1:8000/api';
+export const API_BASE_URL = 'http://127.0.0.1:8000/api';
 
 class ApiService {
   private api: AxiosInstance;
@@ -86,6 +86,25 @@ class ApiService {
     return response.data;
   }
 
+  // POST with an Idempotency-Key: retries after network errors, 409 (still running) and 5xx
+  // reuse the same key, so the server replays the first response instead of repeating the write
+  async postIdempotent<T>(url: string, data?: any, retries = 3): Promise<T> {
+    const key = typeof crypto !== 'undefined' && 'randomUUID' in crypto
+      ? crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    for (let attempt = 0; ; attempt++) {
+      try {
+        const response = await this.api.post<T>(url, data, { headers: { 'Idempotency-Key': key } });
+        return response.data;
+      } catch (error: any) {
+        const status = error?.response?.status;
+        const retryable = !error?.response || status === 409 || status >= 500;
+        if (!retryable || attempt >= retries) throw error;
+        await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt));
+      }
+    }
+  }
+
   async put<T>(url: string, data?: any): Promise<T> {
     const response = await this.api.put<T>(url, data);
     return response.data;
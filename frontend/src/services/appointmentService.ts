@@ -1,31 +1,118 @@
-import { apiService } from './api';
+import { apiService, API_BASE_URL } from './api';
 import { Appointment, AppointmentCreate, AppointmentUpdate } from '../types';
 
+export interface AppointmentEvent {
+  type: 'appointment.created' | 'appointment.updated';
+  appointment_id: number;
+  doctor_id: number;
+  status: 'pending' | 'terminé' | 'confirmé' | 'annulé';
+}
+
+export interface AppointmentChanges {
+  cursor: string;
+  has_more: boolean;
+  updated: Appointment[];
+  deleted: number[];
+}
+
+const SYNC_STORAGE_KEY = 'appointmentsSync';
+
 export class AppointmentService {
   // Create new appointment
   async createAppointment(appointmentData: AppointmentCreate): Promise<Appointment> {
-    const response = await apiService.post<Appointment>('/appointments/', appointmentData);
+    const response = await apiService.postIdempotent<Appointment>('/appointments/', appointmentData);
     return response;
   }
 
+  // List pages never show the doctor's schedule or bio: leave them out of the payload
+  private static readonly LIST_OMIT = '?omit=doctor.availability,doctor.availability_rules,doctor.bio';
+
   // Get client's appointments
   async getClientAppointments(): Promise<Appointment[]> {
-    const response = await apiService.get<Appointment[]>('/appointments/list/');
+    const response = await apiService.get<Appointment[]>('/appointments/list/' + AppointmentService.LIST_OMIT);
     return response;
   }
 
   // Get doctor's appointments
   async getDoctorAppointments(): Promise<Appointment[]> {
-    const response = await apiService.get<Appointment[]>('/doctors/appointment/');
+    const response = await apiService.get<Appointment[]>('/doctors/appointment/' + AppointmentService.LIST_OMIT);
     return response;
   }
 
   // Get all appointments (Admin only)
   async getAllAppointments(): Promise<Appointment[]> {
-    const response = await apiService.get<Appointment[]>('/admin/appointments/list/');
+    const response = await apiService.get<Appointment[]>('/admin/appointments/list/' + AppointmentService.LIST_OMIT);
     return response;
   }
 
+  // Changes since the given cursor (omit it for a full initial sync)
+  async getAppointmentChanges(since?: string): Promise<AppointmentChanges> {
+    const query = since ? `?since=${encodeURIComponent(since)}` : '';
+    return await apiService.get<AppointmentChanges>(`/appointments/changes/${query}`);
+  }
+
+  // Appointments visible to the current user, kept in localStorage and refreshed via the changes feed.
+  // `scope` should identify the logged-in user so different accounts never share a cache.
+  async syncAppointments(scope: string): Promise<Appointment[]> {
+    const key = `${SYNC_STORAGE_KEY}:${scope}`;
+    let cached: { cursor?: string; items: Appointment[] } = { items: [] };
+    try {
+      cached = JSON.parse(localStorage.getItem(key) || '') || cached;
+    } catch {
+      // No usable cache: start with a full sync
+    }
+
+    const byId = new Map<number, Appointment>(cached.items.map((a) => [a.id, a]));
+    let cursor = cached.cursor;
+    let changes: AppointmentChanges;
+    do {
+      changes = await this.getAppointmentChanges(cursor);
+      changes.updated.forEach((a) => byId.set(a.id, a));
+      changes.deleted.forEach((id) => byId.delete(id));
+      cursor = changes.cursor;
+    } while (changes.has_more);
+
+    const items = Array.from(byId.values());
+    localStorage.setItem(key, JSON.stringify({ cursor, items }));
+    return items;
+  }
+
+  // Live appointment events for doctors/admins (Server-Sent Events). Returns an unsubscribe function.
+  // The stream is opened with a single-use ticket (never the access token in the URL); when it ends
+  // (token expiry, error) a new ticket is requested before reconnecting.
+  subscribeToAppointmentEvents(onEvent: (event: AppointmentEvent) => void): () => void {
+    if (typeof EventSource === 'undefined') return () => {};
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+    const handler = (e: MessageEvent) => onEvent(JSON.parse(e.data));
+
+    const reconnect = (delay: number) => {
+      source?.close();
+      if (!closed) retry = setTimeout(connect, delay);
+    };
+    const connect = async () => {
+      try {
+        const { ticket } = await apiService.post<{ ticket: string; expires_in: number }>('/events/appointments/ticket/');
+        if (closed) return;
+        source = new EventSource(`${API_BASE_URL}/events/appointments/?ticket=${encodeURIComponent(ticket)}`);
+        source.addEventListener('appointment.created', handler as EventListener);
+        source.addEventListener('appointment.updated', handler as EventListener);
+        source.addEventListener('stream.expired', () => reconnect(0));
+        // The ticket was used up: EventSource's own retry would reuse it
+        source.onerror = () => reconnect(5000);
+      } catch {
+        reconnect(30000);
+      }
+    };
+    connect();
+    return () => {
+      closed = true;
+      if (retry) clearTimeout(retry);
+      source?.close();
+    };
+  }
+
   // Update appointment (Client can update date/time, Admin can update status)
   async updateAppointment(id: number, appointmentData: AppointmentUpdate): Promise<Appointment> {
     const response = await apiService.patch<Appointment>(`/appointments/update/${id}/`, appointmentData);
@@ -38,6 +125,14 @@ export class AppointmentService {
     return response;
   }
 
+  // Bulk status transition (Admin/Doctor): pass either ids or a filter
+  async bulkUpdateAppointmentStatus(
+    status: 'terminé' | 'confirmé',
+    selection: { ids: number[] } | { filter: { doctor?: number; date_from?: string; date_to?: string; status?: 'pending' | 'terminé' | 'confirmé' } }
+  ): Promise<{ status: string; updated: number; results: { id: number; outcome: string; status: string | null }[] }> {
+    return await apiService.post('/appointments/bulk-status/', { status, ...selection });
+  }
+
   // Delete appointment
   async deleteAppointment(id: number): Promise<void> {
     await apiService.delete(`/appointments/${id}/delete/`);
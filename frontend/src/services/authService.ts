@@ -70,7 +70,7 @@ export class AuthService {
 
   // Register new user
   async register(userData: UserRegistration): Promise<User> {
-    const response = await apiService.post<User>('/register/', userData);
+    const response = await apiService.postIdempotent<User>('/register/', userData);
     return response;
   }
 
@@ -1,13 +1,39 @@
 import { apiService } from './api';
-import { Doctor, Specialty } from '../types';
+import { Doctor, DoctorCard, DoctorFreeSlots, Specialty } from '../types';
 
 export class DoctorService {
-  // Get all doctors
-  async getAllDoctors(): Promise<Doctor[]> {
-    const response = await apiService.get<Doctor[]>('/doctors/');
+  // Get all doctors (`omit` drops heavy fields the page does not use, e.g. ['availability'])
+  async getAllDoctors(omit: string[] = []): Promise<Doctor[]> {
+    const query = omit.length ? `?omit=${omit.join(',')}` : '';
+    const response = await apiService.get<Doctor[]>(`/doctors/${query}`);
     return response;
   }
 
+  private static readonly FREE_SLOTS_BATCH = 100; // server-side limit of ids per request
+
+  // Free slots (booked times removed) of many doctors over a short window, default: the next 7 days
+  async getFreeSlots(ids: number[], from?: string, to?: string): Promise<Record<number, DoctorFreeSlots>> {
+    const result: Record<number, DoctorFreeSlots> = {};
+    for (let i = 0; i < ids.length; i += DoctorService.FREE_SLOTS_BATCH) {
+      const query = new URLSearchParams({ ids: ids.slice(i, i + DoctorService.FREE_SLOTS_BATCH).join(',') });
+      if (from) query.set('from', from);
+      if (to) query.set('to', to);
+      const response = await apiService.get<{ doctors: Record<string, DoctorFreeSlots> }>(`/doctors/availability/?${query.toString()}`);
+      Object.entries(response.doctors).forEach(([id, days]) => { result[Number(id)] = days; });
+    }
+    return result;
+  }
+
+  // Lightweight doctor cards for listing pages (cursor-paginated: pass `next` to continue)
+  async getDoctorCards(params: { specialty?: number; active?: boolean; pageSize?: number } = {}, next?: string): Promise<{ next: string | null; previous: string | null; results: DoctorCard[] }> {
+    if (next) return await apiService.get(next.replace(/^.*\/api/, ''));
+    const query = new URLSearchParams();
+    if (params.specialty) query.set('specialty', String(params.specialty));
+    if (params.active) query.set('active', '1');
+    if (params.pageSize) query.set('page_size', String(params.pageSize));
+    return await apiService.get(`/doctors/cards/?${query.toString()}`);
+  }
+
   // Get doctor by ID
   async getDoctorById(id: number): Promise<Doctor> {
     const response = await apiService.get<Doctor>(`/doctors/${id}/`);
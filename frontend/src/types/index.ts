@@ -60,19 +60,50 @@ export interface Doctor {
   state: string;
   zip_code: string;
   specialization: Specialty;
-  availability: Record<string, string[]>; // Date -> time slots
+  availability: Record<string, string[]>; // Date -> time slots (recurring rules already expanded)
+  availability_rules?: AvailabilityRules;
   bio: string;
   photo?: string;
+  photo_variants?: Record<string, string>; // e.g. { thumb, card } WebP URLs
   consultation_fee?: number;
 }
 
+// Recurring weekly template; explicit `availability` dates override it
+export interface AvailabilityRules {
+  slot_minutes?: number;
+  weekly?: Partial<Record<'mon' | 'tue' | 'wed' | 'thu' | 'fri' | 'sat' | 'sun', [string, string][]>>;
+  exceptions?: Record<string, string[]> | string[]; // date -> slots, [] or a plain date list = closed
+  start?: string;
+  until?: string;
+}
+
+// Free slots from /doctors/availability/: [date, [times]] pairs in date order
+export type DoctorFreeSlots = [string, string[]][];
+
+export interface DoctorCard {
+  id: number;
+  first_name: string;
+  last_name: string;
+  email: string;
+  phone: string;
+  city: string;
+  specialty_id: number | null;
+  specialty_name: string;
+  consultation_fee?: string | null;
+  photo_variants: Record<string, string>;
+  is_active: boolean;
+  next_available_slot: string | null;
+  appointment_count: number;
+  upcoming_appointment_count: number;
+}
+
 // Appointment types
 export interface Appointment {
   id: number;
   client: User;
   doctor: Doctor;
   date_time: string;
-  status: 'pending' | 'terminé' | 'confirmé';
+  status: 'pending' | 'terminé' | 'confirmé' | 'annulé';
   created_at: string;
   updated_at: string;
 }
@@ -84,7 +115,7 @@ export interface AppointmentCreate {
 
 export interface AppointmentUpdate {
   date_time?: string;
-  status?: 'pending' | 'terminé' | 'confirmé';
+  status?: 'pending' | 'terminé' | 'confirmé' | 'annulé';
 }
 
 // API Response types